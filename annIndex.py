@@ -0,0 +1,209 @@
+"""
+Approximate nearest-neighbour index behind "More like this".
+
+Movies are embedded without any fitted state (genre one-hot plus hashed overview
+words), so vectors stay valid across retrains and the index can grow one movie at
+a time. Lookups use random-projection LSH: N_TABLES tables of N_BITS sign bits
+each; the query's buckets (and, if they're too sparse, the buckets one bit away)
+give a short candidate list that is ranked by exact cosine similarity.
+
+Vectors, hash codes and projection planes are saved to an .npz next to a JSON
+file with the movies' display metadata, both written atomically.
+"""
+import os
+import json
+import time
+import threading
+
+import numpy as np
+
+from textFeatures import HashedTextFeaturizer
+from similarity import GENRE_WEIGHT
+
+INDEX_FORMAT = 1
+N_TABLES = 16
+N_BITS = 10
+TEXT_FEATURES = 128
+# Probe neighbouring buckets until there are this many candidates per requested neighbour
+CANDIDATES_PER_RESULT = 60
+# Below this size an exact scan is about as cheap as hashing (~1 ms per 20k rows)
+BRUTE_FORCE_ROWS = 20000
+META_FIELDS = ('id', 'title', 'release_date', 'overview', 'genre_ids', 'poster_path', 'vote_average', 'vote_count')
+
+_text = HashedTextFeaturizer(n_features=TEXT_FEATURES, use_idf=False)
+
+
+def embed_movies(movies, genre_cols):
+    """
+    Unit vectors for TMDB movie dicts: genre one-hot (genre id -> column in genre_cols)
+    and hashed overview words, each block normalized and weighted like similarity.py.
+    """
+    genres = np.zeros((len(movies), len(genre_cols)), dtype=np.float32)
+    for i, m in enumerate(movies):
+        for g in m.get('genre_ids') or []:
+            j = genre_cols.get(g)
+            if j is not None:
+                genres[i, j] = 1
+    norms = np.linalg.norm(genres, axis=1, keepdims=True)
+    genres /= np.where(norms == 0, 1, norms)
+    text = _text.transform([m.get('overview') or '' for m in movies]).toarray().astype(np.float32)
+    vectors = np.hstack([genres * np.sqrt(GENRE_WEIGHT), text * np.sqrt(1 - GENRE_WEIGHT)])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def genre_columns(genre_ids):
+    """TMDB genre id -> embedding column, from a name -> id mapping like GENRE_IDS."""
+    return {g: i for i, g in enumerate(sorted(set(genre_ids.values())))}
+
+
+class MovieIndex:
+    def __init__(self, genre_ids, seed=42):
+        self.genre_ids = sorted(set(genre_ids.values()))
+        self._genre_col = genre_columns(genre_ids)
+        dim = len(self.genre_ids) + TEXT_FEATURES
+        self.planes = np.random.default_rng(seed).standard_normal((N_TABLES * N_BITS, dim)).astype(np.float32)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.codes = np.zeros((0, N_TABLES), dtype=np.int64)
+        self.movies = []
+        self._row = {}                                   # movie id -> row
+        self._buckets = [{} for _ in range(N_TABLES)]    # code -> [rows]
+        self._lock = threading.Lock()
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.movies)
+
+    def __contains__(self, movie_id):
+        return movie_id in self._row
+
+    # --- Embedding & hashing ---
+
+    def embed(self, movies):
+        return embed_movies(movies, self._genre_col)
+
+    def _hash(self, vectors):
+        bits = (vectors @ self.planes.T > 0).reshape(len(vectors), N_TABLES, N_BITS)
+        return (bits * (1 << np.arange(N_BITS))).sum(axis=2)
+
+    def _index_rows(self, start):
+        for t, table in enumerate(self._buckets):
+            for row, code in enumerate(self.codes[start:, t].tolist(), start):
+                table.setdefault(code, []).append(row)
+
+    # --- Updates ---
+
+    def add_movies(self, movies):
+        """Adds movies not indexed yet (by TMDB id). Returns how many were added."""
+        with self._lock:
+            new, seen = [], set()
+            for m in movies:
+                if m.get('id') is None or m['id'] in self._row or m['id'] in seen:
+                    continue
+                seen.add(m['id'])
+                new.append({k: m[k] for k in META_FIELDS if k in m})
+            if not new:
+                return 0
+            vectors = self.embed(new)
+            start = len(self.movies)
+            self.vectors = np.vstack([self.vectors, vectors])
+            self.codes = np.vstack([self.codes, self._hash(vectors)])
+            for row, m in enumerate(new, start):
+                self._row[m['id']] = row
+            self.movies.extend(new)
+            self._index_rows(start)
+            self.dirty = True
+            return len(new)
+
+    # --- Queries ---
+
+    def _candidates(self, code, want):
+        found = [self._buckets[t].get(int(code[t])) for t in range(N_TABLES)]
+        rows = np.unique(np.concatenate([b for b in found if b] or [np.zeros(0, dtype=np.int64)]))
+        # Multi-probe: buckets one bit away, until there are enough
+        for bit in range(N_BITS):
+            if len(rows) >= want:
+                break
+            found = [self._buckets[t].get(int(code[t]) ^ (1 << bit)) for t in range(N_TABLES)]
+            found = [b for b in found if b]
+            if found:
+                rows = np.union1d(rows, np.concatenate(found))
+        return rows.astype(np.int64)
+
+    def similar(self, movie, k=10, exclude_ids=()):
+        """
+        Top-k indexed movies most like `movie` (a TMDB movie dict; it's embedded on
+        the fly if it isn't indexed). Returns copies of their metadata with its cosine
+        similarity to `movie` as 'seed_similarity'.
+        """
+        with self._lock:
+            if not self.movies:
+                return []
+            row = self._row.get(movie.get('id'))
+            query = self.vectors[row] if row is not None else self.embed([movie])[0]
+            exclude = set(exclude_ids) | {movie.get('id')}
+            # Only excluded movies that are indexed can take a top-k slot
+            want = k + sum(1 for i in exclude if i in self._row)
+            if len(self.movies) <= BRUTE_FORCE_ROWS:
+                rows = np.arange(len(self.movies))
+            else:
+                rows = self._candidates(self._hash(query[None, :])[0], want * CANDIDATES_PER_RESULT)
+            if len(rows) == 0:
+                return []
+            sims = self.vectors[rows] @ query
+            top = min(want, len(rows))
+            order = np.argpartition(-sims, top - 1)[:top]
+            order = order[np.argsort(-sims[order], kind='stable')]
+            results = []
+            for i in order:
+                m = self.movies[rows[i]]
+                if m['id'] in exclude:
+                    continue
+                results.append({**m, 'seed_similarity': float(max(sims[i], 0.0))})
+                if len(results) == k:
+                    break
+            return results
+
+    # --- Persistence ---
+
+    def save(self, path):
+        """Writes the index (path.npz + path.json) if it changed since the last save."""
+        with self._lock:
+            if not self.dirty:
+                return False
+            vectors, codes, movies = self.vectors, self.codes, list(self.movies)
+            self.dirty = False
+        started = time.perf_counter()
+        try:
+            tmp = path + '.tmp.npz'
+            np.savez(tmp, vectors=vectors, codes=codes, planes=self.planes)
+            os.replace(tmp, path + '.npz')
+            with open(path + '.json.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'format': INDEX_FORMAT, 'genre_ids': self.genre_ids, 'movies': movies}, f)
+            os.replace(path + '.json.tmp', path + '.json')
+        except OSError as e:
+            print(f"Warning: Could not save similar-movie index: {e}")
+            self.dirty = True
+            return False
+        print(f"🧭 Saved similar-movie index ({len(movies)} movies) in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return True
+
+    @classmethod
+    def load(cls, path, genre_ids):
+        """Loads a saved index, or returns an empty one if there is none (or it's stale)."""
+        index = cls(genre_ids)
+        try:
+            with open(path + '.json', encoding='utf-8') as f:
+                meta = json.load(f)
+            arrays = np.load(path + '.npz')
+            vectors, codes, planes = arrays['vectors'], arrays['codes'], arrays['planes']
+        except (OSError, ValueError, KeyError):
+            return index
+        if (meta.get('format') != INDEX_FORMAT or meta.get('genre_ids') != index.genre_ids
+                or len(meta['movies']) != len(vectors) or planes.shape != index.planes.shape):
+            return index
+        index.planes, index.vectors, index.codes = planes, vectors, codes
+        index.movies = meta['movies']
+        index._row = {m['id']: row for row, m in enumerate(index.movies)}
+        index._index_rows(0)
+        return index
@@ -1,30 +1,17 @@
 import os
 import sys
-import pandas as pd
 import requests
-from dotenv import load_dotenv
 import time
 import tkinter as tk
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import traceback
-import re
 import json
 import webbrowser
 import io
 import threading
 import shutil
 from PIL import Image, ImageTk
-import joblib
-import numpy as np
-import requests_cache
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib
-import google.generativeai as genai
-
-# Use a non-interactive backend for Tkinter embedding
-matplotlib.use('TkAgg')
 
 class NullWriter:
     def write(self, text): pass
@@ -42,62 +29,54 @@ elif hasattr(sys.stderr, 'reconfigure'):
     sys.stderr.reconfigure(encoding='utf-8')
 
 # Local Imports for ML Pipeline
-from data_handling.import_letterboxd import process_letterboxd_import
-from featureEngineering import feature_engineering
-from modelTrain import train_personal_model
+from pipeline import Pipeline
+from prefetch import Prefetcher, QueryHistory
+from tasteAnalytics import TasteStats, render_taste_chart
+from netLoop import NetworkLoop, UiQueue
+from liveSearch import SearchCache, LocalCatalog, normalize_query, merge_results, MIN_QUERY_LENGTH, MAX_RESULTS
+from annIndex import MovieIndex
+from instrumentation import profiler
+from memoryAccounting import memory, LruCache
+from logSink import LogSink
+import httpCache
+from recommender import (
+    key, configure_gemini, install_http_cache, get_user_data_path,
+    CONFIG_FILE, APP_MEMORY_FILE, TIMINGS_FILE,
+    TASTE_CACHE_FILE, TASTE_CHART_FILE, SIMILAR_INDEX_PATH, GENRE_IDS,
+    watchedMovies, load_ai_model, recommend_async, search_movies, cached_candidate_movies,
+    library_movies, rank_candidates, cache_sizes,
+    load_saved_watched_path, sort_picks, top_picks_for_any_sort, rescore_for_context, QUICK_MOODS, chip_mood_text,
+)
 
 # --- Optimization: Cache TMDB API calls ---
 # This makes the app lightweight and fast by not re-downloading movie data it has already seen.
-requests_cache.install_cache('tmdb_cache', backend='sqlite', expire_after=86400) # Cache for 24 hours
+# Each kind of request has its own expiry and size budget; posters go to a file store.
+install_http_cache()
 
 # --- App Version ---
 APP_VERSION = "3.2.6"
 GITHUB_REPO = "mrsarthi/MBM_recommender"
 
-# --- 1. Path & Config Setup ---
-
-def get_path(relative_path):
-    """ 
-    Robust path finder:
-    1. If running as a frozen .exe, looks in the temporary bundle (_MEIPASS).
-    2. If running as a script, looks in the folder containing this script.
-    """
-    try:
-        # PyInstaller creates a temp folder and stores path in _MEIPASS
-        base_path = sys._MEIPASS
-    except Exception:
-        # If not frozen, use the folder where this app.py file is located
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        
-    return os.path.join(base_path, relative_path)
-
-# Load API Key
-load_dotenv(dotenv_path=get_path('.env'))
-key = os.getenv('TMDB_key')
-baseUrl = "https://api.themoviedb.org/3"
+# Idle time before likely queries are prefetched in the background
+PREFETCH_IDLE_MS = 5000
+# Pause in typing before the Log tab searches TMDB
+SEARCH_DEBOUNCE_MS = 300
+# Neighbours fetched for "More like this" (watched ones are dropped before display)
+MORE_LIKE_THIS_K = 40
+
+# --- Memory caps for long sessions ---
+# The System Log keeps the newest lines only (see logSink)
+MAX_CONSOLE_LINES = 5000
+# Decoded poster images kept for instant re-display
+POSTER_CACHE_SIZE = 48
+# Recommendations kept for re-sorting / context switches: the top MAX_KEPT_PICKS under
+# each sort field and context (the list shows the top 30)
+MAX_KEPT_PICKS = 300
 
 # --- Gemini AI Setup ---
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-gemini_model = None
-if GEMINI_API_KEY and GEMINI_API_KEY != 'YOUR_GEMINI_API_KEY_HERE':
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel('gemini-3.1-flash-lite-preview')
-        print("✅ Gemini AI initialized.")
-    except Exception as e:
-        print(f"⚠️ Gemini init failed: {e}")
-else:
-    print("⚠️ GEMINI_API_KEY not set. Using fallback mood buttons.")
-
-# File Paths — User data persists in %APPDATA% across exe updates
-def get_user_data_path(filename):
-    """Returns a path inside %APPDATA%/MBM_Recommender/ for persistent user data."""
-    appdata = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'MBM_Recommender')
-    os.makedirs(appdata, exist_ok=True)
-    # Ensure subdirectories exist
-    full_path = os.path.join(appdata, filename)
-    os.makedirs(os.path.dirname(full_path), exist_ok=True)
-    return full_path
+gemini_model = configure_gemini()
+
+# --- 1. Data Migration ---
 
 def _get_exe_relative_path(filename):
     """Old path logic — used only for migration."""
@@ -116,7 +95,6 @@ def _migrate_old_data():
     files_to_migrate = [
         'config.json',
         'app_memory_ids.csv',
-        'tmdb_cache.sqlite',
         'user_data/personal_ai_model.pkl',
         'user_data/model_columns.pkl',
         'user_data/summary_vectorizer.pkl',
@@ -147,291 +125,10 @@ def _migrate_old_data():
 # Run migration on startup
 _migrate_old_data()
 
-CONFIG_FILE = get_user_data_path('config.json')
-APP_MEMORY_FILE = get_user_data_path('app_memory_ids.csv')
-
-MODEL_PATH = get_user_data_path('user_data/personal_ai_model.pkl')
-COLUMNS_PATH = get_user_data_path('user_data/model_columns.pkl')
-VECTORIZER_PATH = get_user_data_path('user_data/summary_vectorizer.pkl')
-
-
-# --- 2. Helper Functions ---
-
-def titleNormalize(title):
-    title = str(title).lower()
-    title = re.sub(r'[^a-z0-9]', '', title)
-    return title
-
-def watchedMovies(letterboxd_path, app_memory_path):
-    """
-    Loads watched movies. 
-    Also identifies 'Hated Movies' (Rating <= 2.5) for the Veto System.
-    """
-    watchedSet_titles = set()
-    watchedSet_ids = set()
-    hated_movies = set()
-    
-    # 1. Load User/Friend CSV
-    try:
-        if letterboxd_path and os.path.exists(letterboxd_path):
-            df = pd.read_csv(letterboxd_path)
-            df.columns = [c.strip() for c in df.columns]
-            
-            for index, row in df.iterrows():
-                col_name = 'Name' if 'Name' in df.columns else 'Title'
-                if col_name in row:
-                    title = titleNormalize(row[col_name])
-                    watchedSet_titles.add(title)
-                    
-                    # VETO LOGIC
-                    if 'Rating' in row and pd.notna(row['Rating']):
-                        try:
-                            if float(row['Rating']) <= 2.5:
-                                hated_movies.add(title)
-                        except: pass
-            print(f"Loaded {len(watchedSet_titles)} movies and {len(hated_movies)} hated movies from CSV.")
-    except Exception as e:
-        print(f"Warning: Could not read watched file: {e}")
-
-    # 2. Load App Memory
-    try:
-        if os.path.exists(app_memory_path) and os.path.getsize(app_memory_path) > 0:
-            memLogged = pd.read_csv(app_memory_path)
-            if 'movie_id' in memLogged.columns:
-                memory_set_ids = set(memLogged['movie_id'].astype(int))
-                watchedSet_ids.update(memory_set_ids)
-        else:
-            with open(app_memory_path, 'w', newline='', encoding='utf-8') as f:
-                f.write('movie_id,title\n')
-    except Exception as e:
-        print(f"Warning: Could not read app memory: {e}")
-    
-    return watchedSet_titles, watchedSet_ids, hated_movies
-
-def load_ai_model():
-    try:
-        if os.path.exists(MODEL_PATH) and os.path.exists(COLUMNS_PATH) and os.path.exists(VECTORIZER_PATH):
-            model = joblib.load(MODEL_PATH)
-            columns = joblib.load(COLUMNS_PATH)
-            vectorizer = joblib.load(VECTORIZER_PATH)
-            print("✅ AI Model, Columns, and Vectorizer Loaded Successfully.")
-            return model, columns, vectorizer
-        else:
-            print("⚠️ Model files not found. Using standard popularity sorting.")
-            return None, None, None
-    except Exception as e:
-        print(f"⚠️ Error loading AI: {e}")
-        return None, None, None
-
-# Valid TMDB genre list for Gemini to pick from
-VALID_GENRES = [
-    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary',
-    'Drama', 'Family', 'Fantasy', 'History', 'Horror', 'Music', 'Mystery',
-    'Romance', 'Science Fiction', 'TV Movie', 'Thriller', 'War', 'Western'
-]
-
-def get_genres_from_ai(user_input):
-    """
-    Uses Gemini to interpret a user's mood/description and return matching TMDB genres.
-    Falls back to a simple keyword match if Gemini is unavailable.
-    """
-    if gemini_model:
-        try:
-            prompt = (
-                f"You are a movie recommendation assistant who deeply understands internet culture, "
-                f"memes, sarcasm, Gen-Z slang, and film community jargon.\n\n"
-                f"The user describes their mood or what they want to watch:\n\n"
-                f"\"{user_input}\"\n\n"
-                f"IMPORTANT CONTEXT for interpreting user input:\n"
-                f"- 'absolute cinema' or 'peak cinema' = critically acclaimed masterpieces (Drama, History, War)\n"
-                f"- 'brainrot' or 'turn my brain off' = mindless fun (Action, Comedy, Animation)\n"
-                f"- 'cozy vibes' or 'comfort movie' = warm, feel-good (Family, Comedy, Romance, Animation)\n"
-                f"- 'edgy' or 'messed up' = dark, disturbing (Thriller, Horror, Crime)\n"
-                f"- 'crying in the club' or 'in my feels' = emotional, tearjerker (Drama, Romance)\n"
-                f"- 'kino' = artsy, high-quality cinema (Drama, History, Mystery)\n"
-                f"- 'based' = bold, unconventional picks (Crime, Thriller, War, Western)\n"
-                f"- 'mid' = user is bored of average stuff, suggest niche or standout genres\n"
-                f"- Understand sarcasm: 'nothing too scary' with a wink might still mean Thriller\n"
-                f"- Understand vibe descriptions: 'rainy day', 'late night', '3am energy' etc.\n\n"
-                f"Select the most relevant genres from this EXACT list:\n"
-                f"{', '.join(VALID_GENRES)}\n\n"
-                f"Rules:\n"
-                f"- Return ONLY genre names from the list above, separated by commas.\n"
-                f"- Choose 2-5 genres that best match the user's intent (not just literal words).\n"
-                f"- Do NOT include any explanation, formatting, or extra text.\n"
-                f"- Example output: Action, Thriller, Science Fiction"
-            )
-            response = gemini_model.generate_content(prompt)
-            raw = response.text.strip()
-            print(f"🤖 Gemini Response: {raw}")
-            
-            # Parse and validate genres
-            parsed = [g.strip() for g in raw.split(',')]
-            valid = [g for g in parsed if g in VALID_GENRES]
-            
-            if valid:
-                print(f"✅ Matched Genres: {valid}")
-                return valid
-            else:
-                print("⚠️ Gemini returned no valid genres. Using fallback.")
-        except Exception as e:
-            print(f"⚠️ Gemini API error: {e}. Using fallback.")
-    
-    # --- Fallback: Simple keyword matching ---
-    return _fallback_mood_match(user_input)
-
-def _fallback_mood_match(user_input):
-    """Basic keyword-to-genre mapping when Gemini is unavailable."""
-    fallback_map = {
-        'happy': ['Comedy', 'Music', 'Animation', 'Family', 'Romance'],
-        'sad': ['Drama', 'Romance'],
-        'tense': ['Horror', 'Thriller', 'Mystery', 'Crime'],
-        'adventurous': ['Adventure', 'Science Fiction', 'Fantasy', 'Action'],
-        'calm': ['Documentary', 'Drama', 'History'],
-        'nostalgic': ['Drama', 'Romance', 'Fantasy'],
-        'excited': ['Action', 'Adventure', 'Comedy'],
-        'thoughtful': ['Drama', 'Documentary'],
-        'scary': ['Horror', 'Thriller'],
-        'lighthearted': ['Comedy', 'Family', 'Animation'],
-        'intense': ['Action', 'Thriller', 'War'],
-        'mysterious': ['Mystery', 'Thriller', 'Crime'],
-        'romantic': ['Romance', 'Drama', 'Comedy'],
-        'suspenseful': ['Thriller', 'Horror', 'Mystery']
-    }
-    text = user_input.lower()
-    matched_genres = set()
-    for keyword, genres in fallback_map.items():
-        if keyword in text:
-            matched_genres.update(genres)
-    
-    if matched_genres:
-        print(f"📌 Fallback matched: {list(matched_genres)}")
-        return list(matched_genres)
-    
-    # Default if nothing matches
-    print("📌 No keywords matched. Defaulting to popular genres.")
-    return ['Action', 'Comedy', 'Drama', 'Thriller']
-
-# --- 3. Core Logic (Prediction & Analysis) ---
-
-def predict_score(model, model_columns, vectorizer, genres, context, overview):
-    # 1. Initialize Input
-    input_data = {col: 0 for col in model_columns}
-    
-    # 2. Set Context
-    if f'context_{context}' in input_data:
-        input_data[f'context_{context}'] = 1
-        
-    # 3. Set Genres
-    for g in genres:
-        if f'genre_{g}' in input_data:
-            input_data[f'genre_{g}'] = 1
-            
-    # 4. Set Default Rating
-    input_data['rating_encoded'] = 2 
-
-    # 5. Process Summary
-    if vectorizer and overview:
-        try:
-            overview_text = str(overview)
-            tfidf_matrix = vectorizer.transform([overview_text])
-            feature_names = [f"summary_{w}" for w in vectorizer.get_feature_names_out()]
-            dense_vector = tfidf_matrix.toarray()[0]
-            
-            for name, value in zip(feature_names, dense_vector):
-                if name in input_data:
-                    input_data[name] = value
-        except Exception as e:
-            pass
-
-    # 6. Predict
-    df_input = pd.DataFrame([input_data])
-    df_input = df_input[model_columns] 
-    return model.predict(df_input)[0]
-
-def analyze(watchedSet_titles, watchedSet_ids, hated_movies, desiredGenre, ai_model, ai_columns, ai_vectorizer, user_context):
-    genreDict = {
-        'Action': 28, 'Adventure': 12, 'Animation': 16, 'Comedy': 35,
-        'Crime': 80, 'Documentary': 99, 'Drama': 18, 'Family': 10751,
-        'Fantasy': 14, 'History': 36, 'Horror': 27, 'Music': 10402,
-        'Mystery': 9648, 'Romance': 10749, 'Science Fiction': 878,
-        'TV Movie': 10770, 'Thriller': 53, 'War': 10752, 'Western': 37
-    }
-    idToGenre = {v: k for k, v in genreDict.items()}
-
-    if desiredGenre:
-        targetGenreIds = []
-        for name in desiredGenre:
-            genreId = genreDict.get(name)
-            if genreId: targetGenreIds.append(str(genreId))
-
-        if not targetGenreIds: return []
+profiler.configure(export_path=TIMINGS_FILE)
 
-        genreIdString = "|".join(targetGenreIds)
-        print(f"Searching TMDB for genres: {genreIdString}")
 
-        # Fetch candidates
-        discoverUrl = f"{baseUrl}/discover/movie"
-        discoverParams = {
-            'api_key': key, 'with_genres': genreIdString,
-            'vote_average.gte': 5.5, 'vote_count.gte': 100, 
-            'sort_by': 'popularity.desc', 'language': 'en-US', 'page': 1
-        }
-
-        results = []
-        for _ in range(2): 
-            resp = requests.get(discoverUrl, params=discoverParams)
-            if resp.status_code == 200:
-                results.extend(resp.json().get('results', []))
-                discoverParams['page'] += 1
-            else: break
-
-        finalPicks = []
-        for movie in results:
-            title_norm = titleNormalize(movie['title'])
-            movie_id = movie['id']
-            
-            # Filter: Already Watched?
-            if (title_norm not in watchedSet_titles) and (movie_id not in watchedSet_ids):
-                
-                # --- AI PREDICTION ---
-                if ai_model:
-                    genres = [idToGenre[g] for g in movie.get('genre_ids', []) if g in idToGenre]
-                    overview = movie.get('overview', '')
-                    score = predict_score(ai_model, ai_columns, ai_vectorizer, genres, user_context, overview)
-                    
-                    # --- VETO SYSTEM ---
-                    is_vetoed = False
-                    for hated in hated_movies:
-                        if (hated in title_norm) or (title_norm in hated):
-                            print(f"🚫 Vetoing '{movie['title']}' because user hated '{hated}'")
-                            score -= 3.0 
-                            is_vetoed = True
-                            break
-                    
-                    movie['ai_score'] = score
-                else:
-                    movie['ai_score'] = 0
-                
-                finalPicks.append(movie)
-
-        print(f"Found {len(finalPicks)} candidate movies (sorting deferred to UI).")
-
-        return finalPicks
-    return []
-
-
-# --- 4. GUI Class ---
-
-class ConsoleRedirector:
-    def __init__(self, text_widget):
-        self.text_widget = text_widget
-    def write(self, text):
-        self.text_widget.configure(state='normal')
-        self.text_widget.insert(tk.END, text)
-        self.text_widget.see(tk.END)
-        self.text_widget.configure(state='disabled')
-    def flush(self): pass
+# --- 2. GUI Class ---
 
 class App(ctk.CTk):
     COLORS = {
@@ -450,13 +147,11 @@ class App(ctk.CTk):
         'score_low': '#CF6679'
     }
 
-    def __init__(self, watched_path, initialWatchedSet_titles, initialWatchedSet_ids, initialHated):
+    def __init__(self, watched_path, initialWatched):
         super().__init__()
         
         self.watched_path = watched_path 
-        self.watchedSet_titles = initialWatchedSet_titles
-        self.watchedSet_ids = initialWatchedSet_ids
-        self.hated_movies = initialHated
+        self.watched = initialWatched  # WatchedIndex: watched titles/ids + veto list
         
         # Load AI
         self.ai_model, self.ai_columns, self.ai_vectorizer = load_ai_model()
@@ -468,9 +163,39 @@ class App(ctk.CTk):
         self.gemini_available = gemini_model is not None
         self.current_results = {}
         self.current_search_results = {}
+        self._last_picks = []
         self.poster_base_url = "https://image.tmdb.org/t/p/w200"
+        # (poster path, width) -> CTkImage; labels only ever point into this, so posters stay bounded
+        self.poster_cache = LruCache(POSTER_CACHE_SIZE)
         self.new_logs_count = 0  # Track new logs for auto-retrain prompt
         
+        # All GUI network I/O runs on one asyncio loop; results come back through ui_queue
+        self.net = NetworkLoop()
+        self.ui_queue = UiQueue(self)
+        # Prints and progress from any thread, drained into the UI once per frame
+        self.log_sink = LogSink(self, max_lines=MAX_CONSOLE_LINES)
+        self.log_sink.on_progress(self._on_progress)
+        
+        # Idle-time cache warming for likely queries
+        self.query_history = QueryHistory()
+        self.prefetcher = Prefetcher(self.query_history, lambda: (self.ai_model, self.ai_columns, self.ai_vectorizer),
+                                     on_fetched=self._index_movies)
+        self._prefetch_job = None
+        
+        # Live search: TMDB results per query, plus titles we already have locally
+        self.search_cache = SearchCache()
+        self.local_catalog = LocalCatalog()
+        self._search_job = None
+        self._shown_search_ids = None
+        # "More like this": ANN index over the library and every movie seen since (loaded in background)
+        self.similar_index = None
+        
+        # "My Taste" aggregates, loaded (and charted) in the background
+        self.taste = None
+        self._taste_rendering = False
+        self._taste_dirty = False
+        self._taste_shown_version = None
+        
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1) # Let the main frame expand
         
@@ -544,11 +269,69 @@ class App(ctk.CTk):
         self.update_btn.pack(side="right", padx=15, pady=8)
         
         # Redirect Console AFTER all UI elements are built preventing Tkinter threaded crashes
-        sys.stdout = ConsoleRedirector(self.console_output)
-        sys.stderr = ConsoleRedirector(self.console_output)
+        self.log_sink.attach(self.console_output)
+        sys.stdout = self.log_sink
+        sys.stderr = self.log_sink
+        self._register_memory_gauges()
+        if profiler.enabled:
+            memory.start()
         
         # Check for updates in background
         threading.Thread(target=self._check_for_updates, daemon=True).start()
+        self.net.submit(self.net.run_blocking(self._load_local_indexes, self.watched_path), post=self.ui_queue.post,
+                        on_done=self._set_similar_index,
+                        on_error=lambda e: print(f"Warning: Could not index library: {e}"))
+        self._schedule_prefetch()
+
+    def _register_memory_gauges(self):
+        """Sizes shown by the 🧠 Memory report, each against its cap."""
+        memory.register('console', lambda: (self.log_sink.line_count(), MAX_CONSOLE_LINES), 'lines')
+        memory.register('poster images', lambda: (len(self.poster_cache), POSTER_CACHE_SIZE))
+        memory.register('kept picks', lambda: (len(self._last_picks), None))
+        memory.register('result buttons', lambda: (len(self.current_results) + len(self.current_search_results), None))
+        memory.register('search queries', lambda: (len(self.search_cache), self.search_cache.size))
+        memory.register('local catalog', lambda: (len(self.local_catalog), self.local_catalog.size), 'movies')
+        memory.register('similar index', lambda: (len(self.similar_index) if self.similar_index is not None else 0, None), 'movies')
+        for name in cache_sizes():
+            memory.register(name, lambda name=name: cache_sizes()[name])
+
+    def _load_local_indexes(self, library_path):
+        """Worker: feeds the library to local search and loads + tops up the similar-movie index."""
+        movies = library_movies(library_path) + cached_candidate_movies()
+        self.local_catalog.add_movies(movies)
+        index = MovieIndex.load(SIMILAR_INDEX_PATH, GENRE_IDS)
+        added = index.add_movies(movies)
+        print(f"🧭 Similar-movie index ready: {len(index)} movies ({added} new).")
+        return index
+
+    def _set_similar_index(self, index):
+        self.similar_index = index
+
+    def _index_movies(self, movies):
+        """Adds newly seen TMDB movies to local search and the similar-movie index, off the Tk thread."""
+        def add():
+            self.local_catalog.add_movies(movies)
+            if self.similar_index is not None:
+                self.similar_index.add_movies(movies)
+        self.net.submit(self.net.run_blocking(add), on_error=print)
+
+    def _schedule_prefetch(self):
+        """(Re)starts the idle timer; the prefetcher runs if nothing else happens first."""
+        if self._prefetch_job is not None:
+            self.after_cancel(self._prefetch_job)
+        self._prefetch_job = self.after(PREFETCH_IDLE_MS, self._on_idle)
+
+    def _on_idle(self):
+        self._prefetch_job = None
+        self.prefetcher.start()
+        if self.similar_index is not None and self.similar_index.dirty:
+            self.net.submit(self.net.run_blocking(self.similar_index.save, SIMILAR_INDEX_PATH), on_error=print)
+
+    def _cancel_prefetch(self):
+        if self._prefetch_job is not None:
+            self.after_cancel(self._prefetch_job)
+            self._prefetch_job = None
+        self.prefetcher.cancel()
 
     def setup_top_bar(self, row):
         """Top bar with File selection and Context"""
@@ -586,6 +369,7 @@ class App(ctk.CTk):
         self.context_var = ctk.StringVar(value="Alone")
         ctx_menu = ctk.CTkOptionMenu(ctx_inner, variable=self.context_var, 
                                      values=["Alone", "Friends", "Family", "Partner", "Other"], 
+                                     command=self._on_context_change,
                                      width=200, height=30, fg_color=self.COLORS['bg_card_hover'], 
                                      button_color=self.COLORS['accent'], button_hover_color=self.COLORS['accent_hover'],
                                      dropdown_fg_color=self.COLORS['bg_card'], dropdown_text_color=self.COLORS['text_main'])
@@ -638,8 +422,7 @@ class App(ctk.CTk):
         chips_frame = ctk.CTkFrame(input_card, fg_color="transparent")
         chips_frame.pack(fill='x', padx=15, pady=(0, 10))
         
-        quick_moods = ["😊 Happy", "😢 Sad", "😱 Scared", "🤔 Thoughtful", "🔥 Excited", "💕 Romantic", "🌌 Adventurous"]
-        for mood in quick_moods:
+        for mood in QUICK_MOODS:
             ctk.CTkButton(chips_frame, text=mood, width=90, height=28,
                           font=('Segoe UI', 10), corner_radius=14,
                           fg_color=self.COLORS['bg_card_hover'], hover_color=self.COLORS['accent'],
@@ -672,7 +455,8 @@ class App(ctk.CTk):
         if current:
             self.mood_input.insert(tk.END, f", {clean}")
         else:
-            self.mood_input.insert('1.0', f"I'm feeling {clean.lower()}")
+            # Same text the prefetcher warms, so a lone chip is answered from cache
+            self.mood_input.insert('1.0', chip_mood_text(mood_text))
 
     def setup_main_tabs(self, row):
         """Tabs for Results, Log, and Console"""
@@ -697,77 +481,61 @@ class App(ctk.CTk):
 
     def setup_my_taste_tab(self, parent):
         parent.columnconfigure(0, weight=1)
-        parent.columnconfigure(1, weight=1)
         parent.rowconfigure(0, weight=1)
         
-        # We need a frame to hold the plots
-        chart_frame = ctk.CTkFrame(parent, fg_color="transparent")
-        chart_frame.grid(row=0, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
-        chart_frame.columnconfigure(0, weight=1)
-        chart_frame.columnconfigure(1, weight=1)
-        chart_frame.rowconfigure(0, weight=1)
+        # Charts are rendered off the UI thread and shown here as an image
+        self.taste_chart_label = ctk.CTkLabel(parent, text="Loading your taste profile...", 
+                                              font=self.header_font, text_color=self.COLORS['text_sub'])
+        self.taste_chart_label.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        self._taste_shown_version = None
+        self._refresh_taste_chart()
+
+    def _refresh_taste_chart(self):
+        """Redraws the My Taste charts in the background if the aggregates changed."""
+        if self._taste_rendering:
+            self._taste_dirty = True  # Picked up when the current render finishes
+            return
+        self._taste_rendering = True
+        threading.Thread(target=self._render_taste_thread, daemon=True).start()
 
-        # Matplotlib Figure (Dark Theme)
-        plt.style.use('dark_background')
-        fig = plt.figure(figsize=(10, 5), facecolor=self.COLORS['bg_card'])
-        
+    def _render_taste_thread(self):
+        img, version, error = None, None, None
         try:
-            # 1. Load User Data
-            df = pd.DataFrame()
-            if self.watched_path and os.path.exists(self.watched_path):
-                df = pd.read_csv(self.watched_path)
-            
-            if df.empty or 'Rating' not in df.columns:
-                ctk.CTkLabel(chart_frame, text="Not enough rating data yet. Log some movies!", 
-                             font=self.header_font).pack(pady=50)
-                return
-
-            # Clean and process data mapping
-            df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce')
-            df = df.dropna(subset=['Rating'])
-            
-            # --- Subplot 1: Rating Distribution (Histogram) ---
-            ax1 = fig.add_subplot(121, facecolor=self.COLORS['bg_main'])
-            ax1.hist(df['Rating'], bins=np.arange(0.25, 5.5, 0.5), color=self.COLORS['accent'], edgecolor='black', alpha=0.8)
-            ax1.set_title("Your Rating Distribution", fontsize=12, color=self.COLORS['text_main'], pad=15)
-            ax1.set_xlabel("Stars", color=self.COLORS['text_sub'])
-            ax1.set_ylabel("Count", color=self.COLORS['text_sub'])
-            ax1.set_xticks(np.arange(0.5, 5.5, 0.5))
-            ax1.tick_params(colors=self.COLORS['text_sub'])
-            for spine in ax1.spines.values():
-                spine.set_color('#333333')
-
-            # --- Subplot 2: Top Genres (Bar Chart - if available) ---
-            ax2 = fig.add_subplot(122, facecolor=self.COLORS['bg_main'])
-            
-            if 'genres' in df.columns and df['genres'].notna().any():
-                # Process comma-separated genres
-                genres_series = df['genres'].dropna().str.split(',').explode().str.strip()
-                genre_counts = genres_series.value_counts().head(8) # Top 8
-                
-                # Horizontal Bar Chart
-                y_pos = np.arange(len(genre_counts))
-                bars = ax2.barh(y_pos, genre_counts.values, align='center', color=self.COLORS['success'], alpha=0.8)
-                ax2.set_yticks(y_pos, labels=genre_counts.index)
-                ax2.invert_yaxis()  # top genre at the top
-                ax2.set_title("Your Top Genres", fontsize=12, color=self.COLORS['text_main'], pad=15)
-                ax2.set_xlabel("Movies Watched", color=self.COLORS['text_sub'])
-                ax2.tick_params(colors=self.COLORS['text_sub'])
-            else:
-                ax2.text(0.5, 0.5, 'Genre data not available in export.', 
-                         horizontalalignment='center', verticalalignment='center',
-                         transform=ax2.transAxes, color=self.COLORS['text_sub'])
-                ax2.axis('off')
-
-            plt.tight_layout()
-            
-            # Embed in Tkinter
-            canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-            canvas.draw()
-            canvas.get_tk_widget().grid(row=0, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
-            
+            if self.taste is None:
+                # Cached aggregates unless the watched CSV changed outside the app
+                self.taste = TasteStats.load(self.watched_path, TASTE_CACHE_FILE)
+            snapshot = self.taste.snapshot()
+            version = snapshot['version']
+            if version != self._taste_shown_version and snapshot['n_rated'] > 0:
+                img = render_taste_chart(snapshot, self.COLORS, TASTE_CHART_FILE)
         except Exception as e:
-            ctk.CTkLabel(chart_frame, text=f"Error generating charts: {e}", text_color=self.COLORS['danger']).pack(pady=50)
+            error = e
+        self.ui_queue.post(self._show_taste_chart, img, version, error)
+
+    def _show_taste_chart(self, img, version, error=None):
+        self._taste_rendering = False
+        if getattr(self, 'taste_chart_label', None) and self.taste_chart_label.winfo_exists():
+            if error is not None:
+                self.taste_chart_label.configure(text=f"Error generating charts: {error}", text_color=self.COLORS['danger'], image=None)
+                self.taste_chart_label.image = None
+            elif img is not None:
+                c_img = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
+                self.taste_chart_label.configure(image=c_img, text="")
+                self.taste_chart_label.image = c_img
+                self._taste_shown_version = version
+            elif version != self._taste_shown_version:
+                self.taste_chart_label.configure(text="Not enough rating data yet. Log some movies!", image=None)
+                self.taste_chart_label.image = None
+                self._taste_shown_version = version
+        if self._taste_dirty:
+            self._taste_dirty = False
+            self._refresh_taste_chart()
+
+    def _reset_taste(self):
+        """Forget the aggregates (e.g. a different watched file was chosen) and reload them."""
+        self.taste = None
+        self._taste_shown_version = None
+        self._refresh_taste_chart()
 
     def setup_results_tab(self, parent):
         parent.columnconfigure(0, weight=1) # List
@@ -783,7 +551,7 @@ class App(ctk.CTk):
         
         self.sort_var = ctk.StringVar(value="TMDB Score")
         self.sort_toggle = ctk.CTkSegmentedButton(
-            sort_bar, values=["TMDB Score", "AI Prediction"],
+            sort_bar, values=["TMDB Score", "AI Prediction", "Like My Favorites", "Diverse"],
             variable=self.sort_var,
             command=self._on_sort_change,
             font=('Segoe UI', 11, 'bold'),
@@ -827,6 +595,9 @@ class App(ctk.CTk):
         
         ctk.CTkButton(btn_frame, text="View on TMDB", command=self._on_view_details, 
                       fg_color=self.COLORS['bg_card_hover'], hover_color="#3A3A3A", width=120).pack(side="left", padx=10)
+        
+        ctk.CTkButton(btn_frame, text="More like this", command=lambda: self._on_more_like_this("res"), 
+                      fg_color=self.COLORS['bg_card_hover'], hover_color="#3A3A3A", width=120).pack(side="left", padx=10)
 
     def setup_log_tab(self, parent):
         parent.columnconfigure(0, weight=1)
@@ -839,6 +610,8 @@ class App(ctk.CTk):
         self.search_entry = ctk.CTkEntry(search_bar, placeholder_text="Enter movie title...", width=300, 
                                          fg_color=self.COLORS['bg_card'], border_color=self.COLORS['bg_card_hover'])
         self.search_entry.pack(side="left", padx=10)
+        self.search_entry.bind('<KeyRelease>', self._on_search_typed)
+        self.search_entry.bind('<Return>', lambda e: self._on_tmdb_search())
         
         ctk.CTkButton(search_bar, text="Search", command=self._on_tmdb_search, 
                       fg_color=self.COLORS['accent'], hover_color=self.COLORS['accent_hover'],
@@ -867,9 +640,15 @@ class App(ctk.CTk):
                                        fg_color="transparent", font=('Segoe UI', 11))
         self.log_text.grid(row=1, column=0, sticky="nsew", padx=20, pady=5)
         
-        ctk.CTkButton(log_preview, text="Log & Rate Movie", command=lambda: self._on_log_movie("log"), 
+        log_btns = ctk.CTkFrame(log_preview, fg_color="transparent")
+        log_btns.grid(row=2, column=0, pady=20)
+        
+        ctk.CTkButton(log_btns, text="Log & Rate Movie", command=lambda: self._on_log_movie("log"), 
                       fg_color=self.COLORS['success'], hover_color='#02c4b3',
-                      text_color=self.COLORS['btn_text']).grid(row=2, column=0, pady=20)
+                      text_color=self.COLORS['btn_text']).pack(side="left", padx=10)
+        
+        ctk.CTkButton(log_btns, text="More like this", command=lambda: self._on_more_like_this("log"), 
+                      fg_color=self.COLORS['bg_card_hover'], hover_color="#3A3A3A").pack(side="left", padx=10)
 
     def setup_console_tab(self, parent):
         parent.columnconfigure(0, weight=1)
@@ -886,12 +665,46 @@ class App(ctk.CTk):
                                          height=30, width=150)
         self.retrain_btn.pack(side="right", padx=5)
 
+        ctk.CTkButton(action_bar, text="⏱ Timings", command=self._on_show_timings,
+                      fg_color=self.COLORS['bg_card_hover'], hover_color=self.COLORS['accent'],
+                      height=30, width=100).pack(side="right", padx=5)
+
+        ctk.CTkButton(action_bar, text="🧠 Memory", command=self._on_show_memory,
+                      fg_color=self.COLORS['bg_card_hover'], hover_color=self.COLORS['accent'],
+                      height=30, width=100).pack(side="right", padx=5)
+
+        self.profiling_var = ctk.BooleanVar(value=profiler.enabled)
+        ctk.CTkSwitch(action_bar, text="Profiling", variable=self.profiling_var, command=self._on_toggle_profiling,
+                      progress_color=self.COLORS['accent'], font=('Segoe UI', 11)).pack(side="right", padx=10)
+
         self.console_output = ctk.CTkTextbox(parent, wrap=tk.WORD, font=('Consolas', 10), state='disabled', 
                                              fg_color=self.COLORS['bg_main'], text_color="#00FF00")
         self.console_output.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
 
     # --- Event Handlers & Logic ---
 
+    def _on_toggle_profiling(self):
+        profiler.configure(enabled=self.profiling_var.get())
+        # Allocation tracing rides on the same switch: it's too slow to leave on
+        if profiler.enabled:
+            memory.start()
+        else:
+            memory.stop()
+        state = "ON" if profiler.enabled else "OFF"
+        print(f"⏱ Profiling {state}. Timings are appended to {TIMINGS_FILE}")
+
+    def _on_show_timings(self):
+        """Prints rolling p50/p95 stage latencies to the console."""
+        print("\n--- Stage Latencies (rolling window) ---")
+        print(profiler.format_report())
+        print("\n--- HTTP Cache ---")
+        print(httpCache.format_stats())
+
+    def _on_show_memory(self):
+        """Prints resident memory, the capped structures, and traced allocations per subsystem."""
+        print()
+        print(memory.format_report())
+
     def _on_skip_import(self):
         user_csv_path = get_user_data_path('user_data/user_profile.csv')
         os.makedirs(os.path.dirname(user_csv_path), exist_ok=True)
@@ -901,7 +714,7 @@ class App(ctk.CTk):
         
         self.watched_path = user_csv_path
         self._save_config(user_csv_path)
-        self.watchedSet_titles, self.watchedSet_ids, self.hated_movies = watchedMovies(user_csv_path, APP_MEMORY_FILE)
+        self.watched = watchedMovies(user_csv_path, APP_MEMORY_FILE)
         
         self.show_main_app()
 
@@ -921,46 +734,48 @@ class App(ctk.CTk):
         user_csv_path = get_user_data_path('user_data/user_profile.csv')
         features_path = get_user_data_path('user_data/user_profile_features.csv')
         
-        # Define the callback that hydrates the UI's progress bar (starts at 10% visually, scales to 60%)
+        # Called once per movie; the sink hands the UI only the latest count each frame (see _on_progress)
         def tmdb_progress(current, total):
             if total > 0:
-                percent = current / total
-                # Map 0-100% TMDB fetch to 0.1->0.6 on the UI progress bar
-                ui_progress = 0.1 + (0.5 * percent)
-                self._update_onboard_status(f"Fetching TMDB Data: {current}/{total} movies...", progress=ui_progress)
-
-        # 1. Import
-        success = process_letterboxd_import(zip_path, output_csv_path=user_csv_path, progress_callback=tmdb_progress)
-        if not success:
-            self._update_onboard_status("Failed to import Zip. Check TMDB API key.", error=True)
-            return
-            
-        self._update_onboard_status("Data Hydrated! Engineering NLP Features...", progress=0.7)
-        
-        # 2. Feature Engineering
-        success = feature_engineering(input_file=user_csv_path, output_file=features_path, vectorizer_path=VECTORIZER_PATH)
-        if not success:
-            self._update_onboard_status("Failed to engineer features.", error=True)
-            return
-            
-        self._update_onboard_status("Features Created. Training Neural Pathways...", progress=0.85)
-        
-        # 3. Train Model
-        success = train_personal_model(input_file=features_path, model_path=MODEL_PATH, columns_path=COLUMNS_PATH)
-        if not success:
-            self._update_onboard_status("Failed to train model. Need at least 15 ratings.", error=True)
+                self.log_sink.progress('tmdb', current, total, "Fetching TMDB Data")
+
+        stage_status = {
+            'features': ("Data Hydrated! Engineering NLP Features...", 0.7),
+            'train': ("Features Created. Training Neural Pathways...", 0.85),
+        }
+        def on_stage(stage):
+            self.log_sink.clear_progress('tmdb')
+            if stage in stage_status:
+                self._update_onboard_status(stage_status[stage][0], progress=stage_status[stage][1])
+
+        with profiler.request('onboarding') as trace:
+            result = Pipeline(profile_path=user_csv_path, features_path=features_path).run(
+                zip_path, progress_callback=tmdb_progress, on_stage=on_stage)
+        if trace:
+            print(profiler.format_trace(trace))
+        if not result.success:
+            errors = {
+                'import': "Failed to import Zip. Check TMDB API key.",
+                'features': "Failed to engineer features.",
+                'train': "Failed to train model. Need at least 15 ratings.",
+            }
+            self.log_sink.clear_progress('tmdb')
+            self._update_onboard_status(errors[result.failed_stage], error=True)
             return
             
         self._update_onboard_status("AI Training Complete! Booting...", progress=1.0)
         
-        # Reload Models and launch app
-        self.ai_model, self.ai_columns, self.ai_vectorizer = load_ai_model()
+        # Use the freshly trained model if it's still in memory, otherwise load it
+        if result.model is not None:
+            self.ai_model, self.ai_columns, self.ai_vectorizer = result.model, result.columns, result.vectorizer
+        else:
+            self.ai_model, self.ai_columns, self.ai_vectorizer = load_ai_model()
         self.watched_path = user_csv_path
         self._save_config(user_csv_path)
-        self.watchedSet_titles, self.watchedSet_ids, self.hated_movies = watchedMovies(user_csv_path, APP_MEMORY_FILE)
+        self.watched = watchedMovies(user_csv_path, APP_MEMORY_FILE)
         
         # Back to main thread for UI changes
-        self.after(1500, self.show_main_app)
+        self.ui_queue.post(self.after, 1500, self.show_main_app)
 
     def _update_onboard_status(self, text, progress=None, error=False):
         """Thread-safe UI updater"""
@@ -971,8 +786,15 @@ class App(ctk.CTk):
             if error:
                 self.import_btn.configure(state="normal", text="Try Again")
                 self.progress.pack_forget()
-            self.update_idletasks()
-        self.after(0, update)
+        self.ui_queue.post(update)
+
+    def _on_progress(self, report):
+        """Tk thread: the latest TMDB hydration count, at most once per frame."""
+        if report.key != 'tmdb' or not getattr(self, 'status_label', None) or not self.status_label.winfo_exists():
+            return
+        self.status_label.configure(text=report.describe(), text_color=self.COLORS['success'])
+        # Map 0-100% TMDB fetch to 0.1->0.6 on the UI progress bar
+        self.progress.set(0.1 + 0.5 * report.fraction)
 
     def _save_config(self, path):
         with open(CONFIG_FILE, 'w') as f: json.dump({'watched_path': path}, f)
@@ -995,7 +817,7 @@ class App(ctk.CTk):
                         if latest_parts > current_parts:
                             download_url = data.get('html_url', f'https://github.com/{GITHUB_REPO}/releases/latest')
                             self._latest_release_url = download_url
-                            self.after(0, lambda: self._show_update_banner(latest_tag))
+                            self.ui_queue.post(self._show_update_banner, latest_tag)
                     except ValueError:
                         pass  # Malformed version tag, skip
         except Exception:
@@ -1017,12 +839,12 @@ class App(ctk.CTk):
             self.file_path_var.set(os.path.basename(path))
             self.watched_path = path
             self._save_config(path)
-            self.watchedSet_titles, self.watchedSet_ids, self.hated_movies = watchedMovies(path, APP_MEMORY_FILE)
+            self.watched = watchedMovies(path, APP_MEMORY_FILE)
+            self._reset_taste()
 
     def _on_analyze_click(self):
         try:
-            self.console_output.configure(state='normal')
-            self.console_output.delete('1.0', tk.END)
+            self.log_sink.clear()
             for w in self.results_scroll.winfo_children(): w.destroy()
             self.current_results.clear()
             self._clear_preview(self.res_poster, self.res_text, self.res_score)
@@ -1037,74 +859,79 @@ class App(ctk.CTk):
 
             print(f"🧠 Understanding mood: \"{mood_text}\" | Context: {ctx.upper()}...")
             
-            # Disable the button while processing
-            self.generate_btn.configure(state="disabled", text="🔄 Thinking...")
+            # Foreground request wins: stop any idle prefetching
+            self._cancel_prefetch()
+            
+            # The button stays live: generating again cancels the query still in flight
+            self.generate_btn.configure(text="🔄 Thinking...")
             self.update_idletasks()
             
-            # Run Gemini call in background to keep UI responsive
-            threading.Thread(target=self._run_gemini_analysis, args=(mood_text, ctx), daemon=True).start()
+            # Gemini + TMDB run as one cancellable coroutine on the network loop
+            trace = profiler.begin('recommend', make_current=False)
+            task = recommend_async(self.net, mood_text, self.watched, self.ai_model, self.ai_columns,
+                                   self.ai_vectorizer, ctx, trace=trace)
+            self.net.submit(task, tag='recommend', post=self.ui_queue.post,
+                            on_done=lambda result: self._on_recommend_done(result, trace),
+                            on_error=self._on_recommend_error)
             
         except Exception as e:
             print(f"Error: {e}")
             print(traceback.format_exc())
             self.generate_btn.configure(state="normal", text="✨ Generate Recommendations")
     
-    def _run_gemini_analysis(self, mood_text, ctx):
-        """Background thread: get genres from Gemini, then fetch TMDB results."""
-        try:
-            genres = get_genres_from_ai(mood_text)
-            
-            if not genres:
-                print("No genres could be determined. Try rephrasing.")
-                self.after(0, lambda: self.generate_btn.configure(state="normal", text="✨ Generate Recommendations"))
-                return
-            
-            print(f"🎬 Searching TMDB for: {', '.join(genres)}")
-            
-            picks = analyze(
-                self.watchedSet_titles, 
-                self.watchedSet_ids, 
-                self.hated_movies,
-                genres, 
-                self.ai_model, 
-                self.ai_columns, 
-                self.ai_vectorizer, 
-                ctx
-            )
-            
-            # Schedule UI updates on the main thread
-            self.after(0, lambda: self._display_results(picks))
-            
-        except Exception as e:
-            print(f"Error: {e}")
-            print(traceback.format_exc())
-            self.after(0, lambda: self.generate_btn.configure(state="normal", text="✨ Generate Recommendations"))
+    def _on_recommend_done(self, result, trace):
+        genres, picks = result
+        if not genres:
+            print("No genres could be determined. Try rephrasing.")
+            profiler.end(trace)
+            self.generate_btn.configure(state="normal", text="✨ Generate Recommendations")
+            return
+        self.query_history.record(genres)
+        # Index what the fetch returned once, here, rather than on every re-render
+        self._index_movies(picks)
+        self._display_results(picks, trace=trace)
+
+    def _on_recommend_error(self, error):
+        print(f"Error: {error}")
+        print("".join(traceback.format_exception(error)))
+        self.generate_btn.configure(state="normal", text="✨ Generate Recommendations")
     
+    def _on_context_change(self, value):
+        """Re-rank the current picks for the new context from their precomputed scores."""
+        if getattr(self, '_last_picks', None):
+            rescore_for_context(self._last_picks, value)
+            print(f"🔁 Re-ranked {len(self._last_picks)} picks for context: {value}")
+            self._display_results(self._last_picks)
+
     def _on_sort_change(self, value):
         """Re-sort and redisplay results when sort toggle changes."""
         if hasattr(self, '_last_picks') and self._last_picks:
             self._display_results(self._last_picks)
 
-    def _display_results(self, picks):
+    def _display_results(self, picks, trace=None):
         """Populate results UI on the main thread."""
+        with profiler.span('display_results', trace=trace):
+            self._render_results(picks)
+        if trace:
+            profiler.end(trace)
+            print(profiler.format_trace(trace))
+        self._schedule_prefetch()
+
+    def _render_results(self, picks):
         self.generate_btn.configure(state="normal", text="✨ Generate Recommendations")
         
-        # Store picks for re-sorting
-        self._last_picks = picks
+        # Store picks for re-sorting; beyond what any sort mode would put near the top, a large pool isn't kept
+        self._last_picks = top_picks_for_any_sort(picks or [], MAX_KEPT_PICKS)
         
         # Clear existing results
         for w in self.results_scroll.winfo_children(): w.destroy()
         self.current_results.clear()
         
         if picks:
-            # Sort based on user's toggle selection
+            # Sort based on user's toggle selection, from the kept picks so a later re-sort shows the same list
             sort_mode = self.sort_var.get()
-            if sort_mode == "AI Prediction":
-                sorted_picks = sorted(picks, key=lambda x: x.get('ai_score', 0), reverse=True)
-                print(f"\nSorted {len(picks)} recommendations by AI Prediction.")
-            else:
-                sorted_picks = sorted(picks, key=lambda x: x.get('vote_average', 0), reverse=True)
-                print(f"\nSorted {len(picks)} recommendations by TMDB Score.")
+            sorted_picks = sort_picks(self._last_picks, sort_mode)
+            print(f"\nSorted {len(picks)} recommendations by {sort_mode}.")
             
             for m in sorted_picks[:30]:
                 year = m['release_date'].split('-')[0] if m.get('release_date') else "N/A"
@@ -1129,6 +956,8 @@ class App(ctk.CTk):
                 
                 if tmdb_avg > 0:
                     badges.append(f"TMDB {tmdb_avg:.1f}")
+                if sort_mode == "Like My Favorites" and m.get('similarity', 0) > 0:
+                    badges.append(f"♥ {m['similarity']:.0%}")
                 
                 if badges:
                     text_label += f"  {'  |  '.join(badges)}"
@@ -1145,27 +974,61 @@ class App(ctk.CTk):
             print("No results found. Try describing your mood differently.")
         
         self.notebook.set('Recommendations')
-        self.console_output.configure(state='disabled')
+
+    def _on_search_typed(self, event=None):
+        """Debounces typing: searches once the entry has been still for SEARCH_DEBOUNCE_MS."""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DEBOUNCE_MS, self._on_tmdb_search)
 
     def _on_tmdb_search(self):
-        q = self.search_entry.get()
-        if not q: return
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+        q = normalize_query(self.search_entry.get())
+        if len(q) < MIN_QUERY_LENGTH:
+            self.net.cancel('search')
+            return
+        
+        # Answer instantly from what we already have, then refine with TMDB if needed
+        local = self.local_catalog.search(q)
+        cached, final = self.search_cache.lookup(q)
+        self._show_search_results(merge_results(cached, local))
+        if final:
+            self.net.cancel('search')
+            return
+        
+        # A newer search cancels this one if it's still waiting on TMDB
+        self.net.submit(self.net.run_blocking(search_movies, q), tag='search', post=self.ui_queue.post,
+                        on_done=lambda res: self._on_search_response(q, res, local), on_error=print)
+
+    def _on_search_response(self, q, response, local):
+        results, total = response
+        self.search_cache.put(q, results, total)
+        self._index_movies(results)
+        if normalize_query(self.search_entry.get()) != q:
+            return  # The user kept typing; a newer search is on its way
+        if not results and not local:
+            print(f"No TMDB matches for '{q}'.")
+        self._show_search_results(merge_results(results, local))
+
+    def _show_search_results(self, res):
+        res = [m for m in res if not self.watched.has_id(m['id'])][:MAX_RESULTS]
+        ids = [m['id'] for m in res]
+        if ids == self._shown_search_ids:
+            return  # Same list; keep the buttons (and any selection) as they are
+        self._shown_search_ids = ids
         for w in self.search_scroll.winfo_children(): w.destroy()
         self.current_search_results.clear()
+        self.selected_search_btn = None
         self._clear_preview(self.log_poster, self.log_text, None)
-        
-        try:
-            print(f"Searching: {q}...")
-            res = requests.get(f"{baseUrl}/search/movie", params={'api_key':key,'query':q}).json().get('results',[])
-            for m in res[:15]:
-                if m['id'] not in self.watchedSet_ids:
-                    year = m['release_date'].split('-')[0] if m.get('release_date') else "N/A"
-                    btn = ctk.CTkButton(self.search_scroll, text=f"{m['title']} ({year})", anchor="w", 
-                                        fg_color=self.COLORS['bg_card_hover'], 
-                                        command=lambda x=m: self._on_result_click(x, "log"))
-                    btn.pack(fill='x', padx=5, pady=2)
-                    self.current_search_results[btn] = m
-        except Exception as e: print(e)
+        for m in res:
+            year = m['release_date'].split('-')[0] if m.get('release_date') else "N/A"
+            btn = ctk.CTkButton(self.search_scroll, text=f"{m['title']} ({year})", anchor="w", 
+                                fg_color=self.COLORS['bg_card_hover'], 
+                                command=lambda x=m: self._on_result_click(x, "log"))
+            btn.pack(fill='x', padx=5, pady=2)
+            self.current_search_results[btn] = m
 
     def _on_result_click(self, movie, mode):
         target_btn = None
@@ -1198,20 +1061,32 @@ class App(ctk.CTk):
         else: poster.configure(image=None, text="No Image")
 
     def _load_img(self, path, label):
-        try:
-            d = requests.get(f"{self.poster_base_url}{path}").content
+        target_w = label.cget("width")
+        cached = self.poster_cache.get((path, target_w))
+        if cached is not None:
+            self.net.cancel(f"poster-{id(label)}")
+            label.configure(image=cached, text="")
+            label.image = cached
+            return
+        
+        def fetch():
+            d = httpCache.get_image(f"{self.poster_base_url}{path}")
             img = Image.open(io.BytesIO(d))
             # Ratio preserve
             w, h = img.size
-            target_w = label.cget("width")
             ratio = target_w / w
-            target_h = int(h * ratio)
-            
-            img.thumbnail((target_w, target_h))
+            img.thumbnail((target_w, int(h * ratio)))
+            return img
+        
+        def show(img):
             c_img = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
+            self.poster_cache.put((path, target_w), c_img)
             label.configure(image=c_img, text="")
             label.image = c_img 
-        except: label.configure(image=None, text="Error")
+        
+        # Download and decode off the Tk thread; clicking another movie cancels this one
+        self.net.submit(self.net.run_blocking(fetch), tag=f"poster-{id(label)}", post=self.ui_queue.post,
+                        on_done=show, on_error=lambda e: label.configure(image=None, text="Error"))
 
     def _update_text(self, w, t):
         w.configure(state='normal')
@@ -1221,6 +1096,7 @@ class App(ctk.CTk):
 
     def _clear_preview(self, l, t, score_label=None):
         l.configure(image=None, text="")
+        l.image = None
         self._update_text(t, "")
         if score_label: score_label.configure(text="Select a movie...")
 
@@ -1278,18 +1154,12 @@ class App(ctk.CTk):
 
     def _process_movie_log(self, m, rating, btn_ref, mode):
         # Prevent double logging
-        if self.watchedSet_ids and m['id'] in self.watchedSet_ids: return
+        if self.watched.has_id(m['id']): return
         
-        # 1. Update in-memory sets instantly
-        title_norm = titleNormalize(m['title'])
-        if self.watchedSet_ids is None: self.watchedSet_ids = set()
-        
-        self.watchedSet_ids.add(m['id'])
-        self.watchedSet_titles.add(title_norm)
-        
-        # Immediate Veto for low ratings!
-        if rating <= 2.5:
-            self.hated_movies.add(title_norm)
+        # 1. Update the watched index instantly (immediate Veto for low ratings!)
+        year = m.get('release_date', 'N/A').split('-')[0]
+        title_norm = self.watched.add(m['title'], movie_id=m['id'], year=year, rating=rating)
+        if title_norm in self.watched.hated:
             print(f"Added {m['title']} to Veto List.")
             
         print(f"Logged '{m['title']}' with {rating} stars.")
@@ -1302,7 +1172,6 @@ class App(ctk.CTk):
             print(f"Failed to save to memory file: {e}")
 
         # 3. Append to Active Watched History for Machine Learning Models
-        year = m.get('release_date', 'N/A').split('-')[0]
         try:
             target_path = self.watched_path if self.watched_path else get_user_data_path('user_data/user_profile.csv')
             
@@ -1321,10 +1190,18 @@ class App(ctk.CTk):
                     f.write('Name,Year,Rating\n')
                     f.write(f'"{m["title"]}",{year},{rating}\n')
                 print(f"Created and saved to new dataset: {target_path}")
+            
+            # Keep the My Taste aggregates in step without rescanning the CSV
+            if self.taste is not None:
+                id_to_genre = {v: k for k, v in GENRE_IDS.items()}
+                self.taste.add(rating, [id_to_genre.get(g) for g in m.get('genre_ids', [])])
+                self.taste.save(TASTE_CACHE_FILE, target_path)
+                self._refresh_taste_chart()
         except Exception as e:
             print(f"Failed to save to watched history CSV: {e}")
 
         # 4. Clean up UI
+        (self.current_results if mode == "res" else self.current_search_results).pop(btn_ref, None)
         btn_ref.destroy()
         if mode == "res":
             self._clear_preview(self.res_poster, self.res_text, self.res_score)
@@ -1341,6 +1218,29 @@ class App(ctk.CTk):
                 self.notebook.set('System Log')
                 self._on_retrain_ai()
 
+    def _on_more_like_this(self, mode):
+        """Shows the selected movie's nearest neighbours from the local index, scored like any result."""
+        if mode == "res":
+            m = self.current_results.get(getattr(self, 'selected_result_btn', None))
+        else:
+            m = self.current_search_results.get(getattr(self, 'selected_search_btn', None))
+        if not m: return
+        if self.similar_index is None:
+            print("Similar-movie index is still loading...")
+            return
+        
+        started = time.perf_counter()
+        neighbours = self.similar_index.similar(m, k=MORE_LIKE_THIS_K, exclude_ids=self.watched.ids)
+        print(f"🧭 {len(neighbours)} movies like '{m['title']}' found locally in {(time.perf_counter() - started) * 1000:.1f} ms.")
+        if not neighbours: return
+        
+        self._cancel_prefetch()
+        # Same filter, scoring and veto as a mood query; replaces any query still in flight
+        self.net.submit(self.net.run_blocking(rank_candidates, neighbours, self.watched, self.ai_model, self.ai_columns,
+                                              self.ai_vectorizer, self.context_var.get()),
+                        tag='recommend', post=self.ui_queue.post,
+                        on_done=self._display_results, on_error=self._on_recommend_error)
+
     def _on_view_details(self):
         if not getattr(self, 'selected_result_btn', None): return
         m = self.current_results.get(self.selected_result_btn)
@@ -1352,45 +1252,52 @@ class App(ctk.CTk):
             return
             
         self.retrain_btn.configure(state="disabled", text="Training...")
-        self.console_output.configure(state='normal')
-        self.console_output.insert(tk.END, "\n--- Initiating Personal AI Retraining Sequence ---\n")
-        self.console_output.see(tk.END)
-        self.console_output.configure(state='disabled')
+        print("\n--- Initiating Personal AI Retraining Sequence ---")
         
         threading.Thread(target=self._run_retraining_thread, daemon=True).start()
         
     def _run_retraining_thread(self):
         features_path = get_user_data_path('user_data/user_profile_features.csv')
         
-        # 1. Feature Engineer
-        print("Extracting NLP Features & Updating Matrix...")
-        success = feature_engineering(input_file=self.watched_path, output_file=features_path, vectorizer_path=VECTORIZER_PATH)
-        
-        if success:
-            # 2. Train Model
-            print("Training Neural Decision Trees...")
-            train_success = train_personal_model(input_file=features_path, model_path=MODEL_PATH, columns_path=COLUMNS_PATH)
-            
-            if train_success:
-                print("✅ Retraining Complete! Reloading Neural Pathways...")
-                # 3. Reload into app memory safely
-                def reload():
-                    self.ai_model, self.ai_columns, self.ai_vectorizer = load_ai_model()
-                    self.retrain_btn.configure(state="normal", text="⚡ Retrain AI Model")
+        def on_stage(stage):
+            if stage == 'features':
+                print("Extracting NLP Features & Updating Matrix...")
+            elif stage == 'train':
+                print("Training Neural Decision Trees...")
+
+        with profiler.request('retrain') as trace:
+            # Stages whose inputs haven't changed since the last run are skipped
+            result = Pipeline(profile_path=self.watched_path, features_path=features_path).run(on_stage=on_stage)
+        if trace:
+            print(profiler.format_trace(trace))
+        
+        if result.success:
+            print("✅ Retraining Complete! Reloading Neural Pathways...")
+            # 3. Load off the Tk thread, then swap the whole (model, columns, vectorizer) in one step
+            if result.model is not None:
+                bundle = (result.model, result.columns, result.vectorizer)
+            else:
+                bundle = load_ai_model()
+            def reload():
+                self.ai_model, self.ai_columns, self.ai_vectorizer = bundle
+                self.retrain_btn.configure(state="normal", text="⚡ Retrain AI Model")
+                if result.promoted is False:
+                    messagebox.showinfo("Model Kept", "The retrained AI scored worse on your latest ratings, so your current model was kept.")
+                else:
                     messagebox.showinfo("Success", "AI successfully retrained on your latest taste profile!")
-                self.after(0, reload)
-                return
+            self.ui_queue.post(reload)
+            return
                 
         # Handle Failure
         def fail():
             print("❌ Retraining failed. Check logs.")
             self.retrain_btn.configure(state="normal", text="⚡ Retrain AI Model")
             messagebox.showerror("Error", "Failed to retrain model. You may need more ratings.")
-        self.after(0, fail)
+        self.ui_queue.post(fail)
 
     # Deprecated in favor of _process_movie_log
 
-# --- 5. Main Execution ---
+# --- 3. Main Execution ---
 
 if __name__ == "__main__":
     if key is None:
@@ -1399,17 +1306,9 @@ if __name__ == "__main__":
         sys.exit()
 
     ctk.set_appearance_mode("dark")
-    w_path = None
-    
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE) as f: w_path = json.load(f).get('watched_path')
-        except: pass
-    
-    if not w_path or not os.path.exists(w_path):
-        w_path = None
+    w_path = load_saved_watched_path()
 
-    t, i, h = watchedMovies(w_path, APP_MEMORY_FILE)
+    watched = watchedMovies(w_path, APP_MEMORY_FILE)
     
-    app = App(w_path, t, i, h)
+    app = App(w_path, watched)
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Offline stand-in for the TMDB v3 API, served from recorded fixtures.
+
+Only the endpoints the app touches are implemented: /search/movie, /movie/{id},
+/movie/{id}/release_dates and /discover/movie. The fixture catalog is expanded
+into numbered "variants" (e.g. "Heat", "Heat 2", "Heat 3", ...) so synthetic
+Letterboxd exports of any size resolve deterministically.
+"""
+import os
+import re
+import json
+import zlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'tmdb_catalog.json')
+VARIANT_ID_STRIDE = 1_000_000
+PAGE_SIZE = 20
+
+
+def load_fixtures(path=FIXTURE_PATH):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def variant_title(title, k):
+    return title if k == 0 else f"{title} {k + 1}"
+
+
+def expand_catalog(fixtures, variants):
+    """Returns the fixture catalog with `variants` numbered copies of every movie."""
+    expanded = []
+    for k in range(variants):
+        for m in fixtures['movies']:
+            movie = dict(m)
+            movie['id'] = m['id'] + k * VARIANT_ID_STRIDE
+            movie['title'] = variant_title(m['title'], k)
+            movie['popularity'] = round(m['popularity'] / (k + 1), 3)
+            expanded.append(movie)
+    return expanded
+
+
+def _norm(text):
+    return re.sub(r'[^a-z0-9]', '', str(text).lower())
+
+
+class FakeTMDB:
+    def __init__(self, variants=50, fixtures=None):
+        self.fixtures = fixtures or load_fixtures()
+        self.genre_ids = self.fixtures['genre_ids']
+        self.movies = expand_catalog(self.fixtures, variants)
+        self.by_id = {m['id']: m for m in self.movies}
+        self.by_title = {_norm(m['title']): m for m in self.movies}
+        self.request_count = 0
+        self._server = None
+        self._thread = None
+
+    # --- Payloads ---
+
+    def _list_entry(self, m):
+        return {
+            'id': m['id'], 'title': m['title'], 'release_date': m['release_date'],
+            'overview': m['overview'], 'vote_average': m['vote_average'], 'vote_count': m['vote_count'],
+            'popularity': m['popularity'], 'poster_path': m['poster_path'],
+            'genre_ids': [self.genre_ids[g] for g in m['genres'] if g in self.genre_ids],
+        }
+
+    def search(self, query):
+        movie = self.by_title.get(_norm(query))
+        if movie is None and query:
+            # Unknown titles still resolve, deterministically, to a catalog entry
+            movie = self.movies[zlib.crc32(query.encode('utf-8')) % len(self.movies)]
+        return {'page': 1, 'results': [self._list_entry(movie)] if movie else [], 'total_results': int(movie is not None)}
+
+    def details(self, movie_id):
+        m = self.by_id.get(movie_id)
+        if m is None:
+            return None
+        return {
+            'id': m['id'], 'title': m['title'], 'overview': m['overview'], 'release_date': m['release_date'],
+            'genres': [{'id': self.genre_ids.get(g, 0), 'name': g} for g in m['genres']],
+            'vote_average': m['vote_average'], 'poster_path': m['poster_path'],
+        }
+
+    def release_dates(self, movie_id):
+        m = self.by_id.get(movie_id)
+        if m is None:
+            return None
+        return {'id': movie_id, 'results': [{'iso_3166_1': 'US', 'release_dates': [{'certification': m['certification']}]}]}
+
+    def discover(self, with_genres, page):
+        wanted = {int(g) for g in re.split(r'[|,]', with_genres) if g.strip().isdigit()} if with_genres else set()
+        pool = [m for m in self.movies if not wanted or wanted & {self.genre_ids.get(g) for g in m['genres']}]
+        pool.sort(key=lambda m: m['popularity'], reverse=True)
+        start = (page - 1) * PAGE_SIZE
+        return {
+            'page': page,
+            'results': [self._list_entry(m) for m in pool[start:start + PAGE_SIZE]],
+            'total_results': len(pool),
+            'total_pages': (len(pool) + PAGE_SIZE - 1) // PAGE_SIZE,
+        }
+
+    def route(self, path, params):
+        """Maps an API path (without the /3 prefix) to a JSON payload, or None for 404."""
+        if path == '/search/movie':
+            return self.search(params.get('query', ''))
+        if path == '/discover/movie':
+            return self.discover(params.get('with_genres', ''), int(params.get('page', 1)))
+        match = re.fullmatch(r'/movie/(\d+)(/release_dates)?', path)
+        if match:
+            movie_id = int(match.group(1))
+            return self.release_dates(movie_id) if match.group(2) else self.details(movie_id)
+        return None
+
+    # --- Server lifecycle ---
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                path = url.path[2:] if url.path.startswith('/3') else url.path
+                fake.request_count += 1
+                payload = fake.route(path, params)
+                body = json.dumps(payload if payload is not None else {'success': False}).encode('utf-8')
+                self.send_response(200 if payload is not None else 404)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/3"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
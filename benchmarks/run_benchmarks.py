@@ -0,0 +1,299 @@
+"""
+Offline benchmark suite for the import, training and recommendation pipeline.
+
+    python benchmarks/run_benchmarks.py                      # 100, 1k and 10k ratings
+    python benchmarks/run_benchmarks.py --sizes 100 --repeat 5
+    python benchmarks/run_benchmarks.py --update-baseline    # store results as the new baseline
+
+Every network call goes to a local fake TMDB server (see fake_tmdb.py), so runs
+are reproducible and need no API keys. Results are written as JSON and compared
+against benchmarks/baseline.json; a benchmark regresses when its median time
+exceeds the baseline by more than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+import io
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+import pandas as pd
+
+from fake_tmdb import FakeTMDB, load_fixtures
+from synthetic import synthetic_ratings, write_ratings_csv
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results.json')
+DEFAULT_SIZES = [100, 1000, 10000]
+CANDIDATE_POOL = 500
+
+
+def _timeit(fn, repeat, setup=None):
+    """Runs fn `repeat` times (setup is excluded from timing) and returns the run times in seconds."""
+    runs = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        t0 = time.perf_counter()
+        fn(*args)
+        runs.append(time.perf_counter() - t0)
+    return runs
+
+
+def _summary(runs, **extra):
+    entry = {
+        'median_s': statistics.median(runs),
+        'min_s': min(runs),
+        'max_s': max(runs),
+        'runs': len(runs),
+    }
+    entry.update(extra)
+    return entry
+
+
+@contextlib.contextmanager
+def _quiet(enabled=True):
+    """Swallows the pipeline's progress prints so they don't skew timings."""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def _import_recommender(workdir):
+    """Imports the headless recommendation core with user data redirected to workdir."""
+    os.environ['APPDATA'] = workdir
+    with _quiet():
+        import recommender
+    return recommender
+
+
+def bench_import(module, workdir, repeat):
+    """Cold `import <module>` time, measured in a fresh interpreter each run."""
+    pythonpath = os.pathsep.join(p for p in (ROOT_DIR, os.environ.get('PYTHONPATH')) if p)
+    env = dict(os.environ, APPDATA=workdir, PYTHONPATH=pythonpath, PYTHONDONTWRITEBYTECODE='1')
+    code = f"import time; t=time.perf_counter(); import {module}; print(time.perf_counter()-t)"
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-c', code], cwd=workdir, env=env,
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {'skipped': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'import failed'}
+        runs.append(float(proc.stdout.strip().splitlines()[-1]))
+    return _summary(runs)
+
+
+def run(sizes, repeat, quiet=True):
+    from data_handling import import_letterboxd
+    from featureEngineering import feature_engineering
+    from modelTrain import train_personal_model
+
+    fixtures = load_fixtures()
+    variants = max(1, -(-max(max(sizes), CANDIDATE_POOL) // len(fixtures['movies'])))
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='mbm_bench_')
+    # Keep anything written relative to the working directory out of the repo
+    old_cwd = os.getcwd()
+    os.chdir(workdir)
+
+    try:
+        with FakeTMDB(variants=variants, fixtures=fixtures) as tmdb:
+            import_letterboxd.BASE_URL = tmdb.base_url
+            import_letterboxd.TMDB_KEY = 'benchmark'
+            core = _import_recommender(workdir)
+            core.baseUrl = tmdb.base_url
+            core.key = 'benchmark'
+
+            for n in sizes:
+                print(f"== {n} ratings ==")
+                size_dir = os.path.join(workdir, str(n))
+                os.makedirs(size_dir, exist_ok=True)
+                rows = synthetic_ratings(n)
+                ratings_csv = write_ratings_csv(rows, os.path.join(size_dir, 'ratings.csv'))
+                profile_csv = os.path.join(size_dir, 'user_profile.csv')
+                features_csv = os.path.join(size_dir, 'user_profile_features.csv')
+                vectorizer_path = os.path.join(size_dir, 'models', 'summary_vectorizer.pkl')
+                model_path = os.path.join(size_dir, 'models', 'personal_ai_model.pkl')
+                columns_path = os.path.join(size_dir, 'models', 'model_columns.pkl')
+
+                # 1. Hydration against the fake server (one run: it is network-bound and slow at 10k)
+                base_df = pd.read_csv(ratings_csv)
+                hydrated = {}
+                def hydrate(df):
+                    with _quiet(quiet):
+                        hydrated['df'] = import_letterboxd.hydrate_with_tmdb(df)
+                before = tmdb.request_count
+                runs = _timeit(hydrate, 1, setup=lambda: (base_df.copy(),))
+                results[f"hydrate_with_tmdb/{n}"] = _summary(runs, http_requests=tmdb.request_count - before)
+                hydrated['df'].to_csv(profile_csv, index=False)
+                print(f"  hydrate_with_tmdb      {runs[0]:.3f}s")
+
+                # 2. Feature engineering
+                def features():
+                    with _quiet(quiet):
+                        assert feature_engineering(input_file=profile_csv, output_file=features_csv,
+                                                   vectorizer_path=vectorizer_path)
+                runs = _timeit(features, repeat)
+                results[f"feature_engineering/{n}"] = _summary(runs)
+                print(f"  feature_engineering    {statistics.median(runs):.3f}s")
+
+                # 3. Training
+                def train():
+                    with _quiet(quiet):
+                        assert train_personal_model(input_file=features_csv, model_path=model_path,
+                                                    columns_path=columns_path)
+                runs = _timeit(train, repeat)
+                results[f"train_personal_model/{n}"] = _summary(runs)
+                print(f"  train_personal_model   {statistics.median(runs):.3f}s")
+
+                # 4. Loading the watched history
+                memory_path = os.path.join(size_dir, 'app_memory_ids.csv')
+                def watched():
+                    with _quiet(quiet):
+                        return core.watchedMovies(ratings_csv, memory_path)
+                runs = _timeit(watched, repeat)
+                results[f"watchedMovies/{n}"] = _summary(runs)
+                print(f"  watchedMovies          {statistics.median(runs):.3f}s")
+
+                # 5. Scoring: predict_score over a candidate pool, then the full analyze() path
+                import joblib
+                model, columns, vectorizer = (joblib.load(model_path), joblib.load(columns_path),
+                                              joblib.load(vectorizer_path))
+                candidates = tmdb.movies[:CANDIDATE_POOL]
+                def score_pool():
+                    for m in candidates:
+                        core.predict_score(model, columns, vectorizer, m['genres'], 'Alone', m['overview'])
+                runs = _timeit(score_pool, repeat)
+                results[f"predict_score/{n}"] = _summary(runs, candidates=len(candidates))
+                print(f"  predict_score          {statistics.median(runs):.3f}s  ({len(candidates)} candidates)")
+
+                genre_lists = [m['genres'] for m in candidates]
+                overviews = [m['overview'] for m in candidates]
+                def score_batch():
+                    core.predict_scores_all_contexts(model, columns, vectorizer, genre_lists, overviews)
+                runs = _timeit(score_batch, repeat)
+                results[f"predict_scores_all_contexts/{n}"] = _summary(runs, candidates=len(candidates))
+                print(f"  predict_scores_all_contexts {statistics.median(runs):.3f}s  ({len(candidates)} candidates)")
+
+                # Cascade: linear prefilter + forest on its shortlist vs the forest on the whole pool
+                from cascade import LinearPrefilter, compare as compare_cascade
+                from modelTrain import split_features
+                X_train, y_train = split_features(pd.read_csv(features_csv))
+                prefilter = LinearPrefilter.fit(X_train[columns], y_train)
+                X_pool = core._candidate_matrix(columns, vectorizer, genre_lists, overviews)
+                forest = lambda rows: core.predict_scores_all_contexts(model, columns, vectorizer, None, None, X=rows)[0]
+                reports = [compare_cascade(forest, prefilter, X_pool) for _ in range(repeat)]
+                results[f"cascade/{n}"] = _summary([r['cascade_ms'] / 1000 for r in reports],
+                                                   candidates=len(candidates), shortlist=reports[0]['shortlist'],
+                                                   recall_at_30=reports[0]['recall@30'],
+                                                   full_median_s=statistics.median(r['full_ms'] / 1000 for r in reports))
+                print(f"  cascade                {results[f'cascade/{n}']['median_s']:.3f}s  "
+                      f"(full {results[f'cascade/{n}']['full_median_s']:.3f}s, Recall@30 {reports[0]['recall@30']:.2f})")
+
+                index = watched()
+                genres = ['Drama', 'Thriller', 'Science Fiction']
+                def recommend():
+                    with _quiet(quiet):
+                        return core.analyze(index, genres, model, columns, vectorizer, 'Alone')
+                # Cold: every run refetches and rescores; warm: served from the query caches
+                runs = _timeit(recommend, repeat, setup=lambda: core.clear_caches() or ())
+                results[f"analyze/{n}"] = _summary(runs)
+                print(f"  analyze                {statistics.median(runs):.3f}s")
+                recommend()
+                runs = _timeit(recommend, repeat)
+                results[f"analyze_warm/{n}"] = _summary(runs)
+                print(f"  analyze (warm cache)   {statistics.median(runs):.3f}s")
+
+            print("== import time ==")
+            for module in ('recommender', 'app'):
+                results[f"{module}_import"] = entry = bench_import(module, workdir, repeat)
+                shown = f"{entry['median_s']:.3f}s" if 'median_s' in entry else f"skipped ({entry['skipped']})"
+                print(f"  {module + '_import':<22} {shown}")
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Returns {benchmark: {'baseline_s', 'current_s', 'ratio', 'regressed'}} for benchmarks present in both."""
+    comparison = {}
+    for name, entry in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base or 'median_s' not in entry or 'median_s' not in base:
+            continue
+        ratio = entry['median_s'] / base['median_s'] if base['median_s'] > 0 else float('inf')
+        comparison[name] = {
+            'baseline_s': base['median_s'],
+            'current_s': entry['median_s'],
+            'ratio': round(ratio, 3),
+            'regressed': ratio > 1 + tolerance,
+        }
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the MBM recommender pipeline.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Synthetic export sizes (ratings).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark (median is reported).")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write the results JSON.")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline JSON to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown before flagging (0.25 = 25%%).")
+    parser.add_argument('--update-baseline', action='store_true', help="Overwrite the baseline with these results.")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit with status 1 if anything regressed.")
+    parser.add_argument('--verbose', action='store_true', help="Show the pipeline's own output.")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, quiet=not args.verbose)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': args.sizes,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['comparison'] = compare(results, baseline, args.tolerance)
+        print("\n--- Comparison vs baseline ---")
+        for name, c in sorted(report['comparison'].items()):
+            flag = "  ❌ REGRESSION" if c['regressed'] else ""
+            print(f"{name:<32} {c['baseline_s']:>9.3f}s -> {c['current_s']:>9.3f}s  x{c['ratio']:.2f}{flag}")
+            if c['regressed']:
+                regressions.append(name)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results saved to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline updated: {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,7 +17,7 @@ a = Analysis(
     datas=[
         ('.env', '.'), # Ensure TMDB key is packaged
     ],
-    hiddenimports=['requests_cache', 'requests_cache.backends.sqlite'],
+    hiddenimports=['google.generativeai', 'matplotlib.backends.backend_agg'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,100 @@
+"""
+Two-stage scoring for large candidate pools.
+
+The forest costs about the same for every candidate, and in a pool of thousands
+most of that goes to movies that never come near the 30 on screen. A ridge
+regression over the same feature columns is fitted alongside the forest and
+saved in its bundle. It scores the whole pool with one matrix-vector product,
+and only its top SHORTLIST go on to the forest. A context column only shifts a
+linear model's output by a constant, so one shortlist serves every context.
+
+Movies cut at the first stage keep the linear estimate, capped at the lowest
+forest score on the shortlist so they always rank after it.
+
+Today no pool gets that large: discover returns 2 pages (about 40 movies) and
+"More like this" 40 neighbours, so score_candidates never reaches
+CASCADE_MIN_POOL and the forest scores everything. The cascade is exercised by
+the benchmarks (run_benchmarks.py, pools of thousands) and takes over on its own
+once a caller passes a larger pool.
+"""
+import time
+
+import numpy as np
+from sklearn.linear_model import Ridge
+
+# Below this many unscored candidates the forest just scores all of them (every app pool, for now)
+CASCADE_MIN_POOL = 300
+SHORTLIST = 120
+SHOWN = 30
+RIDGE_ALPHA = 1.0
+
+
+class LinearPrefilter:
+    def __init__(self, coef, intercept):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+
+    @classmethod
+    def fit(cls, X, y, alpha=RIDGE_ALPHA):
+        ridge = Ridge(alpha=alpha).fit(np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        return cls(ridge.coef_, ridge.intercept_)
+
+    def score(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+
+    def context_offsets(self, columns):
+        """{context: score shift} for the model's context_* columns."""
+        return {c[len('context_'):]: float(self.coef[i]) for i, c in enumerate(columns) if c.startswith('context_')}
+
+    def shortlist(self, X, k=SHORTLIST):
+        """(linear scores, positions of the top k), the positions in score order."""
+        scores = self.score(X)
+        k = min(k, len(scores))
+        keep = np.argpartition(-scores, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+        return scores, keep[np.argsort(-scores[keep], kind='stable')]
+
+    # --- Bundle storage ---
+
+    def to_arrays(self):
+        return {'prefilter_coef': self.coef, 'prefilter_intercept': np.array([self.intercept])}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuilds the prefilter from a bundle's arrays, or returns None if it has none."""
+        if 'prefilter_coef' not in arrays:
+            return None
+        return cls(arrays['prefilter_coef'], arrays['prefilter_intercept'][0])
+
+
+def recall_at_k(full_scores, kept, k=SHOWN):
+    """Share of the top k under full scoring that survived the first stage."""
+    top = np.argsort(-np.asarray(full_scores), kind='stable')[:k]
+    return float(np.isin(top, kept).mean()) if len(top) else 1.0
+
+
+def compare(predict, prefilter, X, k=SHOWN, shortlist=SHORTLIST):
+    """
+    Runs full scoring and the cascade on the same pool. predict(X) is the forest
+    stage. Returns recall@k of the cascade against full scoring and both latencies.
+    """
+    started = time.perf_counter()
+    full = predict(X)
+    full_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    _, keep = prefilter.shortlist(X, shortlist)
+    predict(X[keep])
+    cascade_ms = (time.perf_counter() - started) * 1000
+    return {
+        'pool': int(len(X)),
+        'shortlist': int(len(keep)),
+        f'recall@{k}': recall_at_k(full, keep, k),
+        'full_ms': full_ms,
+        'cascade_ms': cascade_ms,
+        'saved_ms': full_ms - cascade_ms,
+    }
+
+
+def format_comparison(report, k=SHOWN):
+    return (f"🪜 Cascade: forest on {report['shortlist']} of {report['pool']} candidates, "
+            f"Recall@{k} {report[f'recall@{k}']:.2f}, {report['cascade_ms']:.0f} ms vs "
+            f"{report['full_ms']:.0f} ms ({report['saved_ms']:.0f} ms saved)")
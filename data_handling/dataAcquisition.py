@@ -2,7 +2,6 @@ import pandas as pd
 import requests
 from dotenv import load_dotenv
 import os
-import re
 from tqdm import tqdm   
 
 load_dotenv()
@@ -70,11 +69,6 @@ def createCSV():
     print(f"Created 'dataset/V2ModelTrain1.0.csv' with your headers.")
     migrate()
 
-def titleNormalize(title):
-    title = title.lower()
-    title = re.sub(r'[^a-z0-9]', '', title)
-    return title
-
 def get_us_certification(movie_id):
     if pd.isna(movie_id):
         return "NR"
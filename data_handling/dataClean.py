@@ -1,59 +1,96 @@
+import os
+import re
+import numpy as np
 import pandas as pd
 
-INPUT_FILE = '../dataset/V2ModelTrain.csv'
-OUTPUT_FILE = '../dataset/V2ModelTrain_Cleaned.csv'
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dataset')
+INPUT_FILE = os.path.join(DATASET_DIR, 'V2ModelTrain.csv')
+OUTPUT_FILE = os.path.join(DATASET_DIR, 'V2ModelTrain_Cleaned.csv')
 
-def clean_data():
-    print(f"Reading {INPUT_FILE}...")
-    try:
-        df = pd.read_csv(INPUT_FILE)
-    except FileNotFoundError:
-        print(f"Error: Could not find {INPUT_FILE}")
-        return
-    initial_count = len(df)
+# --- Cleaning rules ---
+# Checked top to bottom; the first rule with a keyword found in the (lowercased)
+# text wins. Add a row here to add a rule.
+CONTEXT_RULES = [
+    ('Alone',   ['alone']),
+    ('Friends', ['friend']),
+    ('Family',  ['family', 'parent', 'sibling']),
+    ('Partner', ['partner', 'date', 'wife', 'husband']),
+]
+CONTEXT_MISSING = 'Unknown'
+CONTEXT_DEFAULT = 'Other'
+
+# Applied only to unrated ("NR") movies, matched against their genre tags
+PG_RATING_RULES = [
+    ('PG',    ['family', 'animation']),
+    ('R',     ['horror', 'crime', 'thriller']),
+    ('PG-13', ['action', 'adventure']),
+]
+UNRATED = 'NR'
+
+def _keyword_masks(text, rules):
+    """One boolean mask per rule: does the text contain any of the rule's keywords?"""
+    return [text.str.contains('|'.join(re.escape(k) for k in keywords), regex=True).to_numpy(dtype=bool)
+            for _, keywords in rules]
+
+def categorize_context(series):
+    """Vectorized 'with_whom' standardization using CONTEXT_RULES."""
+    missing = series.isna().to_numpy()
+    text = series.astype(str).str.lower()
+    conds = [missing] + _keyword_masks(text, CONTEXT_RULES)
+    choices = [CONTEXT_MISSING] + [label for label, _ in CONTEXT_RULES]
+    return pd.Series(np.select(conds, choices, default=CONTEXT_DEFAULT), index=series.index)
+
+def impute_pg_rating(ratings, tags):
+    """Vectorized guess of a PG rating from genre tags for unrated movies, using PG_RATING_RULES."""
+    unrated = (ratings.isna() | (ratings == UNRATED)).to_numpy()
+    text = tags.astype(str).str.lower()
+    conds = [unrated & mask for mask in _keyword_masks(text, PG_RATING_RULES)] + [unrated]
+    choices = [label for label, _ in PG_RATING_RULES] + [UNRATED]
+    return pd.Series(np.select(conds, choices, default=ratings.astype(object).to_numpy()), index=ratings.index)
+
+def _clean_frame(df):
     df = df.dropna(subset=['movie_id', 'title'])
-    print(f"Dropped {initial_count - len(df)} rows with missing IDs or titles.")
     df['movie_id'] = df['movie_id'].astype('Int64')
     df['year'] = df['year'].astype('Int64')
     df['summary'] = df['summary'].fillna("No summary available")
     df['tag'] = df['tag'].fillna("Unknown")
-    df['pg_rating'] = df['pg_rating'].fillna("NR")
-    def categorize_context(text):
-        if pd.isna(text):
-            return "Unknown"
-        text = str(text).lower()
-        if 'alone' in text:
-            return 'Alone'
-        elif 'friend' in text:
-            return 'Friends'
-        elif 'family' in text or 'parent' in text or 'sibling' in text:
-            return 'Family'
-        elif 'partner' in text or 'date' in text or 'wife' in text or 'husband' in text:
-            return 'Partner'
-        else:
-            return 'Other'
+    df['pg_rating'] = df['pg_rating'].fillna(UNRATED)
     df['with_whom_original'] = df['with_whom']
-    df['with_whom'] = df['with_whom'].apply(categorize_context)
+    df['with_whom'] = categorize_context(df['with_whom'])
+    df['pg_rating'] = impute_pg_rating(df['pg_rating'], df['tag'])
+    return df
+
+def clean_data(input_file=INPUT_FILE, output_file=OUTPUT_FILE, chunksize=None):
+    print(f"Reading {input_file}...")
+    try:
+        reader = pd.read_csv(input_file, chunksize=chunksize) if chunksize else [pd.read_csv(input_file)]
+        initial_count, kept, preview = 0, 0, None
+        os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            # Each chunk is cleaned independently and appended, so memory stays bounded by chunksize
+            for i, chunk in enumerate(reader):
+                initial_count += len(chunk)
+                cleaned = _clean_frame(chunk)
+                cleaned.to_csv(f, header=(i == 0), index=False)
+                kept += len(cleaned)
+                if preview is None:
+                    preview = cleaned[['title', 'year', 'with_whom', 'pg_rating']].head()
+    except FileNotFoundError:
+        print(f"Error: Could not find {input_file}")
+        return False
+    print(f"Dropped {initial_count - kept} rows with missing IDs or titles.")
     print("Standardized 'with_whom' column.")
-    def impute_rating(row):
-        rating = row['pg_rating']
-        tags = str(row['tag']).lower()
-        if rating == "NR" or pd.isna(rating):
-            if 'family' in tags or 'animation' in tags:
-                return 'PG'
-            elif 'horror' in tags or 'crime' in tags or 'thriller' in tags:
-                return 'R'
-            elif 'action' in tags or 'adventure' in tags:
-                return 'PG-13'
-            else:
-                return 'NR'
-        return rating
-    df['pg_rating'] = df.apply(impute_rating, axis=1)
     print("Imputed missing PG ratings based on genres.")
-    df.to_csv(OUTPUT_FILE, index=False)
-    print(f"✅ Success! Cleaned data saved to '{OUTPUT_FILE}'")
+    print(f"✅ Success! Cleaned data saved to '{output_file}'")
     print("\n--- Preview of Cleaned Data ---")
-    print(df[['title', 'year', 'with_whom', 'pg_rating']].head())
+    print(preview)
+    return True
 
 if __name__ == "__main__":
-    clean_data()
\ No newline at end of file
+    import sys
+    if len(sys.argv) > 2:
+        clean_data(sys.argv[1], sys.argv[2])
+    elif len(sys.argv) > 1:
+        clean_data(sys.argv[1])
+    else:
+        clean_data()
@@ -1,42 +1,86 @@
 import os
 import zipfile
 import pandas as pd
-import requests
+import sys
 from dotenv import load_dotenv
-import re
 from tqdm import tqdm
 
-env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+import httpCache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+env_path = os.path.join(ROOT_DIR, '.env')
 load_dotenv(dotenv_path=env_path)
 
 TMDB_KEY = os.getenv('TMDB_key')
 BASE_URL = "https://api.themoviedb.org/3"
 
-def titleNormalize(title):
-    title = str(title).lower()
-    title = re.sub(r'[^a-z0-9]', '', title)
-    return title
+# Members merged into the profile, in order of precedence: ratings.csv is the source
+# of truth for ratings, watched.csv adds films that were never rated, diary.csv fills gaps
+EXPORT_MEMBERS = ('ratings.csv', 'watched.csv', 'diary.csv')
+EXPORT_COLUMNS = ['Date', 'Name', 'Year', 'Letterboxd URI', 'Rating']
+# diary.csv's URI points at the diary entry, not the film, and its date is the log date
+DIARY_COLUMNS = {'Watched Date': 'Date', 'Name': 'Name', 'Year': 'Year', 'Rating': 'Rating'}
+READ_CHUNKSIZE = 5000
+
+def _export_members(zip_ref):
+    """Maps each wanted file name to its zip entry, preferring the export's top level over subfolders."""
+    members = {}
+    for info in zip_ref.infolist():
+        name = info.filename.rsplit('/', 1)[-1]
+        if name in EXPORT_MEMBERS:
+            if name not in members or info.filename.count('/') < members[name].filename.count('/'):
+                members[name] = info
+    return members
 
-def extract_letterboxd_zip(zip_path, extract_to_dir="dataset/temp_letterboxd"):
-    if not os.path.exists(extract_to_dir):
-        os.makedirs(extract_to_dir)
-    print(f"Extracting {zip_path}...")
+def _read_member(zip_ref, info, columns):
+    """Streams one CSV member in chunks, parsing only `columns` (renamed via a dict)."""
+    wanted = columns if isinstance(columns, dict) else {c: c for c in columns}
+    with zip_ref.open(info) as raw:
+        for chunk in pd.read_csv(raw, usecols=lambda c: c.strip() in wanted, chunksize=READ_CHUNKSIZE,
+                                 encoding='utf-8-sig'):
+            chunk.columns = [wanted[c.strip()] for c in chunk.columns]
+            yield chunk
+
+def read_letterboxd_zip(zip_path):
+    """
+    Reads ratings, watched and diary straight from the export zip (no extraction) and
+    merges them into one row per film (Name + Year). Returns a DataFrame with
+    EXPORT_COLUMNS, rated films first, or None if the zip has no ratings.csv.
+    """
+    print(f"Reading {zip_path}...")
     try:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            target_files = ['ratings.csv', 'watched.csv']
-            extracted = []
-            for file_info in zip_ref.infolist():
-                if any(file_info.filename.endswith(t) for t in target_files):
-                    zip_ref.extract(file_info, extract_to_dir)
-                    extracted.append(os.path.join(extract_to_dir, file_info.filename))
-            print(f"Successfully extracted: {[os.path.basename(f) for f in extracted]}")
-            return extracted
+            members = _export_members(zip_ref)
+            if 'ratings.csv' not in members:
+                print("Error: Could not find ratings.csv in the zip file. The ML model requires ratings to train.")
+                return None
+            frames = []
+            for name in EXPORT_MEMBERS:
+                if name not in members:
+                    continue
+                columns = DIARY_COLUMNS if name == 'diary.csv' else EXPORT_COLUMNS
+                chunks = [c.reindex(columns=EXPORT_COLUMNS).assign(Source=name)
+                          for c in _read_member(zip_ref, members[name], columns)]
+                frames.append((name, chunks))
     except zipfile.BadZipFile:
         print("Error: The provided file is not a valid zip archive.")
-        return []
+        return None
     except Exception as e:
-        print(f"Error extracting zip: {e}")
-        return []
+        print(f"Error reading zip: {e}")
+        return None
+
+    chunks = [c for _, member_chunks in frames for c in member_chunks]
+    films = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=EXPORT_COLUMNS + ['Source'])
+    films = films.dropna(subset=['Name'])
+    films['Year'] = pd.to_numeric(films['Year'], errors='coerce').astype('Int64')
+    new = films.drop_duplicates(['Name', 'Year'])['Source'].value_counts()
+    for name, _ in frames:
+        print(f"Read {name}: {new.get(name, 0)} new films")
+    # Members were concatenated in precedence order, so first() keeps ratings.csv's values
+    df = films.groupby(['Name', 'Year'], sort=False, dropna=False).first().reset_index()[EXPORT_COLUMNS]
+    print(f"{df['Rating'].notna().sum()} rated and {df['Rating'].isna().sum()} watched-only films.")
+    return df
 
 def hydrate_with_tmdb(df, progress_callback=None):
     print("Hydrating dataset with TMDB metadata (this may take a few minutes)...")
@@ -61,13 +105,13 @@ def hydrate_with_tmdb(df, progress_callback=None):
             params = {"api_key": TMDB_KEY, "query": title}
             if not pd.isna(year):
                 params["year"] = int(year)
-            response = requests.get(search_url, params=params).json()
+            response = httpCache.get_json(search_url, params=params) or {}
             if response.get("results"):
                 movie = response["results"][0]  
                 movie_id = movie["id"]
                 details_url = f"{BASE_URL}/movie/{movie_id}"
                 details_params = {"api_key": TMDB_KEY}
-                details = requests.get(details_url, params=details_params).json()
+                details = httpCache.get_json(details_url, params=details_params) or {}
                 overview = details.get("overview", "")
                 genres = [g["name"] for g in details.get("genres", [])]
                 df.at[index, "movie_id"] = movie_id
@@ -77,19 +121,20 @@ def hydrate_with_tmdb(df, progress_callback=None):
             pass
     return df
 
-def process_letterboxd_import(zip_path, output_csv_path="dataset/user_profile.csv", progress_callback=None):
+def load_letterboxd_export(zip_path, progress_callback=None):
+    """Reads and hydrates the export's films. Returns the DataFrame, or None on failure."""
     if not TMDB_KEY:
         print("Error: TMDB_key not found in .env. Cannot hydrate data.")
+        return None
+    df = read_letterboxd_zip(zip_path)
+    if df is None:
+        return None
+    return hydrate_with_tmdb(df, progress_callback=progress_callback)
+
+def process_letterboxd_import(zip_path, output_csv_path="dataset/user_profile.csv", progress_callback=None):
+    hydrated_df = load_letterboxd_export(zip_path, progress_callback=progress_callback)
+    if hydrated_df is None:
         return False
-    extracted_files = extract_letterboxd_zip(zip_path)
-    ratings_file = next((f for f in extracted_files if f.endswith('ratings.csv')), None)
-    if not ratings_file:
-         print("Error: Could not find ratings.csv in the zip file. The ML model requires ratings to train.")
-         return False
-    print(f"Loading {ratings_file}...")
-    df = pd.read_csv(ratings_file)
-    df.columns = [c.strip() for c in df.columns]
-    hydrated_df = hydrate_with_tmdb(df, progress_callback=progress_callback)
     os.makedirs(os.path.dirname(output_csv_path), exist_ok=True)
     hydrated_df.to_csv(output_csv_path, index=False)
     print(f"\n✅ Success! Fully hydrated user profile saved to {output_csv_path}")
@@ -97,9 +142,8 @@ def process_letterboxd_import(zip_path, output_csv_path="dataset/user_profile.cs
     return True
 
 if __name__ == "__main__":
-    import sys
     if len(sys.argv) > 1:
         zip_file = sys.argv[1]
         process_letterboxd_import(zip_file)
     else:
-        print("Usage: python import_letterboxd.py path/to/letterboxd-export.zip")
+        print("Usage: python -m data_handling.import_letterboxd path/to/letterboxd-export.zip")
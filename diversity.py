@@ -0,0 +1,70 @@
+"""
+Maximal-marginal-relevance re-ranking, so the top of the list isn't one franchise.
+
+Each step picks the candidate with the best  λ·relevance − (1−λ)·(max similarity to
+anything already picked). The max-similarity column is updated in place with one
+matrix-vector product per pick, so choosing k of n costs k products rather than a
+k×n Python loop. Movie vectors (annIndex's stateless embedding) are cached by id,
+which keeps re-sorting the same pool cheap.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from annIndex import embed_movies, genre_columns
+
+MMR_LAMBDA = 0.7
+MMR_TOP = 30
+VECTOR_CACHE_SIZE = 20000
+
+_cache = OrderedDict()   # movie id -> vector
+_cache_lock = threading.Lock()
+
+
+def mmr_order(relevance, vectors, k=MMR_TOP, lam=MMR_LAMBDA):
+    """Indices of the first k picks by MMR. vectors must be unit rows; relevance in [0, 1]."""
+    n = len(relevance)
+    k = min(k, n)
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+    relevance = np.asarray(relevance, dtype=np.float64)
+    max_sim = np.zeros(n)
+    chosen = np.zeros(n, dtype=bool)
+    order = np.empty(k, dtype=np.int64)
+    for step in range(k):
+        gain = lam * relevance - (1 - lam) * max_sim
+        gain[chosen] = -np.inf
+        best = int(np.argmax(gain))
+        order[step] = best
+        chosen[best] = True
+        np.maximum(max_sim, vectors @ vectors[best], out=max_sim)
+    return order
+
+
+def movie_vectors(movies, genre_ids):
+    with _cache_lock:
+        missing = [m for m in movies if m['id'] not in _cache]
+    if missing:
+        vectors = embed_movies(missing, genre_columns(genre_ids))
+        with _cache_lock:
+            for m, v in zip(missing, vectors):
+                _cache[m['id']] = v
+            while len(_cache) > VECTOR_CACHE_SIZE:
+                _cache.popitem(last=False)
+    with _cache_lock:
+        return np.vstack([_cache[m['id']] for m in movies]) if movies else np.zeros((0, 0), dtype=np.float32)
+
+
+def diversify(picks, relevance, genre_ids, k=MMR_TOP, lam=MMR_LAMBDA):
+    """Returns picks with the MMR selection first, then the rest in relevance order."""
+    if not picks:
+        return []
+    relevance = np.asarray(relevance, dtype=np.float64)
+    span = relevance.max() - relevance.min()
+    relevance = (relevance - relevance.min()) / span if span > 0 else np.ones(len(picks))
+    head = mmr_order(relevance, movie_vectors(picks, genre_ids), k, lam)
+    rest = np.setdiff1d(np.argsort(-relevance, kind='stable'), head, assume_unique=True)
+    # setdiff1d sorts its output; restore relevance order for the tail
+    rest = rest[np.argsort(-relevance[rest], kind='stable')]
+    return [picks[i] for i in np.concatenate([head, rest])]
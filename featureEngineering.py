@@ -1,49 +1,194 @@
 import pandas as pd
+import numpy as np
 import joblib
 import os
+from collections import Counter
 from sklearn.preprocessing import MultiLabelBinarizer
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
 
-def feature_engineering(input_file='dataset/user_profile.csv', 
-                        output_file='dataset/user_profile_features.csv', 
-                        vectorizer_path='models/summary_vectorizer.pkl'):
-    print(f"Reading {input_file}...")
+from textFeatures import HashedTextFeaturizer
+
+MAX_SUMMARY_FEATURES = 100
+DEFAULT_CHUNKSIZE = 5000
+# Profiles bigger than this are processed chunk by chunk so peak memory stays flat
+LARGE_FILE_BYTES = 20 * 1024 * 1024
+DROP_COLS = ['Name', 'Title', 'Date', 'Letterboxd URI', 'genres', 'overview', 'tag_list', 'Year']
+# 'tfidf' learns a vocabulary per retrain; 'hashing' gives fixed, vocabulary-free summary columns
+TEXT_FEATURES = os.getenv('MBM_TEXT_FEATURES', 'tfidf')
+
+def auto_chunksize(path):
+    """Returns DEFAULT_CHUNKSIZE for large files, None (read everything at once) otherwise."""
     try:
-        df = pd.read_csv(input_file)
-    except FileNotFoundError:
-        print(f"File not found: {input_file}. Please import your Letterboxd data first.")
-        return False
-    if 'Rating' not in df.columns:
-         print("Error: 'Rating' column missing. Models need user ratings to train.")
-         return False
+        return DEFAULT_CHUNKSIZE if os.path.getsize(path) > LARGE_FILE_BYTES else None
+    except OSError:
+        return None
+
+def _split_genres(x):
+    return [t.strip() for t in str(x).split(',') if t.strip()]
+
+def _prepare(df):
+    # Watched-but-unrated films are in the profile too; only rated ones are training rows
+    df = df[pd.to_numeric(df['Rating'], errors='coerce').notna()]
     df = df.rename(columns={'Rating': 'user_rating'})
-    print("Encoding Genres...")
     df['genres'] = df['genres'].fillna("")
-    df['tag_list'] = df['genres'].apply(lambda x: [t.strip() for t in str(x).split(',') if t.strip()])
-    mlb = MultiLabelBinarizer()
-    genre_matrix = mlb.fit_transform(df['tag_list'])
-    if len(mlb.classes_) > 0:
-        genre_df = pd.DataFrame(genre_matrix, columns=[f"genre_{g}" for g in mlb.classes_])
-        df = pd.concat([df, genre_df], axis=1)
-    print("Encoding Summaries (Reading the Plots)...")
     df['overview'] = df['overview'].fillna("")
-    tfidf = TfidfVectorizer(max_features=100, stop_words='english')
+    return df
+
+def _encode_frame(df, genre_classes, tfidf):
+    """Turns prepared rows into the model's feature layout using already-fitted encoders."""
+    parts = [df]
+    if len(genre_classes) > 0:
+        mlb = MultiLabelBinarizer(classes=list(genre_classes))
+        mlb.fit([])
+        genre_matrix = mlb.transform(df['genres'].map(_split_genres))
+        parts.append(pd.DataFrame(genre_matrix, columns=[f"genre_{g}" for g in genre_classes], index=df.index))
+    if tfidf is not None:
+        tfidf_matrix = tfidf.transform(df['overview'])
+        parts.append(pd.DataFrame(tfidf_matrix.toarray(), columns=[f"summary_{w}" for w in tfidf.get_feature_names_out()], index=df.index))
+    df = pd.concat(parts, axis=1)
+    drop_cols = [c for c in DROP_COLS if c in df.columns]
+    final_df = df.drop(columns=drop_cols)
+    cols = [c for c in final_df.columns if c != 'user_rating'] + ['user_rating']
+    return final_df[cols].fillna(0)
+
+def _fit_tfidf_streaming(overview_chunks, max_features=MAX_SUMMARY_FEATURES):
+    """
+    Fits the same vocabulary and IDF weights as TfidfVectorizer(max_features, stop_words='english')
+    from an iterator of text chunks, holding only term counts in memory.
+    """
+    analyzer = CountVectorizer(stop_words='english').build_analyzer()
+    term_freq, doc_freq = Counter(), Counter()
+    n_docs = 0
+    for chunk in overview_chunks:
+        for text in chunk:
+            tokens = analyzer(text)
+            term_freq.update(tokens)
+            doc_freq.update(set(tokens))
+            n_docs += 1
+    if not term_freq:
+        return None
+    # Same selection rule (and tie-breaking) as TfidfVectorizer's max_features
+    terms = sorted(term_freq)
+    tfs = np.array([term_freq[t] for t in terms])
+    vocab = sorted(terms[i] for i in (-tfs).argsort()[:max_features])
+    idf = np.array([np.log((1 + n_docs) / (1 + doc_freq[t])) + 1 for t in vocab])
+    tfidf = TfidfVectorizer(max_features=max_features, stop_words='english', vocabulary=vocab)
+    tfidf.fit([""])
+    tfidf.idf_ = idf
+    return tfidf
+
+def _fit_hashing_streaming(overview_chunks):
+    featurizer = HashedTextFeaturizer(n_jobs=-1)
+    for chunk in overview_chunks:
+        featurizer.partial_fit(chunk)
+    return featurizer
+
+def _fit_tfidf(overviews, vectorizer_path):
+    tfidf = TfidfVectorizer(max_features=MAX_SUMMARY_FEATURES, stop_words='english')
     try:
-        tfidf_matrix = tfidf.fit_transform(df['overview'])
+        tfidf.fit(overviews)
         if len(tfidf.get_feature_names_out()) > 0:
-            tfidf_df = pd.DataFrame(tfidf_matrix.toarray(), columns=[f"summary_{w}" for w in tfidf.get_feature_names_out()])
-            df = pd.concat([df, tfidf_df], axis=1)
-            os.makedirs(os.path.dirname(vectorizer_path), exist_ok=True)
-            joblib.dump(tfidf, vectorizer_path)
-            print(f"✅ Saved Summary Vectorizer to '{vectorizer_path}'")
+            if vectorizer_path:
+                _save_vectorizer(tfidf, vectorizer_path)
+            return tfidf
     except ValueError:
         print("Warning: Overview data empty or insufficient to build TF-IDF vocabulary.")
-    drop_cols = ['Name', 'Title', 'Date', 'Letterboxd URI', 'genres', 'overview', 'tag_list', 'Year']
-    drop_cols = [c for c in drop_cols if c in df.columns]
-    final_df = df.drop(columns=drop_cols)
-    cols = [c for c in final_df.columns if c != 'user_rating'] + ['user_rating']
-    final_df = final_df[cols]
-    final_df = final_df.fillna(0)
+    return None
+
+def _save_vectorizer(tfidf, vectorizer_path):
+    os.makedirs(os.path.dirname(vectorizer_path), exist_ok=True)
+    joblib.dump(tfidf, vectorizer_path)
+    print(f"✅ Saved Summary Vectorizer to '{vectorizer_path}'")
+
+def _feature_engineering_chunked(input_file, output_file, vectorizer_path, chunksize, text_features):
+    print(f"Large profile detected. Processing in chunks of {chunksize} rows...")
+    header = pd.read_csv(input_file, nrows=0).columns
+    if 'Rating' not in header:
+        print("Error: 'Rating' column missing. Models need user ratings to train.")
+        return False
+
+    # Pass 1: learn the genre classes and the TF-IDF vocabulary
+    print("Encoding Genres...")
+    genre_classes = set()
+    def overview_chunks():
+        for chunk in pd.read_csv(input_file, usecols=['genres', 'overview', 'Rating'], chunksize=chunksize):
+            chunk = chunk[pd.to_numeric(chunk['Rating'], errors='coerce').notna()]
+            for tags in chunk['genres'].fillna("").map(_split_genres):
+                genre_classes.update(tags)
+            yield chunk['overview'].fillna("")
+    print("Encoding Summaries (Reading the Plots)...")
+    if text_features == 'hashing':
+        tfidf = _fit_hashing_streaming(overview_chunks())
+    else:
+        tfidf = _fit_tfidf_streaming(overview_chunks())
+    genre_classes = sorted(genre_classes)
+    if tfidf is not None:
+        _save_vectorizer(tfidf, vectorizer_path)
+    else:
+        print("Warning: Overview data empty or insufficient to build TF-IDF vocabulary.")
+
+    # Pass 2: transform and append chunk by chunk
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    rows, n_cols = 0, 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        for chunk in pd.read_csv(input_file, chunksize=chunksize):
+            chunk = _prepare(chunk)
+            if chunk.empty:
+                continue  # Nothing rated in this chunk
+            final_df = _encode_frame(chunk, genre_classes, tfidf)
+            final_df.to_csv(f, header=(rows == 0), index=False)
+            rows += len(final_df)
+            n_cols = final_df.shape[1]
+    print("\n✅ Success! Feature Engineering Complete.")
+    print(f"Saved to: {output_file}")
+    print(f"New Matrix Shape: {(rows, n_cols)} (Rows, Features)")
+    return True
+
+def build_features(df, vectorizer_path=None, text_features=None):
+    """
+    In-memory feature engineering: returns (features_df, summary_vectorizer), or (None, None)
+    when the profile has no ratings. Saves the vectorizer when vectorizer_path is given.
+    """
+    text_features = text_features or TEXT_FEATURES
+    if 'Rating' not in df.columns:
+         print("Error: 'Rating' column missing. Models need user ratings to train.")
+         return None, None
+    df = _prepare(df)
+    print("Encoding Genres...")
+    mlb = MultiLabelBinarizer()
+    mlb.fit(df['genres'].map(_split_genres))
+    print("Encoding Summaries (Reading the Plots)...")
+    if text_features == 'hashing':
+        tfidf = HashedTextFeaturizer(n_jobs=-1).fit(df['overview'])
+        if vectorizer_path:
+            _save_vectorizer(tfidf, vectorizer_path)
+    else:
+        tfidf = _fit_tfidf(df['overview'], vectorizer_path)
+    return _encode_frame(df, mlb.classes_, tfidf), tfidf
+
+def feature_engineering(input_file='dataset/user_profile.csv',
+                        output_file='dataset/user_profile_features.csv',
+                        vectorizer_path='models/summary_vectorizer.pkl',
+                        chunksize='auto',
+                        text_features=None):
+    text_features = text_features or TEXT_FEATURES
+    if chunksize == 'auto':
+        chunksize = auto_chunksize(input_file)
+    if chunksize:
+        if not os.path.exists(input_file):
+            print(f"File not found: {input_file}. Please import your Letterboxd data first.")
+            return False
+        return _feature_engineering_chunked(input_file, output_file, vectorizer_path, chunksize, text_features)
+
+    print(f"Reading {input_file}...")
+    try:
+        df = pd.read_csv(input_file)
+    except FileNotFoundError:
+        print(f"File not found: {input_file}. Please import your Letterboxd data first.")
+        return False
+    final_df, _ = build_features(df, vectorizer_path=vectorizer_path, text_features=text_features)
+    if final_df is None:
+        return False
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
     final_df.to_csv(output_file, index=False)
     print("\n✅ Success! Feature Engineering Complete.")
@@ -52,4 +197,4 @@ def feature_engineering(input_file='dataset/user_profile.csv',
     return True
 
 if __name__ == "__main__":
-    feature_engineering()
\ No newline at end of file
+    feature_engineering()
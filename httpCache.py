@@ -0,0 +1,340 @@
+"""
+Disk cache for TMDB traffic, with a policy per kind of request.
+
+API responses are sorted into traffic classes by URL (search, discover, details,
+certifications). Each class is its own namespace in one SQLite file with its own
+expiry and size budget; bodies are zlib-compressed and the least recently used
+entries are evicted once a namespace goes over budget. Poster images are already
+compressed JPEGs and never change for a given path, so they go to a plain file
+store (one file per URL, LRU by modification time) instead of the database.
+
+A background thread drops expired rows and vacuums the database periodically.
+Nothing is cached until configure() is called, so scripts and benchmarks talk to
+the network directly; requests that don't match a traffic class (e.g. GitHub's
+release check) are never cached.
+"""
+import os
+import re
+import time
+import zlib
+import json
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlparse
+
+import requests
+
+MB = 1024 * 1024
+# ttl in seconds (None: never expires), max_bytes of compressed bodies
+TRAFFIC_CLASSES = {
+    'search':         {'ttl': 12 * 3600,       'max_bytes': 8 * MB},
+    'discover':       {'ttl': 24 * 3600,       'max_bytes': 16 * MB},
+    'details':        {'ttl': 7 * 24 * 3600,   'max_bytes': 32 * MB},
+    # Age ratings are set once per release
+    'certifications': {'ttl': 30 * 24 * 3600,  'max_bytes': 4 * MB},
+}
+IMAGE_MAX_BYTES = 150 * MB
+# Eviction trims to this fraction of the budget, so it doesn't run on every store
+EVICT_TO = 0.9
+MAINTENANCE_INTERVAL = 30 * 60
+DB_NAME = 'responses.sqlite'
+IMAGE_DIR = 'images'
+# Query parameters that don't change the response
+IGNORED_PARAMS = ('api_key',)
+
+_MOVIE_PATH = re.compile(r'/movie/\d+$')
+
+
+def traffic_class(url):
+    """The traffic class a TMDB URL belongs to, or None if it isn't cached."""
+    path = urlparse(url).path.rstrip('/')
+    if '/search/' in path:
+        return 'search'
+    if '/discover/' in path:
+        return 'discover'
+    if path.endswith('/release_dates'):
+        return 'certifications'
+    if _MOVIE_PATH.search(path):
+        return 'details'
+    return None
+
+
+def _key(url, params=None):
+    items = sorted((k, str(v)) for k, v in (params or {}).items() if k not in IGNORED_PARAMS)
+    return hashlib.blake2b(json.dumps([url, items]).encode(), digest_size=16).hexdigest()
+
+
+class CacheStats:
+    """Hit/miss/byte counters per namespace."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, namespace, hit, nbytes):
+        with self._lock:
+            c = self._counts.setdefault(namespace, {'hits': 0, 'misses': 0, 'bytes_served': 0, 'bytes_fetched': 0})
+            c['hits' if hit else 'misses'] += 1
+            c['bytes_served' if hit else 'bytes_fetched'] += nbytes
+
+    def snapshot(self):
+        with self._lock:
+            return {ns: dict(c) for ns, c in self._counts.items()}
+
+
+class ResponseCache:
+    """JSON bodies in one SQLite file, namespaced by traffic class."""
+
+    def __init__(self, path, policies=TRAFFIC_CLASSES, stats=None):
+        self.path = path
+        self.policies = policies
+        self.stats = stats or CacheStats()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # auto_vacuum only takes effect on a new database (or after a full VACUUM)
+        self._db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            namespace TEXT NOT NULL, key TEXT NOT NULL, body BLOB NOT NULL,
+            size INTEGER NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key))""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (namespace, used_at)")
+        self._db.commit()
+        self._bytes = dict(self._db.execute("SELECT namespace, SUM(size) FROM responses GROUP BY namespace"))
+
+    def _expired(self, namespace, stored_at, now):
+        ttl = self.policies[namespace]['ttl']
+        return ttl is not None and now - stored_at > ttl
+
+    def get(self, namespace, key):
+        """The cached JSON payload, or None on a miss (or an expired entry)."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT body, stored_at FROM responses WHERE namespace=? AND key=?",
+                                   (namespace, key)).fetchone()
+            if row is None:
+                return None
+            if self._expired(namespace, row[1], now):
+                self._delete(namespace, [(key, len(row[0]))])
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET used_at=? WHERE namespace=? AND key=?", (now, namespace, key))
+            self._db.commit()
+        body = zlib.decompress(row[0])
+        self.stats.add(namespace, True, len(body))
+        return json.loads(body)
+
+    def put(self, namespace, key, payload, raw_size=None):
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        blob = zlib.compress(body, 6)
+        self.stats.add(namespace, False, raw_size if raw_size is not None else len(body))
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE namespace=? AND key=?", (namespace, key)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                             (namespace, key, blob, len(blob), now, now))
+            self._bytes[namespace] = self._bytes.get(namespace, 0) + len(blob) - (old[0] if old else 0)
+            if self._bytes[namespace] > self.policies[namespace]['max_bytes']:
+                self._evict(namespace)
+            self._db.commit()
+
+    def _delete(self, namespace, entries):
+        """Deletes (key, size) entries and updates the namespace's byte count."""
+        self._db.executemany("DELETE FROM responses WHERE namespace=? AND key=?",
+                             [(namespace, key) for key, _ in entries])
+        self._bytes[namespace] = self._bytes.get(namespace, 0) - sum(size for _, size in entries)
+
+    def _evict(self, namespace):
+        """Drops least recently used entries until the namespace is back under EVICT_TO of its budget."""
+        excess = self._bytes.get(namespace, 0) - self.policies[namespace]['max_bytes'] * EVICT_TO
+        victims, freed = [], 0
+        for key, size in self._db.execute("SELECT key, size FROM responses WHERE namespace=? ORDER BY used_at",
+                                          (namespace,)):
+            if freed >= excess:
+                break
+            victims.append((key, size))
+            freed += size
+        self._delete(namespace, victims)
+        return len(victims)
+
+    def maintain(self):
+        """Drops expired entries, enforces budgets and returns freed pages to the OS."""
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for namespace, policy in self.policies.items():
+                if policy['ttl'] is not None:
+                    expired = self._db.execute("SELECT key, size FROM responses WHERE namespace=? AND stored_at<?",
+                                               (namespace, now - policy['ttl'])).fetchall()
+                    self._delete(namespace, expired)
+                    removed += len(expired)
+                if self._bytes.get(namespace, 0) > policy['max_bytes']:
+                    removed += self._evict(namespace)
+            self._db.commit()
+            self._db.execute("PRAGMA incremental_vacuum")
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def stored_bytes(self):
+        with self._lock:
+            return dict(self._bytes)
+
+
+class ImageStore:
+    """Image bytes as files, one per URL, evicted least recently used past max_bytes."""
+
+    def __init__(self, directory, max_bytes=IMAGE_MAX_BYTES, stats=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = stats or CacheStats()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = sum(e.stat().st_size for e in os.scandir(directory) if e.is_file())
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.blake2b(url.encode(), digest_size=16).hexdigest())
+
+    def get(self, url):
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # modification time doubles as last use
+        except OSError:
+            return None
+        self.stats.add('images', True, len(data))
+        return data
+
+    def put(self, url, data):
+        self.stats.add('images', False, len(data))
+        path = self._path(url)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            old = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Warning: Could not cache image: {e}")
+            return
+        with self._lock:
+            self._bytes += len(data) - old
+            over = self._bytes > self.max_bytes
+        if over:
+            self.maintain()
+
+    def maintain(self):
+        """Removes the least recently used files until under EVICT_TO of the budget."""
+        with self._lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    st = entry.stat()
+                    files.append((st.st_mtime, st.st_size, entry.path))
+            files.sort()
+            self._bytes = sum(size for _, size, _ in files)
+            removed = 0
+            for _, size, path in files:
+                if self._bytes <= self.max_bytes * EVICT_TO:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._bytes -= size
+                removed += 1
+        return removed
+
+    def stored_bytes(self):
+        with self._lock:
+            return self._bytes
+
+
+# --- Module-level cache (off until configure) ---
+
+stats = CacheStats()
+_responses = None
+_images = None
+_maintenance = None
+
+
+def configure(directory, maintenance_interval=MAINTENANCE_INTERVAL):
+    """Opens (or creates) the cache under `directory` and starts background maintenance."""
+    global _responses, _images, _maintenance
+    _responses = ResponseCache(os.path.join(directory, DB_NAME), stats=stats)
+    _images = ImageStore(os.path.join(directory, IMAGE_DIR), stats=stats)
+    if _maintenance is None:
+        _maintenance = threading.Thread(target=_maintenance_loop, args=(maintenance_interval,), daemon=True)
+        _maintenance.start()
+
+
+def _maintenance_loop(interval):
+    while True:
+        try:
+            started = time.perf_counter()
+            removed = _responses.maintain() + _images.maintain()
+            if removed:
+                print(f"🧹 HTTP cache: removed {removed} stale entries in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"Warning: HTTP cache maintenance failed: {e}")
+        time.sleep(interval)
+
+
+def get_json(url, params=None, timeout=None):
+    """
+    GETs a TMDB API URL through its traffic class's cache. Returns the decoded JSON,
+    or None if the server didn't answer 200. Network errors propagate.
+    """
+    namespace = traffic_class(url) if _responses is not None else None
+    if namespace is not None:
+        key = _key(url, params)
+        cached = _responses.get(namespace, key)
+        if cached is not None:
+            return cached
+    resp = requests.get(url, params=params, timeout=timeout)
+    if resp.status_code != 200:
+        return None
+    payload = resp.json()
+    if namespace is not None:
+        _responses.put(namespace, key, payload, raw_size=len(resp.content))
+    return payload
+
+
+def get_image(url, timeout=None):
+    """Image bytes for a URL, from the image store when cached. Raises on HTTP errors."""
+    if _images is not None:
+        data = _images.get(url)
+        if data is not None:
+            return data
+    resp = requests.get(url, timeout=timeout)
+    resp.raise_for_status()
+    if _images is not None:
+        _images.put(url, resp.content)
+    return resp.content
+
+
+def _size(n):
+    return f"{n / MB:.1f} MB" if n >= MB else f"{n / 1024:.0f} KB"
+
+
+def format_stats():
+    """Per-class hit rate, bytes served from cache vs fetched, and size on disk."""
+    if _responses is None:
+        return "HTTP cache is off."
+    counts = stats.snapshot()
+    stored = _responses.stored_bytes()
+    stored['images'] = _images.stored_bytes()
+    budgets = {ns: p['max_bytes'] for ns, p in _responses.policies.items()}
+    budgets['images'] = _images.max_bytes
+    lines = []
+    for ns in list(budgets):
+        c = counts.get(ns, {'hits': 0, 'misses': 0, 'bytes_served': 0, 'bytes_fetched': 0})
+        total = c['hits'] + c['misses']
+        rate = f"{c['hits'] / total:.0%}" if total else "  -"
+        lines.append(f"{ns:<15} hits {c['hits']:>5}  misses {c['misses']:>5}  hit rate {rate:>4}  "
+                     f"served {_size(c['bytes_served']):>9}  fetched {_size(c['bytes_fetched']):>9}  "
+                     f"stored {_size(stored.get(ns, 0))} / {_size(budgets[ns])}")
+    return "\n".join(lines)
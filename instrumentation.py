@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import math
+import time
+import threading
+import contextlib
+from collections import deque
+
+# --- Lightweight span/timer instrumentation ---
+# Off by default. When disabled every span is a shared no-op context manager,
+# so wrapping hot loops costs next to nothing. Enable with MBM_PROFILE=1 or
+# from the System Log tab.
+
+HISTORY_SIZE = 200
+
+
+class _NullSpan:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """Stage timings for a single request (e.g. one recommendation or one retrain)."""
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.stages = {}   # stage -> [total_seconds, calls], insertion ordered
+        self.total = None
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def to_dict(self):
+        return {
+            'request': self.name,
+            'started_at': self.started_at,
+            'total_ms': round((self.total or 0.0) * 1000, 3),
+            'stages': {s: {'ms': round(v[0] * 1000, 3), 'calls': v[1]} for s, v in self.stages.items()},
+        }
+
+
+class _Span:
+    __slots__ = ('profiler', 'trace', 'stage', '_t0')
+
+    def __init__(self, profiler, trace, stage):
+        self.profiler = profiler
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._t0
+        if self.trace is not None:
+            self.trace.add(self.stage, elapsed)
+        else:
+            self.profiler._record(self.stage, elapsed)
+        return False
+
+
+class Profiler:
+    def __init__(self, enabled=False, export_path=None, history_size=HISTORY_SIZE):
+        self.enabled = enabled
+        self.export_path = export_path
+        self.history_size = history_size
+        self._history = {}   # stage -> deque of seconds
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.last_trace = None
+
+    def configure(self, enabled=None, export_path=None):
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if export_path is not None:
+            self.export_path = export_path
+
+    # --- Request lifecycle ---
+
+    def begin(self, name, make_current=True):
+        """
+        Starts a new trace and (by default) makes it current for this thread. Returns None
+        when disabled. Requests that hop between threads pass make_current=False and hand
+        the trace around explicitly (see use()).
+        """
+        if not self.enabled:
+            return None
+        trace = Trace(name)
+        if make_current:
+            self._local.trace = trace
+        return trace
+
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    @contextlib.contextmanager
+    def use(self, trace):
+        """Makes `trace` current for this thread for the duration of the block."""
+        previous = getattr(self._local, 'trace', None)
+        self._local.trace = trace
+        try:
+            yield trace
+        finally:
+            self._local.trace = previous
+
+    def end(self, trace):
+        """Closes a trace, folds its stages into the rolling history and exports it."""
+        if trace is None:
+            return None
+        trace.total = time.perf_counter() - trace._t0
+        if getattr(self._local, 'trace', None) is trace:
+            self._local.trace = None
+        with self._lock:
+            for stage, (seconds, _) in trace.stages.items():
+                self._push(f"{trace.name}.{stage}", seconds)
+            self._push(f"{trace.name}.total", trace.total)
+            self.last_trace = trace
+        self._export(trace)
+        return trace
+
+    def request(self, name):
+        """Context manager wrapping begin()/end() for requests that live on one thread."""
+        return _RequestScope(self, name)
+
+    def span(self, stage, trace=None):
+        """Times a stage. Attaches to `trace`, else the thread's current trace, else global history."""
+        if not self.enabled:
+            return _NULL_SPAN
+        if trace is None:
+            trace = getattr(self._local, 'trace', None)
+        return _Span(self, trace, stage)
+
+    def timed(self, stage):
+        """Decorator form of span()."""
+        def wrap(fn):
+            def inner(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            inner.__name__ = fn.__name__
+            inner.__doc__ = fn.__doc__
+            return inner
+        return wrap
+
+    # --- Aggregates ---
+
+    def _push(self, key, seconds):
+        hist = self._history.get(key)
+        if hist is None:
+            hist = self._history[key] = deque(maxlen=self.history_size)
+        hist.append(seconds)
+
+    def _record(self, stage, seconds):
+        with self._lock:
+            self._push(stage, seconds)
+
+    def stats(self):
+        """Returns {stage: {'count', 'p50_ms', 'p95_ms'}} over the rolling window."""
+        with self._lock:
+            snapshot = {k: sorted(v) for k, v in self._history.items()}
+        return {
+            k: {'count': len(v), 'p50_ms': _percentile(v, 50) * 1000, 'p95_ms': _percentile(v, 95) * 1000}
+            for k, v in snapshot.items() if v
+        }
+
+    def reset(self):
+        with self._lock:
+            self._history.clear()
+            self.last_trace = None
+
+    def format_trace(self, trace):
+        if trace is None:
+            return ""
+        lines = [f"⏱ {trace.name}: {(trace.total or 0) * 1000:.1f} ms total"]
+        for stage, (seconds, calls) in trace.stages.items():
+            suffix = f" ({calls} calls)" if calls > 1 else ""
+            lines.append(f"   {stage:<24} {seconds * 1000:9.1f} ms{suffix}")
+        return "\n".join(lines)
+
+    def format_report(self):
+        stats = self.stats()
+        if not stats:
+            return "⏱ No timings recorded yet." + ("" if self.enabled else " (Profiling is off)")
+        lines = [f"{'stage':<40} {'n':>5} {'p50 ms':>10} {'p95 ms':>10}"]
+        for key in sorted(stats):
+            s = stats[key]
+            lines.append(f"{key:<40} {s['count']:>5} {s['p50_ms']:>10.1f} {s['p95_ms']:>10.1f}")
+        return "\n".join(lines)
+
+    def _export(self, trace):
+        if not self.export_path:
+            return
+        try:
+            with open(self.export_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(trace.to_dict()) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not export timings: {e}")
+
+
+class _RequestScope:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.trace = None
+
+    def __enter__(self):
+        self.trace = self.profiler.begin(self.name)
+        return self.trace
+
+    def __exit__(self, *exc):
+        self.profiler.end(self.trace)
+        return False
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+# --- Process memory ---
+
+def rss_bytes():
+    """Resident memory of this process in bytes, or None where it can't be read."""
+    try:
+        if sys.platform.startswith('linux'):
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class _Counters(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + \
+                           [(name, ctypes.c_size_t) for name in (
+                               'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                               'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage',
+                               'PagefileUsage', 'PeakPagefileUsage')]
+            counters = _Counters()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        import resource
+        # macOS reports the high-water mark in bytes; good enough as an upper bound
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (OSError, ValueError, ImportError, AttributeError):
+        return None
+
+
+class PeakRss:
+    """
+    Samples resident memory on a background thread while the block runs; `peak`
+    is the highest value seen (bytes, or None if RSS can't be read). Spikes shorter
+    than the interval can be missed, but unlike tracemalloc it costs nothing in
+    the measured code.
+    """
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = rss_bytes()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return False
+
+
+profiler = Profiler(enabled=os.getenv('MBM_PROFILE', '') not in ('', '0'))
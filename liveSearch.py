@@ -0,0 +1,124 @@
+"""
+Search-as-you-type support for the Log tab.
+
+SearchCache keeps TMDB search pages keyed by normalized query. A longer query is
+answered right away by filtering the longest cached prefix ("inter" -> "interstellar"),
+and when that prefix's results were exhaustive (TMDB had no second page) the
+filtered list is final and no request is made at all. LocalCatalog holds movie
+metadata the app already has (the hydrated profile CSV, TMDB candidates it has seen),
+so matches show up before the network answers.
+"""
+import threading
+from collections import OrderedDict
+
+from titles import titleNormalize
+
+MIN_QUERY_LENGTH = 2
+MAX_RESULTS = 15
+CACHE_SIZE = 256
+CATALOG_SIZE = 50000
+
+
+def normalize_query(query):
+    return " ".join(str(query).lower().split())
+
+
+def _matches(movie, q_norm):
+    return (q_norm in titleNormalize(movie.get('title', ''))
+            or q_norm in titleNormalize(movie.get('original_title', '') or ''))
+
+
+class SearchCache:
+    """LRU of TMDB search results per query, with prefix reuse."""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()   # query -> (results, exhaustive)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, query, results, total_results=None):
+        key = normalize_query(query)
+        exhaustive = total_results is not None and total_results <= len(results)
+        with self._lock:
+            self._entries[key] = (list(results), exhaustive)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def lookup(self, query):
+        """
+        Returns (results, final). `final` is True when no request is needed: an exact
+        hit, or a filtered exhaustive prefix. Otherwise results are a provisional
+        answer from the longest cached prefix (possibly empty).
+        """
+        key = normalize_query(query)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return list(self._entries[key][0]), True
+            for end in range(len(key) - 1, MIN_QUERY_LENGTH - 1, -1):
+                entry = self._entries.get(key[:end])
+                if entry is not None:
+                    results, exhaustive = entry
+                    break
+            else:
+                return [], False
+        q_norm = titleNormalize(key)
+        return [m for m in results if _matches(m, q_norm)], exhaustive
+
+
+class LocalCatalog:
+    """
+    Title index over movie metadata already on this machine, deduplicated by TMDB id.
+    Holds at most `size` movies; the ones added longest ago go first.
+    """
+
+    def __init__(self, size=CATALOG_SIZE):
+        self.size = size
+        self._movies = {}   # id -> movie dict
+        self._keys = {}     # id -> normalized title
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._movies)
+
+    def add_movies(self, movies):
+        with self._lock:
+            for m in movies:
+                if m.get('id') is None or not m.get('title'):
+                    continue
+                # Full TMDB entries (with posters) win over profile rows
+                if m['id'] in self._movies and 'poster_path' in self._movies[m['id']] and 'poster_path' not in m:
+                    continue
+                self._movies.pop(m['id'], None)  # Re-added movies count as new
+                self._movies[m['id']] = m
+                self._keys[m['id']] = titleNormalize(m['title'])
+            excess = len(self._movies) - self.size
+            if excess > 0:
+                for mid in list(self._movies)[:excess]:
+                    del self._movies[mid]
+                    del self._keys[mid]
+
+    def search(self, query, limit=MAX_RESULTS):
+        q_norm = titleNormalize(normalize_query(query))
+        if len(q_norm) < MIN_QUERY_LENGTH:
+            return []
+        with self._lock:
+            hits = [(not key.startswith(q_norm), len(key), mid) for mid, key in self._keys.items() if q_norm in key]
+            hits.sort()
+            return [self._movies[mid] for _, _, mid in hits[:limit]]
+
+
+def merge_results(*lists, limit=MAX_RESULTS):
+    """Concatenates result lists in priority order, keeping the first entry per id."""
+    seen = set()
+    merged = []
+    for results in lists:
+        for m in results:
+            if m['id'] not in seen:
+                seen.add(m['id'])
+                merged.append(m)
+    return merged[:limit]
@@ -0,0 +1,195 @@
+"""
+Console output and progress for the GUI, safe to feed from any thread.
+
+Writers (print from worker threads, tqdm, the pipeline's progress callback) only
+append to a deque or replace a dict entry; neither blocks nor touches Tk. The Tk
+thread drains both every FRAME_MS: all pending text goes into the textbox in one
+insert (so a burst of prints costs one reconfigure/scroll), and each progress
+key is delivered once per frame with its latest value, however many updates
+arrived in between.
+
+tqdm redraws its bar with carriage returns; within a batch only the last
+redraw of a line survives, and a batch that starts with one replaces the
+textbox's unfinished last line, so a progress bar stays one line.
+"""
+import sys
+import time
+from collections import deque
+
+FRAME_MS = 50
+MAX_LINES = 5000
+# The textbox is trimmed back to max_lines once it's this many lines over
+TRIM_LINES = 500
+
+
+def collapse_carriage_returns(text):
+    """
+    (replaces_last_line, text) with each line reduced to what a terminal would show
+    after its carriage returns. replaces_last_line is True when the first line began
+    by returning to the start of the line already on screen.
+    """
+    lines = text.split('\n')
+    replaces = False
+    for i, line in enumerate(lines):
+        if '\r' in line:
+            parts = line.split('\r')
+            last = max((j for j, part in enumerate(parts) if part), default=0)
+            lines[i] = parts[last]
+            replaces = replaces or (i == 0 and last > 0)
+    return replaces, '\n'.join(lines)
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return ''
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class Progress:
+    """One progress report. Immutable, so a reader never sees half an update."""
+    __slots__ = ('key', 'current', 'total', 'label', 'started', 'start_count', 'updated')
+
+    def __init__(self, key, current, total, label, started, start_count, updated):
+        self.key = key
+        self.current = current
+        self.total = total
+        self.label = label
+        self.started = started
+        self.start_count = start_count
+        self.updated = updated
+
+    @property
+    def fraction(self):
+        return min(1.0, self.current / self.total) if self.total else 0.0
+
+    @property
+    def eta(self):
+        """Seconds left at the average rate so far, or None until there's a rate."""
+        done = self.current - self.start_count
+        elapsed = self.updated - self.started
+        if done <= 0 or elapsed <= 0 or not self.total:
+            return None
+        return max(0.0, (self.total - self.current) * elapsed / done)
+
+    def describe(self):
+        eta = format_eta(self.eta) if self.current < self.total else ''
+        return f"{self.label}: {self.current}/{self.total}" + (f" · about {eta} left" if eta else "")
+
+
+class LogSink:
+    """
+    File-like stdout/stderr replacement. `widget` schedules the drain (any Tk
+    widget); text shows up once a textbox is attached.
+    """
+    encoding = 'utf-8'
+
+    def __init__(self, widget, max_lines=MAX_LINES, frame_ms=FRAME_MS):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.frame_ms = frame_ms
+        self.text_widget = None
+        self._pending = deque()     # text chunks; append/popleft are atomic
+        self._progress = {}         # key -> latest Progress
+        self._delivered = {}        # key -> Progress last handed to listeners (Tk thread only)
+        self._listeners = []
+        self.widget.after(self.frame_ms, self._drain)
+
+    def attach(self, text_widget):
+        self.text_widget = text_widget
+
+    # --- Any thread ---
+
+    def write(self, text):
+        if text:
+            self._pending.append(text)
+        return len(text)
+
+    def flush(self): pass
+
+    def isatty(self): return False
+
+    def progress(self, key, current, total, label=''):
+        """Reports progress; only the latest report per key per frame reaches listeners."""
+        now = time.monotonic()
+        previous = self._progress.get(key)
+        if previous is None or current < previous.current:
+            # A new run (or a restart) measures its rate from here
+            started, start_count = now, current
+        else:
+            started, start_count = previous.started, previous.start_count
+        self._progress[key] = Progress(key, current, total, label, started, start_count, now)
+
+    def clear_progress(self, key):
+        self._progress.pop(key, None)
+
+    def on_progress(self, listener):
+        """listener(Progress) is called on the Tk thread."""
+        self._listeners.append(listener)
+
+    # --- Tk thread ---
+
+    def line_count(self):
+        if self.text_widget is None:
+            return 0
+        return int(self.text_widget.index('end-1c').split('.')[0])
+
+    def clear(self):
+        """Empties the textbox, along with any text still waiting to be shown."""
+        self._take_pending()
+        if self.text_widget is not None:
+            self.text_widget.configure(state='normal')
+            self.text_widget.delete('1.0', 'end')
+            self.text_widget.configure(state='disabled')
+
+    def _drain(self):
+        try:
+            self._flush_text()
+            self._deliver_progress()
+        except Exception as e:
+            # Printing here would only feed the sink again; report on the real stream
+            if sys.__stderr__ is not None:
+                sys.__stderr__.write(f"Log sink error: {e}\n")
+        self.widget.after(self.frame_ms, self._drain)
+
+    def _take_pending(self):
+        chunks = []
+        while True:
+            try:
+                chunks.append(self._pending.popleft())
+            except IndexError:
+                return ''.join(chunks)
+
+    def _flush_text(self):
+        if self.text_widget is None or not self._pending:
+            return
+        replaces, text = collapse_carriage_returns(self._take_pending())
+        # Lines beyond the cap would be trimmed right away, so don't insert them
+        lines = text.split('\n')
+        if len(lines) > self.max_lines:
+            text = '\n'.join(lines[-self.max_lines:])
+        w = self.text_widget
+        w.configure(state='normal')
+        if replaces:
+            w.delete('end-1c linestart', 'end-1c')
+        w.insert('end', text)
+        excess = self.line_count() - self.max_lines
+        if excess >= TRIM_LINES or len(lines) > self.max_lines:
+            w.delete('1.0', f'{excess + 1}.0')
+        w.see('end')
+        w.configure(state='disabled')
+
+    def _deliver_progress(self):
+        reports = dict(self._progress)
+        for key in set(self._delivered) - set(reports):
+            del self._delivered[key]   # Cleared since the last frame
+        for key, report in reports.items():
+            if self._delivered.get(key) is report:
+                continue
+            self._delivered[key] = report
+            for listener in self._listeners:
+                listener(report)
@@ -0,0 +1,241 @@
+"""
+Headless command line entry point. No Tk, customtkinter or matplotlib is imported.
+
+    python -m mbm recommend --mood "cozy rainy day" --context Family --top 50 --json
+    python -m mbm recommend --genres "Drama,Romance" --sort ai
+    python -m mbm recommend --batch queries.jsonl --json
+    python -m mbm recommend --users farm/ --batch queries.jsonl --json
+    python -m mbm train --zip letterboxd-export.zip
+    python -m mbm farm exports/ --out farm/ --workers 8
+
+A batch file holds one JSON object per line with "mood" (or "genres") and an
+optional "context"; the watched history and model are loaded once for all queries.
+With --users, each line names a "user" whose profile (model and watched history)
+is loaded once and kept while it's in use.
+"""
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+import recommender
+from instrumentation import profiler
+
+CONTEXTS = ["Alone", "Friends", "Family", "Partner", "Other"]
+SORT_MODES = {'tmdb': "TMDB Score", 'ai': "AI Prediction", 'similar': "Like My Favorites", 'diverse': "Diverse"}
+
+
+def _movie_record(m):
+    year = m['release_date'].split('-')[0] if m.get('release_date') else None
+    return {
+        'id': m['id'],
+        'title': m['title'],
+        'year': year,
+        'ai_score': round(float(m.get('ai_score', 0)), 4),
+        'similarity': round(float(m.get('similarity', 0)), 4),
+        'vote_average': m.get('vote_average', 0),
+        'genre_ids': m.get('genre_ids', []),
+        'context_scores': {c: round(v, 4) for c, v in m.get('context_scores', {}).items()},
+    }
+
+
+def _query(watched, model, columns, vectorizer, mood=None, genres=None, context="Alone", top=30, sort="ai"):
+    with profiler.request('recommend') as trace:
+        if not genres:
+            with profiler.span('get_genres_from_ai'):
+                genres = recommender.get_genres_from_ai(mood or "")
+        picks = recommender.analyze(watched, genres, model, columns, vectorizer, context)
+        if model is None:
+            sort = 'tmdb'  # No personal model yet, AI scores are all zero
+        ranked = recommender.sort_picks(picks, SORT_MODES.get(sort, sort))[:top]
+    return {
+        'mood': mood,
+        'context': context,
+        'genres': genres,
+        'candidates': len(picks),
+        'results': [_movie_record(m) for m in ranked],
+        'timings': trace.to_dict() if trace else None,
+    }
+
+
+class HeadlessRecommender:
+    """Loads the watched history and model once, then answers any number of queries."""
+
+    def __init__(self, watched_path=None, memory_path=None, use_gemini=True):
+        self.watched_path = watched_path or recommender.load_saved_watched_path()
+        self.memory_path = memory_path or recommender.APP_MEMORY_FILE
+        if use_gemini:
+            recommender.configure_gemini()
+        self.watched = recommender.watchedMovies(self.watched_path, self.memory_path)
+        self.model, self.columns, self.vectorizer = recommender.load_ai_model()
+
+    def recommend(self, mood=None, genres=None, context="Alone", top=30, sort="ai", user=None):
+        return _query(self.watched, self.model, self.columns, self.vectorizer, mood, genres, context, top, sort)
+
+
+class MultiProfileRecommender:
+    """Answers queries for many profiles under one directory (see profileServing)."""
+
+    def __init__(self, root, use_gemini=True):
+        from profileServing import ProfileServer
+        if use_gemini:
+            recommender.configure_gemini()
+        self.server = ProfileServer(root)
+
+    def recommend(self, mood=None, genres=None, context="Alone", top=30, sort="ai", user=None):
+        profile = self.server.get(user)
+        if profile is None:
+            return {'user': user, 'mood': mood, 'context': context, 'genres': genres, 'candidates': 0,
+                    'results': [], 'timings': None, 'error': f"unknown profile '{user}'"}
+        result = _query(profile.watched, profile.model, profile.columns, profile.vectorizer,
+                        mood, genres, context, top, sort)
+        return {'user': user, **result}
+
+
+def _parse_genres(text):
+    return [g.strip() for g in text.split(',') if g.strip()] if text else None
+
+
+def _load_batch(path):
+    queries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                queries.append(json.loads(line))
+    return queries
+
+
+def _print_table(result):
+    who = f"👤 {result['user']}  " if result.get('user') else ""
+    print(f"\n🎬 {who}{result['mood'] or ', '.join(result['genres'] or [])}  [{result['context']}]  "
+          f"({result['candidates']} candidates)")
+    for rank, m in enumerate(result['results'], 1):
+        print(f"{rank:>3}. {m['title']} ({m['year'] or 'N/A'})  ★ {m['ai_score']:.2f}  |  TMDB {m['vote_average']:.1f}")
+
+
+def cmd_recommend(args):
+    if args.profile:
+        profiler.configure(enabled=True, export_path=recommender.TIMINGS_FILE)
+    if not args.no_cache:
+        recommender.install_http_cache()
+
+    if args.batch:
+        queries = _load_batch(args.batch)
+    elif args.mood or args.genres:
+        queries = [{'mood': args.mood, 'genres': _parse_genres(args.genres), 'context': args.context}]
+    else:
+        print("Error: provide --mood, --genres or --batch.", file=sys.stderr)
+        return 2
+
+    if recommender.key is None:
+        print("Error: TMDB_key missing in .env", file=sys.stderr)
+        return 1
+    if args.users and not (args.user or all(q.get('user') for q in queries)):
+        print("Error: --users needs --user, or a \"user\" on every batch line.", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    # Library progress prints go to stderr so stdout stays machine-readable
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.users:
+            engine = MultiProfileRecommender(args.users, use_gemini=not args.no_gemini)
+        else:
+            engine = HeadlessRecommender(args.watched, use_gemini=not args.no_gemini)
+        results = []
+        for q in queries:
+            genres = q.get('genres')
+            if isinstance(genres, str):
+                genres = _parse_genres(genres)
+            results.append(engine.recommend(
+                mood=q.get('mood'), genres=genres, context=q.get('context', args.context),
+                top=q.get('top', args.top), sort=q.get('sort', args.sort), user=q.get('user', args.user)))
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        payload = results[0] if len(results) == 1 and not args.batch else results
+        json.dump(payload, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+    else:
+        for r in results:
+            _print_table(r)
+        print(f"\n✅ {len(results)} quer{'y' if len(results) == 1 else 'ies'} in {elapsed:.2f}s")
+    if args.profile:
+        print(profiler.format_report(), file=sys.stderr)
+    if args.users:
+        print(engine.server.format_stats(), file=sys.stderr)
+    return 0
+
+
+def cmd_train(args):
+    from pipeline import Pipeline
+    profiler.configure(enabled=True, export_path=recommender.TIMINGS_FILE)
+    if not args.no_cache:
+        recommender.install_http_cache()
+    with profiler.request('train'):
+        result = Pipeline(profile_path=args.watched).run(args.zip, force=args.force)
+    if not result.success:
+        print(f"❌ Pipeline failed at stage '{result.failed_stage}'.", file=sys.stderr)
+        return 1
+    mae = f" (MAE ±{result.mae:.2f})" if result.mae is not None else ""
+    if result.promoted is False:
+        print(f"⚠️ Retrained model not promoted ({result.evaluation['reason']}); kept v{result.bundle_version}.")
+    print(f"✅ Model up to date{mae}. Cached stages: {', '.join(result.skipped) or 'none'}")
+    return 0
+
+
+def cmd_farm(args):
+    from trainingFarm import run_farm
+    if not args.no_cache:
+        recommender.install_http_cache()
+    records = run_farm(args.directory, args.out, workers=args.workers, force=args.force)
+    if not records:
+        return 1
+    return 1 if any(r['status'] == 'failed' for r in records) else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="mbm", description="Mood Movie Recommender (headless).")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('recommend', help="Score TMDB picks for a mood or genre list.")
+    rec.add_argument('--mood', help="Free-form mood description (interpreted by Gemini or keyword fallback).")
+    rec.add_argument('--genres', help="Comma separated TMDB genres; skips mood interpretation.")
+    rec.add_argument('--context', default="Alone", choices=CONTEXTS, help="Who you're watching with.")
+    rec.add_argument('--top', type=int, default=30, help="Number of results to return.")
+    rec.add_argument('--sort', default='ai', choices=sorted(SORT_MODES), help="Rank by AI prediction, TMDB score, similarity to your favorites, or diversified AI prediction.")
+    rec.add_argument('--batch', help="JSON lines file of queries to run in one process.")
+    rec.add_argument('--watched', help="Watched/ratings CSV (defaults to the one saved by the app).")
+    rec.add_argument('--users', help="Serve many profiles from this directory (laid out like `farm --out`).")
+    rec.add_argument('--user', help="Profile id under --users (batch lines can set their own \"user\").")
+    rec.add_argument('--json', action='store_true', help="Print results as JSON.")
+    rec.add_argument('--no-gemini', action='store_true', help="Use keyword matching instead of Gemini.")
+    rec.add_argument('--no-cache', action='store_true', help="Don't use the on-disk TMDB cache.")
+    rec.add_argument('--profile', action='store_true', help="Print stage timings to stderr.")
+    rec.set_defaults(func=cmd_recommend)
+
+    train = sub.add_parser('train', help="Import, engineer features and train, skipping unchanged stages.")
+    train.add_argument('--zip', help="Letterboxd export zip to import first.")
+    train.add_argument('--watched', help="Hydrated profile CSV (defaults to the app's user profile).")
+    train.add_argument('--force', action='store_true', help="Rerun every stage even if its inputs are unchanged.")
+    train.add_argument('--no-cache', action='store_true', help="Don't use the on-disk TMDB cache.")
+    train.set_defaults(func=cmd_train)
+
+    farm = sub.add_parser('farm', help="Retrain every profile in a directory in parallel, with a summary report.")
+    farm.add_argument('directory', help="Directory of Letterboxd exports (*.zip) and/or hydrated profiles (*.csv).")
+    farm.add_argument('--out', required=True, help="Output directory; each profile gets its own bundle under it.")
+    farm.add_argument('--workers', type=int, help="Worker processes (defaults to the CPU count).")
+    farm.add_argument('--force', action='store_true', help="Rerun every stage even if its inputs are unchanged.")
+    farm.add_argument('--no-cache', action='store_true', help="Don't use the on-disk TMDB cache.")
+    farm.set_defaults(func=cmd_farm)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
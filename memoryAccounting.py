@@ -0,0 +1,167 @@
+"""
+Where the app's memory goes, for sessions that stay open for hours.
+
+Two views, printed together in the System Log:
+- Gauges: each bounded structure (console lines, poster images, result lists,
+  caches) registers a callback reporting its size against its cap. They're cheap
+  and always available.
+- tracemalloc snapshots, grouped per subsystem: an allocation belongs to the
+  innermost frame in one of the app's own modules (recommender, httpCache, app...),
+  or else to the third-party package that made it. Each report also shows the
+  change since the previous one, which is what exposes a slow leak. Tracing slows
+  Python allocations down noticeably, so it only runs while profiling is on.
+
+LruCache is the small bounded map the GUI uses for decoded posters.
+"""
+import os
+import sys
+import tracemalloc
+import threading
+from collections import OrderedDict
+
+from instrumentation import rss_bytes
+
+TRACE_FRAMES = 16
+TOP_SUBSYSTEMS = 12
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class LruCache:
+    """Dict-like map holding at most `size` entries, least recently used evicted first."""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def values(self):
+        with self._lock:
+            return list(self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _library_dirs():
+    dirs = {os.path.normcase(os.path.abspath(p)) for p in sys.path if p and 'packages' in p}
+    dirs.add(os.path.normcase(os.path.dirname(os.__file__)))
+    return tuple(sorted(dirs, key=len, reverse=True))
+
+
+def subsystem_of(filename, library_dirs=None):
+    """The app module (file stem) or third-party top-level package a source file belongs to, or None."""
+    path = os.path.normcase(os.path.abspath(filename))
+    for lib in library_dirs or _library_dirs():
+        if path.startswith(lib + os.sep):
+            rel = path[len(lib) + 1:]
+            return os.path.splitext(rel.split(os.sep)[0])[0]
+    root = os.path.normcase(ROOT_DIR)
+    if path.startswith(root + os.sep) and os.sep not in path[len(root) + 1:]:
+        return os.path.splitext(os.path.basename(filename))[0]
+    return None
+
+
+class MemoryTracker:
+    def __init__(self, frames=TRACE_FRAMES):
+        self.frames = frames
+        self._gauges = OrderedDict()   # name -> (callback, unit)
+        self._previous = None          # subsystem -> bytes at the last report
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._previous = None
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._previous = None
+
+    def register(self, name, gauge, unit='items'):
+        """gauge() -> (count, cap or None); cap None means the size isn't bounded here."""
+        with self._lock:
+            self._gauges[name] = (gauge, unit)
+
+    def gauges(self):
+        with self._lock:
+            gauges = list(self._gauges.items())
+        readings = []
+        for name, (gauge, unit) in gauges:
+            try:
+                count, cap = gauge()
+            except Exception as e:
+                print(f"⚠️ Memory gauge '{name}' failed: {e}")
+                continue
+            readings.append((name, count, cap, unit))
+        return readings
+
+    def by_subsystem(self):
+        """{subsystem: traced bytes} from a fresh snapshot, or None when not tracing."""
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)])
+        libraries = _library_dirs()
+        owners = {}   # filename -> (subsystem, is an app module); tracebacks share few files
+        totals = {}
+        for stat in snapshot.statistics('traceback'):
+            owner = None
+            for frame in reversed(stat.traceback):   # tracebacks list the most recent frame last
+                if frame.filename not in owners:
+                    name = subsystem_of(frame.filename, libraries)
+                    owners[frame.filename] = (name, os.path.dirname(os.path.abspath(frame.filename)) == ROOT_DIR)
+                name, is_app = owners[frame.filename]
+                if is_app:
+                    owner = name
+                    break
+                owner = owner or name
+            owner = owner or 'other'
+            totals[owner] = totals.get(owner, 0) + stat.size
+        return totals
+
+    def format_report(self, top=TOP_SUBSYSTEMS):
+        lines = ["--- Memory ---"]
+        rss = rss_bytes()
+        if rss is not None:
+            lines.append(f"Resident: {rss / 1e6:.1f} MB")
+        for name, count, cap, unit in self.gauges():
+            bound = f" / {cap:,}" if cap is not None else ""
+            lines.append(f"  {name:<22} {count:>8,}{bound} {unit}")
+        totals = self.by_subsystem()
+        if totals is None:
+            lines.append("Turn on Profiling to trace allocations per subsystem.")
+            return "\n".join(lines)
+        current, peak = tracemalloc.get_traced_memory()
+        lines.append(f"Traced: {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)")
+        previous = self._previous or {}
+        for name, size in sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+            delta = f"{(size - previous[name]) / 1e6:+8.2f} MB" if name in previous else ""
+            lines.append(f"  {name:<22} {size / 1e6:8.2f} MB {delta}")
+        self._previous = totals
+        return "\n".join(lines)
+
+
+memory = MemoryTracker()
@@ -0,0 +1,127 @@
+"""
+Versioned on-disk bundle for the personal model.
+
+The forest, its feature columns and the summary vectorizer are saved together as
+one uncompressed joblib file per version, so their numpy arrays (the trees' node
+tables, the TF-IDF idf vector) are memory-mapped on load instead of unpickled.
+manifest.json names the current version's file and is replaced last, atomically,
+so a crash mid-save leaves the previous version in place and the three pieces can
+never be loaded out of step. Each version gets its own file because a mapped file
+can't be replaced on Windows while it's in use.
+"""
+import os
+import json
+import time
+
+import joblib
+
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = 'manifest.json'
+# Versions kept on disk (the current one plus the one it replaced)
+KEEP_VERSIONS = 2
+
+
+def _manifest_path(bundle_dir):
+    return os.path.join(bundle_dir, MANIFEST_NAME)
+
+
+def _atomic_write_json(path, payload):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+def read_manifest(bundle_dir):
+    """The current manifest dict, or None if there is no (readable, current-format) bundle."""
+    try:
+        with open(_manifest_path(bundle_dir)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != BUNDLE_FORMAT:
+        return None
+    if not os.path.exists(os.path.join(bundle_dir, manifest.get('file', ''))):
+        return None
+    return manifest
+
+
+def bundle_exists(bundle_dir):
+    return read_manifest(bundle_dir) is not None
+
+
+def save_bundle(bundle_dir, model, columns, vectorizer, arrays=None, **meta):
+    """
+    Writes a new version and makes it current. `arrays` (name -> ndarray) are stored
+    alongside the model; extra keyword arguments (mae, rows, ...) are recorded in the
+    manifest. Returns the new manifest.
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    previous = read_manifest(bundle_dir)
+    version = (previous['version'] if previous else 0) + 1
+    filename = f"model_v{version}.joblib"
+    path = os.path.join(bundle_dir, filename)
+
+    started = time.perf_counter()
+    tmp = path + '.tmp'
+    joblib.dump({'version': version, 'model': model, 'columns': list(columns), 'vectorizer': vectorizer,
+                 'arrays': arrays or {}}, tmp)
+    os.replace(tmp, path)
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'file': filename,
+        'created_at': time.time(),
+        'n_columns': len(columns),
+        'bytes': os.path.getsize(path),
+        **meta,
+    }
+    _atomic_write_json(_manifest_path(bundle_dir), manifest)
+    print(f"✅ Model bundle v{version} saved ({manifest['bytes'] / 1e6:.1f} MB) "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+    _prune(bundle_dir, version)
+    return manifest
+
+
+def load_payload(bundle_dir, mmap=True):
+    """
+    Loads the current version's stored dict (model, columns, vectorizer, arrays).
+    Returns (payload, manifest), or None if there is no bundle or it doesn't match
+    its manifest.
+    """
+    manifest = read_manifest(bundle_dir)
+    if manifest is None:
+        return None
+    started = time.perf_counter()
+    payload = joblib.load(os.path.join(bundle_dir, manifest['file']), mmap_mode='r' if mmap else None)
+    if payload.get('version') != manifest['version'] or len(payload['columns']) != manifest['n_columns']:
+        print(f"⚠️ Model bundle v{manifest['version']} doesn't match its manifest. Ignoring it.")
+        return None
+    print(f"📦 Loaded model bundle v{manifest['version']} ({manifest['bytes'] / 1e6:.1f} MB) "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return payload, manifest
+
+
+def load_bundle(bundle_dir, mmap=True):
+    """Loads the current version. Returns (model, columns, vectorizer, manifest), or None."""
+    loaded = load_payload(bundle_dir, mmap=mmap)
+    if loaded is None:
+        return None
+    payload, manifest = loaded
+    return payload['model'], payload['columns'], payload['vectorizer'], manifest
+
+
+def _prune(bundle_dir, current_version):
+    for name in os.listdir(bundle_dir):
+        if not (name.startswith('model_v') and name.endswith('.joblib')):
+            continue
+        try:
+            version = int(name[len('model_v'):-len('.joblib')])
+        except ValueError:
+            continue
+        if version <= current_version - KEEP_VERSIONS:
+            try:
+                os.remove(os.path.join(bundle_dir, name))
+            except OSError:
+                pass  # Still mapped by a running app (Windows); removed on a later save
@@ -0,0 +1,155 @@
+"""
+Shadow evaluation of retrained models.
+
+A retrain produces a candidate model; before it replaces the current one, both are
+scored on a time-ordered holdout (the user's most recent ratings) through the same
+batched path recommendations use. The candidate is fitted without the holdout and
+the comparison only uses holdout rows the current model never trained on, so
+neither side is graded on movies it has memorized. Results for every evaluation
+are appended to a small JSON-lines metrics store, keyed by bundle version.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from titles import titleNormalize
+from recommender import predict_scores_all_contexts
+
+HOLDOUT_FRACTION = 0.2
+MIN_HOLDOUT_ROWS = 5
+MAX_HOLDOUT_ROWS = 200
+RANK_K = 10
+LIKED_RATING = 4.0
+# Slack for "not worse": on a few dozen rows, MAE moves this much from noise alone
+MAE_TOLERANCE = 0.02
+NDCG_TOLERANCE = 0.02
+MAX_RECORDS = 200
+
+
+def row_keys(profile_df):
+    """Stable int64 key per profile row (normalized title + year) for remembering what a model saw."""
+    name_col = 'Name' if 'Name' in profile_df.columns else 'Title'
+    names = profile_df[name_col] if name_col in profile_df.columns else pd.Series([''] * len(profile_df))
+    years = pd.to_numeric(profile_df['Year'], errors='coerce') if 'Year' in profile_df.columns else pd.Series([np.nan] * len(profile_df))
+    keys = np.empty(len(profile_df), dtype=np.int64)
+    for i, (name, year) in enumerate(zip(names, years)):
+        text = f"{titleNormalize(name)}|{'' if pd.isna(year) else int(year)}"
+        keys[i] = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little', signed=True)
+    return keys
+
+
+def holdout_positions(profile_df, fraction=HOLDOUT_FRACTION):
+    """
+    Positions of the most recent rated rows. Rows are ordered by Letterboxd's Date;
+    undated rows (logged in the app, appended to the file) count as newest.
+    Returns an empty array when there are too few ratings to spare a holdout.
+    """
+    if 'Rating' not in profile_df.columns:
+        return np.zeros(0, dtype=np.int64)
+    ratings = pd.to_numeric(profile_df['Rating'], errors='coerce')
+    rated = np.flatnonzero(ratings.notna().to_numpy())
+    size = min(int(len(rated) * fraction), MAX_HOLDOUT_ROWS)
+    if size < MIN_HOLDOUT_ROWS:
+        return np.zeros(0, dtype=np.int64)
+    if 'Date' in profile_df.columns:
+        dates = pd.to_datetime(profile_df['Date'].iloc[rated], errors='coerce')
+        order = np.argsort(dates.fillna(pd.Timestamp.max).to_numpy(), kind='stable')
+        rated = rated[order]
+    return np.sort(rated[-size:])
+
+
+def _ndcg(y_true, y_pred, k):
+    k = min(k, len(y_true))
+    discounts = 1 / np.log2(np.arange(2, k + 2))
+    dcg = (y_true[np.argsort(-y_pred, kind='stable')[:k]] * discounts).sum()
+    ideal = (np.sort(y_true)[::-1][:k] * discounts).sum()
+    return float(dcg / ideal) if ideal > 0 else None
+
+
+def evaluate(model, columns, vectorizer, rows):
+    """
+    Scores profile rows (genres, overview, Rating) in one batch. Returns MAE, RMSE,
+    Spearman rank correlation, NDCG@k, precision@k of liked movies and predict latency.
+    """
+    y_true = pd.to_numeric(rows['Rating'], errors='coerce').to_numpy(dtype=float)
+    genre_lists = [[g.strip() for g in str(x).split(',') if g.strip()] if isinstance(x, str) else []
+                   for x in rows.get('genres', pd.Series([None] * len(rows)))]
+    overviews = list(rows['overview'].fillna('')) if 'overview' in rows.columns else [''] * len(rows)
+
+    started = time.perf_counter()
+    y_pred, _ = predict_scores_all_contexts(model, columns, vectorizer, genre_lists, overviews)
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    k = min(RANK_K, len(y_true))
+    top = np.argsort(-y_pred, kind='stable')[:k]
+    spearman = pd.Series(y_pred).corr(pd.Series(y_true), method='spearman')
+    return {
+        'rows': int(len(y_true)),
+        'mae': float(np.abs(y_pred - y_true).mean()),
+        'rmse': float(np.sqrt(((y_pred - y_true) ** 2).mean())),
+        'spearman': None if pd.isna(spearman) else float(spearman),
+        f'ndcg@{RANK_K}': _ndcg(y_true, y_pred, RANK_K),
+        f'precision@{RANK_K}': float((y_true[top] >= LIKED_RATING).mean()) if k else None,
+        'latency_ms': latency_ms,
+        'latency_us_per_row': latency_ms * 1000 / max(len(y_true), 1),
+    }
+
+
+def is_not_worse(candidate, current):
+    """Promotion rule: MAE within tolerance and NDCG not meaningfully lower. Returns (ok, reason)."""
+    if candidate['mae'] > current['mae'] + MAE_TOLERANCE:
+        return False, f"holdout MAE {candidate['mae']:.3f} vs current {current['mae']:.3f}"
+    key = f'ndcg@{RANK_K}'
+    if candidate[key] is not None and current[key] is not None and candidate[key] < current[key] - NDCG_TOLERANCE:
+        return False, f"NDCG@{RANK_K} {candidate[key]:.3f} vs current {current[key]:.3f}"
+    return True, f"holdout MAE {candidate['mae']:.3f} vs current {current['mae']:.3f}"
+
+
+def format_metrics(label, metrics):
+    ndcg = metrics.get(f'ndcg@{RANK_K}')
+    ndcg = f"{ndcg:.3f}" if ndcg is not None else "n/a"
+    return (f"{label:<10} MAE {metrics['mae']:.3f}  NDCG@{RANK_K} {ndcg}  "
+            f"predict {metrics['latency_us_per_row']:.0f} µs/row ({metrics['rows']} rows)")
+
+
+class MetricsStore:
+    """Evaluation history as JSON lines, trimmed to the last MAX_RECORDS entries."""
+
+    def __init__(self, path, max_records=MAX_RECORDS):
+        self.path = path
+        self.max_records = max_records
+        self._lock = threading.Lock()
+
+    def history(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError):
+            return []
+
+    def latest(self):
+        history = self.history()
+        return history[-1] if history else None
+
+    def record(self, entry):
+        entry = {'evaluated_at': time.time(), **entry}
+        with self._lock:
+            try:
+                history = self.history()
+                if len(history) >= self.max_records:
+                    history = history[-(self.max_records - 1):] + [entry]
+                    tmp = self.path + '.tmp'
+                    with open(tmp, 'w', encoding='utf-8') as f:
+                        f.writelines(json.dumps(e) + '\n' for e in history)
+                    os.replace(tmp, self.path)
+                else:
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(entry) + '\n')
+            except OSError as e:
+                print(f"Warning: Could not save model metrics: {e}")
+        return entry
@@ -1,46 +1,144 @@
 import pandas as pd
+import numpy as np
 import joblib
 import os
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error
 
-def train_personal_model(input_file='dataset/user_profile_features.csv', 
-                         model_path='models/personal_ai_model.pkl', 
-                         columns_path='models/model_columns.pkl'):
-    print("Loading personalized data...")
-    if not os.path.exists(input_file):
-        print(f"Error: {input_file} not found. Run featureEngineering.py first.")
-        return False
-    df = pd.read_csv(input_file)
+from featureEngineering import auto_chunksize
+
+DROP_COLS = ['user_rating', 'movie_id', 'title', 'Title', 'Name']
+MIN_TRAINING_ROWS = 15
+# The personal model's hyperparameters and evaluation split; the pipeline fingerprints both
+FOREST_PARAMS = {'n_estimators': 100, 'max_depth': 10, 'random_state': 42}
+SPLIT_PARAMS = {'test_size': 0.2, 'random_state': 42}
+
+def split_features(df):
+    """Splits a feature frame into (X, y), or (None, None) if it has no user_rating target."""
     if 'user_rating' not in df.columns:
-        print("Error: No 'user_rating' target column found to train the AI.")
-        return False
+        return None, None
     y = df['user_rating']
-    drop_cols = ['user_rating', 'movie_id', 'title', 'Title', 'Name']
-    existing_drop_cols = [c for c in drop_cols if c in df.columns]
+    existing_drop_cols = [c for c in DROP_COLS if c in df.columns]
     X = df.drop(columns=existing_drop_cols)
     X = X.fillna(0)
-    if len(X) < 15:
-        print(f"Insufficient data (only {len(X)} movies). The AI needs at least 15 to train properly.")
+    return X, y
+
+def _load_training_data_chunked(input_file, chunksize):
+    """
+    Streams the feature CSV straight into preallocated float32 train/test matrices
+    (the forest works in float32 anyway), so no intermediate DataFrame copies are kept.
+    Produces the same split as make_splits(X, y).
+    """
+    header = list(pd.read_csv(input_file, nrows=0).columns)
+    if 'user_rating' not in header:
+        return None
+    feature_cols = [c for c in header if c not in DROP_COLS]
+    n = sum(len(c) for c in pd.read_csv(input_file, usecols=['user_rating'], chunksize=chunksize))
+    if n < MIN_TRAINING_ROWS:
+        return feature_cols, n, None
+
+    train_idx, test_idx = make_splits(np.arange(n))
+    is_train = np.zeros(n, dtype=bool)
+    is_train[train_idx] = True
+    slot = np.empty(n, dtype=np.int64)
+    slot[train_idx] = np.arange(len(train_idx))
+    slot[test_idx] = np.arange(len(test_idx))
+
+    X_train = np.empty((len(train_idx), len(feature_cols)), dtype=np.float32)
+    X_test = np.empty((len(test_idx), len(feature_cols)), dtype=np.float32)
+    y_train = np.empty(len(train_idx))
+    y_test = np.empty(len(test_idx))
+
+    offset = 0
+    for chunk in pd.read_csv(input_file, usecols=feature_cols + ['user_rating'], chunksize=chunksize):
+        rows = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+        values = chunk[feature_cols].fillna(0).to_numpy(dtype=np.float32)
+        target = chunk['user_rating'].to_numpy(dtype=float)
+        train_mask = is_train[rows]
+        X_train[slot[rows[train_mask]]] = values[train_mask]
+        y_train[slot[rows[train_mask]]] = target[train_mask]
+        X_test[slot[rows[~train_mask]]] = values[~train_mask]
+        y_test[slot[rows[~train_mask]]] = target[~train_mask]
+
+    # Wrap without copying so the model keeps its feature names
+    X_train = pd.DataFrame(X_train, columns=feature_cols, copy=False)
+    X_test = pd.DataFrame(X_test, columns=feature_cols, copy=False)
+    return feature_cols, n, (X_train, X_test, y_train, y_test)
+
+def load_training_splits(input_file, chunksize='auto'):
+    """
+    Reads a feature CSV into the fixed train/test split (streamed for large files).
+    Returns (columns, splits), or None after printing why training can't proceed.
+    """
+    print("Loading personalized data...")
+    if not os.path.exists(input_file):
+        print(f"Error: {input_file} not found. Run featureEngineering.py first.")
+        return None
+    if chunksize == 'auto':
+        chunksize = auto_chunksize(input_file)
+
+    if chunksize:
+        loaded = _load_training_data_chunked(input_file, chunksize)
+        if loaded is None:
+            print("Error: No 'user_rating' target column found to train the AI.")
+            return None
+        columns, n_rows, splits = loaded
+    else:
+        X, y = split_features(pd.read_csv(input_file))
+        if X is None:
+            print("Error: No 'user_rating' target column found to train the AI.")
+            return None
+        columns, n_rows, splits = list(X.columns), len(X), None
+
+    if n_rows < MIN_TRAINING_ROWS:
+        print(f"Insufficient data (only {n_rows} movies). The AI needs at least {MIN_TRAINING_ROWS} to train properly.")
+        return None
+    if splits is None:
+        splits = make_splits(X, y)
+    return columns, splits
+
+def train_personal_model(input_file='dataset/user_profile_features.csv',
+                         model_path='models/personal_ai_model.pkl',
+                         columns_path='models/model_columns.pkl',
+                         chunksize='auto'):
+    loaded = load_training_splits(input_file, chunksize)
+    if loaded is None:
         return False
-    print(f"Features: {X.shape[1]} columns (Genres, Context, Plot Keywords, etc.)")
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    columns, splits = loaded
+    model, mae = fit_personal_model(splits)
+    save_personal_model(model, columns, model_path, columns_path)
+    return True
+
+def make_splits(*arrays):
+    """The fixed 80/20 split every training path uses, so MAE is comparable across runs."""
+    return train_test_split(*arrays, **SPLIT_PARAMS)
+
+def fit_forest(X, y):
+    """The personal model's estimator, fitted quietly (also used for shadow candidates)."""
+    return RandomForestRegressor(**FOREST_PARAMS).fit(X, y)
+
+def fit_personal_model(splits):
+    """Fits the forest on (X_train, X_test, y_train, y_test) splits. Returns (model, mae)."""
+    X_train, X_test, y_train, y_test = splits
+    print(f"Features: {X_train.shape[1]} columns (Genres, Context, Plot Keywords, etc.)")
     print(f"Training Personal AI on {len(X_train)} movies...")
-    model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42)
-    model.fit(X_train, y_train)
+    model = fit_forest(X_train, y_train)
     print("Evaluating model...")
     predictions = model.predict(X_test)
     mae = mean_absolute_error(y_test, predictions)
     print(f"\n--- Results ---")
     print(f"Average AI Prediction Error: ±{mae:.2f} stars")
+    return model, mae
+
+def save_personal_model(model, columns, model_path, columns_path):
     os.makedirs(os.path.dirname(model_path), exist_ok=True)
     os.makedirs(os.path.dirname(columns_path), exist_ok=True)
     joblib.dump(model, model_path)
-    joblib.dump(list(X.columns), columns_path)
+    joblib.dump(list(columns), columns_path)
     print(f"\n✅ Personal Model saved to '{model_path}'")
     print(f"✅ Feature columns saved to '{columns_path}'")
-    return True
 
 if __name__ == "__main__":
-    train_personal_model()
\ No newline at end of file
+    train_personal_model()
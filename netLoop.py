@@ -0,0 +1,124 @@
+"""
+One asyncio event loop, on one background thread, that owns the GUI's network I/O.
+
+TMDB (requests) and Gemini (google.generativeai) only have blocking clients, and
+aiohttp isn't a dependency, so blocking calls run on the loop's worker pool via
+run_blocking() while the coroutines around them provide concurrency (asyncio.gather)
+and cancellation. Submitting a coroutine under a tag cancels the previous one with
+the same tag, so a new search or query supersedes whatever is still in flight.
+
+Results never touch Tk from the loop thread: callbacks are handed to a UiQueue,
+which the Tk thread drains on an `after` timer.
+"""
+import queue
+import asyncio
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import profiler
+
+MAX_WORKERS = 8
+UI_POLL_MS = 30
+
+
+class UiQueue:
+    """Thread-safe hand-off of callbacks to the Tk thread, drained via widget.after()."""
+
+    def __init__(self, widget, interval_ms=UI_POLL_MS):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self._queue = queue.SimpleQueue()
+        self.widget.after(self.interval_ms, self._drain)
+
+    def post(self, fn, *args):
+        self._queue.put((fn, args))
+
+    def _drain(self):
+        while True:
+            try:
+                fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error: {e}")
+                print(traceback.format_exc())
+        self.widget.after(self.interval_ms, self._drain)
+
+
+class NetworkLoop:
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mbm-net')
+        self.loop.set_default_executor(self.executor)
+        self._inflight = {}   # tag -> concurrent.futures.Future
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='mbm-net-loop', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def run_blocking(self, fn, *args, trace=None):
+        """
+        Awaits a blocking call on the worker pool, with `trace` current in the worker so
+        its profiler spans are attributed. Cancelling the awaiting task abandons the
+        result; the call itself still runs to completion on its worker.
+        """
+        def call():
+            with profiler.use(trace):
+                return fn(*args)
+        return await self.loop.run_in_executor(None, call)
+
+    def submit(self, coro, tag=None, on_done=None, on_error=None, post=None):
+        """
+        Schedules a coroutine on the loop and returns its concurrent Future.
+        on_done(result) / on_error(exception) are delivered through post (e.g.
+        UiQueue.post), or called on the loop thread if post is None. Cancelled
+        coroutines deliver nothing.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if tag is not None:
+            with self._lock:
+                previous = self._inflight.get(tag)
+                self._inflight[tag] = future
+            if previous is not None and not previous.done():
+                previous.cancel()
+
+        def done(f):
+            if tag is not None:
+                with self._lock:
+                    if self._inflight.get(tag) is f:
+                        del self._inflight[tag]
+            if f.cancelled():
+                return
+            error = f.exception()
+            callback, value = (on_error, error) if error is not None else (on_done, f.result())
+            if callback is None:
+                if error is not None:
+                    print(f"Network task failed: {error}")
+                return
+            if post is not None:
+                post(callback, value)
+            else:
+                callback(value)
+        future.add_done_callback(done)
+        return future
+
+    def cancel(self, tag):
+        with self._lock:
+            future = self._inflight.pop(tag, None)
+        if future is not None:
+            future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            pending = list(self._inflight.values())
+            self._inflight.clear()
+        for future in pending:
+            future.cancel()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,369 @@
+"""
+Single-pass import -> features -> train pipeline.
+
+DataFrames are handed from stage to stage in memory instead of being written out
+and read back. Each stage is fingerprinted (hash of its input + the parameters that
+affect its output) and skipped when the fingerprint matches the last successful run
+and its outputs are still on disk, so e.g. logging to the app memory file alone
+doesn't trigger a retrain. A retrained model only replaces the current one if it
+does at least as well on the user's most recent ratings (see modelEval).
+"""
+import os
+import json
+import time
+import hashlib
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from data_handling.import_letterboxd import load_letterboxd_export
+from featureEngineering import (build_features, feature_engineering, auto_chunksize,
+                                MAX_SUMMARY_FEATURES, TEXT_FEATURES)
+from modelTrain import (split_features, make_splits, fit_forest, fit_personal_model, load_training_splits,
+                        MIN_TRAINING_ROWS, FOREST_PARAMS, SPLIT_PARAMS)
+from modelBundle import read_manifest, save_bundle, load_payload
+from modelEval import (MetricsStore, evaluate, is_not_worse, format_metrics, holdout_positions, row_keys,
+                       MIN_HOLDOUT_ROWS)
+from similarity import SimilarityIndex
+from cascade import LinearPrefilter
+from instrumentation import profiler
+from recommender import (get_user_data_path, MODEL_BUNDLE_DIR, VECTORIZER_PATH, PIPELINE_STATE_FILE,
+                         MODEL_METRICS_FILE, use_similarity_index, use_prefilter)
+
+# Bump when a stage's output format changes so old caches are invalidated
+PIPELINE_VERSION = 1
+STAGES = ('import', 'features', 'train')
+# Everything that shapes the trained model, for the train stage's fingerprint
+MODEL_PARAMS = {**FOREST_PARAMS, 'test_size': SPLIT_PARAMS['test_size'], 'refit': 'all rows'}
+
+
+def file_digest(path, block_size=1 << 20):
+    """sha256 of a file's bytes, or None if it doesn't exist."""
+    if not path or not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint(*parts):
+    """Stable hash of an input digest plus the parameters that shape a stage's output."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class PipelineResult:
+    def __init__(self):
+        self.success = False
+        self.failed_stage = None
+        self.timings = {}
+        self.skipped = []
+        self.model = None
+        self.columns = None
+        self.vectorizer = None
+        self.mae = None
+        self.bundle_version = None
+        # False when shadow evaluation kept the current model; `evaluation` is its metrics record
+        self.promoted = None
+        self.evaluation = None
+
+    def summary(self):
+        lines = ["--- Pipeline Stages ---"]
+        for stage in STAGES:
+            if stage in self.timings:
+                note = " (cached)" if stage in self.skipped else ""
+                lines.append(f"⏱ {stage:<10} {self.timings[stage] * 1000:8.1f} ms{note}")
+        return "\n".join(lines)
+
+
+class Pipeline:
+    """Runs the onboarding/retraining stages with per-stage caching."""
+
+    def __init__(self, profile_path=None, features_path=None,
+                 vectorizer_path=VECTORIZER_PATH, bundle_dir=MODEL_BUNDLE_DIR,
+                 state_path=PIPELINE_STATE_FILE, metrics_path=MODEL_METRICS_FILE, text_features=None):
+        self.profile_path = profile_path or get_user_data_path('user_data/user_profile.csv')
+        self.features_path = features_path or get_user_data_path('user_data/user_profile_features.csv')
+        self.vectorizer_path = vectorizer_path
+        self.bundle_dir = bundle_dir
+        self.metrics = MetricsStore(metrics_path)
+        self.state_path = state_path
+        self.text_features = text_features or TEXT_FEATURES
+        self.state = self._load_state()
+
+    # --- State ---
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            return state if state.get('version') == PIPELINE_VERSION else {'version': PIPELINE_VERSION}
+        except (OSError, ValueError):
+            return {'version': PIPELINE_VERSION}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def _is_fresh(self, stage, fp, outputs):
+        return self.state.get(stage, {}).get('fingerprint') == fp and all(os.path.exists(p) for p in outputs)
+
+    def _record(self, stage, fp, **extra):
+        self.state[stage] = {'fingerprint': fp, 'completed_at': time.time(), **extra}
+        self._save_state()
+
+    def invalidate(self, stage=None):
+        """Forgets cached fingerprints so the next run recomputes (all stages if stage is None)."""
+        for s in (STAGES if stage is None else STAGES[STAGES.index(stage):]):
+            self.state.pop(s, None)
+        self._save_state()
+
+    # --- Stages ---
+    # Each returns (ok, skipped) and hands its in-memory output on through `run`.
+
+    def _run_import(self, run, force):
+        fp = fingerprint(file_digest(run['zip_path']), PIPELINE_VERSION)
+        if not force and self._is_fresh('import', fp, [self.profile_path]):
+            print("Letterboxd export unchanged. Reusing hydrated profile.")
+            return True, True
+        df = load_letterboxd_export(run['zip_path'], progress_callback=run['progress_callback'])
+        if df is None:
+            return False, False
+        os.makedirs(os.path.dirname(self.profile_path), exist_ok=True)
+        df.to_csv(self.profile_path, index=False)
+        print(f"\n✅ Hydrated user profile saved to {self.profile_path} ({len(df)} movies)")
+        self._record('import', fp)
+        run['profile_df'] = df
+        return True, False
+
+    def _run_features(self, run, force):
+        fp = fingerprint(file_digest(self.profile_path), self.text_features, MAX_SUMMARY_FEATURES, PIPELINE_VERSION)
+        run['features_fp'] = fp
+        # Profiles without any plot vocabulary have no vectorizer file to reuse
+        outputs = [self.features_path]
+        if self.state.get('features', {}).get('vectorizer', True):
+            outputs.append(self.vectorizer_path)
+        if not force and self._is_fresh('features', fp, outputs):
+            print("Watched history unchanged. Reusing feature matrix.")
+            return True, True
+        # A vectorizer left from an earlier run wouldn't match the new columns
+        if os.path.exists(self.vectorizer_path):
+            os.remove(self.vectorizer_path)
+
+        chunksize = auto_chunksize(self.profile_path)
+        if chunksize:
+            # Too big to hold in memory: fall back to the streaming file-based path
+            if not feature_engineering(self.profile_path, self.features_path, self.vectorizer_path,
+                                       chunksize=chunksize, text_features=self.text_features):
+                return False, False
+            self._record('features', fp, vectorizer=os.path.exists(self.vectorizer_path))
+            return True, False
+
+        df = run.get('profile_df')
+        if df is None:
+            try:
+                df = pd.read_csv(self.profile_path)
+            except FileNotFoundError:
+                print(f"File not found: {self.profile_path}. Please import your Letterboxd data first.")
+                return False, False
+        features_df, vectorizer = build_features(df, vectorizer_path=self.vectorizer_path,
+                                                 text_features=self.text_features)
+        if features_df is None:
+            return False, False
+        # Still written out: it's the cache artifact the next run skips to
+        os.makedirs(os.path.dirname(self.features_path), exist_ok=True)
+        features_df.to_csv(self.features_path, index=False)
+        print(f"✅ Feature matrix {features_df.shape} saved to {self.features_path}")
+        self._record('features', fp, vectorizer=vectorizer is not None)
+        run['features_df'], run['vectorizer'] = features_df, vectorizer
+        return True, False
+
+    def _run_train(self, run, force):
+        # Without the features stage in this run, train on the matrix its last run recorded
+        features_fp = run.get('features_fp') or self.state.get('features', {}).get('fingerprint')
+        if features_fp is None:
+            print("Error: No feature matrix has been built yet. Run the features stage first.")
+            return False, False
+        fp = fingerprint(features_fp, MODEL_PARAMS, MIN_TRAINING_ROWS)
+        manifest = read_manifest(self.bundle_dir)
+        # The current bundle must be the one this stage wrote, not e.g. a migrated one
+        ours = manifest is not None and self.state.get('train', {}).get('bundle_version') == manifest['version']
+        if not force and ours and self._is_fresh('train', fp, []):
+            print("Feature matrix unchanged. Keeping the current model.")
+            run['mae'] = self.state['train'].get('mae')
+            run['bundle_version'] = manifest['version']
+            return True, True
+
+        features_df = run.get('features_df')
+        if features_df is None and not auto_chunksize(self.features_path):
+            try:
+                features_df = pd.read_csv(self.features_path)
+            except FileNotFoundError:
+                print(f"Error: {self.features_path} not found. Run featureEngineering.py first.")
+                return False, False
+        if 'vectorizer' in run:
+            vectorizer = run['vectorizer']
+        elif os.path.exists(self.vectorizer_path):
+            vectorizer = joblib.load(self.vectorizer_path)
+        else:
+            vectorizer = None  # No plot vocabulary, so no summary columns to fill
+
+        evaluation, keys = None, None
+        if features_df is None:
+            # Streamed path: too large to hold for a shadow fit, so it's promoted without one
+            loaded = load_training_splits(self.features_path)
+            if loaded is None:
+                return False, False
+            columns, splits = loaded
+        else:
+            X, y = split_features(features_df)
+            if X is None:
+                print("Error: No 'user_rating' target column found to train the AI.")
+                return False, False
+            if len(X) < MIN_TRAINING_ROWS:
+                print(f"Insufficient data (only {len(X)} movies). The AI needs at least {MIN_TRAINING_ROWS} to train properly.")
+                return False, False
+            profile_df = run.get('profile_df')
+            if profile_df is None:
+                profile_df = pd.read_csv(self.profile_path)
+            # Feature rows are the rated films only; line the profile up with them
+            if 'Rating' in profile_df.columns:
+                rated = pd.to_numeric(profile_df['Rating'], errors='coerce').notna().to_numpy()
+                profile_df = profile_df[rated].reset_index(drop=True)
+            if len(profile_df) == len(X):
+                keys = row_keys(profile_df)
+                evaluation = self._shadow_evaluate(X, y, profile_df, vectorizer)
+            else:
+                print(f"⚠️ The profile ({len(profile_df)} rated rows) doesn't line up with the feature matrix "
+                      f"({len(X)} rows); promoting the retrained model without shadow evaluation.")
+            if evaluation is not None and not evaluation['promoted']:
+                self.metrics.record(evaluation)
+                run['evaluation'], run['promoted'] = evaluation, False
+                run['bundle_version'] = evaluation['current_version']
+                self._record('train', fp, mae=self.state.get('train', {}).get('mae'),
+                             bundle_version=evaluation['current_version'])
+                return True, False
+            columns, splits = list(X.columns), make_splits(X, y)
+
+        model, mae = fit_personal_model(splits)
+        rows = len(splits[0]) + len(splits[1])
+        if features_df is None:
+            # Streamed splits: stack them back into the full matrix (one float32 copy)
+            X_train, X_test, y_train, y_test = splits
+            X = pd.DataFrame(np.vstack([np.asarray(X_train), np.asarray(X_test)]), columns=columns, copy=False)
+            y = np.concatenate([np.asarray(y_train), np.asarray(y_test)])
+        splits = X_train = X_test = None  # Drop the split copies before the full fits
+        # The split only measures MAE; the promoted forest learns from every rating
+        print(f"Refitting on all {rows} movies...")
+        model = fit_forest(X, y)
+        prefilter = LinearPrefilter.fit(X, y)
+        similarity = SimilarityIndex.build(np.asarray(X), np.asarray(y), columns)
+        arrays = {**similarity.to_arrays(), **prefilter.to_arrays()}
+        if keys is not None:
+            arrays['trained_keys'] = keys
+        manifest = save_bundle(self.bundle_dir, model, columns, vectorizer, arrays=arrays,
+                               mae=float(mae), rows=rows,
+                               holdout_mae=evaluation['candidate']['mae'] if evaluation else None)
+        if evaluation is not None:
+            evaluation['candidate_version'] = manifest['version']
+            self.metrics.record(evaluation)
+        self._record('train', fp, mae=float(mae), rows=rows, bundle_version=manifest['version'])
+        use_similarity_index(model, similarity)
+        use_prefilter(model, prefilter)
+        run['model'], run['columns'], run['vectorizer'] = model, list(columns), vectorizer
+        run['mae'], run['bundle_version'] = float(mae), manifest['version']
+        run['evaluation'], run['promoted'] = evaluation, True
+        return True, False
+
+    def _shadow_evaluate(self, X, y, profile_df, vectorizer):
+        """
+        Fits a candidate without the most recent ratings and scores it against the
+        current model on the recent ones the current model never saw. Returns the
+        metrics record (with 'promoted' and 'reason'), or None when there are too
+        few ratings to hold any out.
+        """
+        holdout = holdout_positions(profile_df)
+        train_mask = np.ones(len(X), dtype=bool)
+        train_mask[holdout] = False
+        if len(holdout) == 0 or train_mask.sum() < MIN_TRAINING_ROWS:
+            return None
+        print(f"Shadow-evaluating on your {len(holdout)} most recent ratings...")
+        candidate = fit_forest(X.iloc[train_mask], y.iloc[train_mask])
+        holdout_rows = profile_df.iloc[holdout]
+        record = {
+            'holdout_rows': int(len(holdout)),
+            'candidate': evaluate(candidate, list(X.columns), vectorizer, holdout_rows),
+            'current_version': None, 'current': None, 'compared_rows': 0,
+        }
+
+        current = load_payload(self.bundle_dir)
+        seen = current[0]['arrays'].get('trained_keys') if current else None
+        if current is None:
+            promoted, reason = True, "no current model"
+        elif seen is None:
+            promoted, reason = True, "current model has no record of its training rows"
+        else:
+            payload, manifest = current
+            record['current_version'] = manifest['version']
+            unseen = holdout_rows[~np.isin(row_keys(holdout_rows), seen)]
+            if len(unseen) < MIN_HOLDOUT_ROWS:
+                promoted, reason = True, f"only {len(unseen)} ratings are new since the current model"
+            else:
+                record['compared_rows'] = int(len(unseen))
+                record['candidate'] = evaluate(candidate, list(X.columns), vectorizer, unseen)
+                record['current'] = evaluate(payload['model'], payload['columns'], payload['vectorizer'], unseen)
+                promoted, reason = is_not_worse(record['candidate'], record['current'])
+                print(format_metrics(f"v{manifest['version']}", record['current']))
+        print(format_metrics("candidate", record['candidate']))
+        if promoted:
+            print(f"✅ Promoting the retrained model ({reason}).")
+        else:
+            print(f"⚠️ Retrained model is worse on your recent ratings; keeping v{record['current_version']} ({reason}).")
+        record['promoted'], record['reason'] = promoted, reason
+        return record
+
+    # --- Driver ---
+
+    def run(self, zip_path=None, progress_callback=None, on_stage=None, force=False, stages=None):
+        """
+        Runs import (only when zip_path is given), then features and train; `stages`
+        limits the run to some of them (a stage left out is taken as its last recorded
+        run). on_stage(name) is called before each stage starts. Returns a PipelineResult.
+        """
+        result = PipelineResult()
+        run = {'zip_path': zip_path, 'progress_callback': progress_callback}
+        runners = {'import': self._run_import, 'features': self._run_features, 'train': self._run_train}
+        # Once a stage actually reruns, everything downstream reruns too
+        dirty = force
+        for stage in (STAGES if zip_path else STAGES[1:]):
+            if stages is not None and stage not in stages:
+                continue
+            if on_stage:
+                on_stage(stage)
+            started = time.perf_counter()
+            with profiler.span(f"pipeline.{stage}"):
+                ok, skipped = runners[stage](run, dirty)
+            result.timings[stage] = time.perf_counter() - started
+            if skipped:
+                result.skipped.append(stage)
+            else:
+                dirty = True
+            if not ok:
+                result.failed_stage = stage
+                print(result.summary())
+                return result
+
+        result.success = True
+        result.mae = run.get('mae')
+        result.bundle_version = run.get('bundle_version')
+        result.promoted, result.evaluation = run.get('promoted'), run.get('evaluation')
+        # Only set when this run trained; otherwise callers load the bundle from disk
+        if run.get('model') is not None:
+            result.model, result.columns, result.vectorizer = run['model'], run['columns'], run['vectorizer']
+        print(result.summary())
+        return result
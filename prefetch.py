@@ -0,0 +1,144 @@
+"""
+Idle-time warming of the recommendation caches.
+
+While the app sits idle, a background thread resolves the mood chips to genres and
+fetches + scores the candidates for them and for the user's most used genre sets,
+so those queries are answered from recommender's caches. Requests are spaced out to
+stay well inside TMDB's rate limit, and the whole run stops as soon as a foreground
+request calls cancel().
+"""
+import json
+import time
+import threading
+from collections import Counter
+
+import recommender
+from recommender import QUERY_HISTORY_FILE, QUICK_MOODS, chip_mood_text
+
+TOP_GENRE_SETS = 5
+# TMDB allows roughly 40 requests per 10s. One warmed query is at most two discover
+# calls (or one Gemini call), so this keeps prefetching far below the limit and
+# leaves the foreground plenty of headroom.
+MIN_QUERY_INTERVAL = 1.0
+
+
+class QueryHistory:
+    """Counts how often each genre set is searched, persisted as a small JSON file."""
+
+    def __init__(self, path=QUERY_HISTORY_FILE):
+        self.path = path
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.counts.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _key(genres):
+        return "|".join(sorted(genres))
+
+    def record(self, genres):
+        if not genres:
+            return
+        with self._lock:
+            self.counts[self._key(genres)] += 1
+            try:
+                with open(self.path, 'w') as f:
+                    json.dump(self.counts, f)
+            except OSError as e:
+                print(f"Warning: Could not save query history: {e}")
+
+    def top(self, n=TOP_GENRE_SETS):
+        with self._lock:
+            return [key.split("|") for key, _ in self.counts.most_common(n)]
+
+
+class Prefetcher:
+    """
+    Warms candidate and score caches in a background thread.
+
+    get_model() returns the current (model, columns, vectorizer) so a retrain is
+    picked up without rebuilding the prefetcher. on_fetched(movies), if given, is
+    called (on the prefetch thread) with each newly fetched candidate list.
+    """
+
+    def __init__(self, history, get_model, moods=QUICK_MOODS, min_interval=MIN_QUERY_INTERVAL, on_fetched=None):
+        self.history = history
+        self.get_model = get_model
+        self.on_fetched = on_fetched
+        self.mood_texts = [chip_mood_text(m) for m in moods]
+        self.min_interval = min_interval
+        self._cancel = threading.Event()
+        self._thread = None
+        self._last_query = 0.0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._cancel,), daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stops the current run at its next checkpoint (in-flight requests finish)."""
+        self._cancel.set()
+
+    def _throttle(self, cancel):
+        """Waits out the request spacing. Returns False if cancelled meanwhile."""
+        wait = self._last_query + self.min_interval - time.monotonic()
+        if wait > 0 and cancel.wait(wait):
+            return False
+        self._last_query = time.monotonic()
+        return not cancel.is_set()
+
+    def _warm(self, genres, cancel):
+        if not recommender.candidates_are_fresh(genres):
+            if not self._throttle(cancel):
+                return False
+            movies = recommender.fetch_candidates(genres, cancel_event=cancel)
+            if movies is None:
+                return False
+            if self.on_fetched is not None:
+                self.on_fetched(movies)
+        else:
+            movies = recommender.fetch_candidates(genres)
+        model, columns, vectorizer = self.get_model()
+        if model is not None and movies and not cancel.is_set():
+            recommender.score_candidates(movies, model, columns, vectorizer)
+        return not cancel.is_set()
+
+    def _genre_sets(self, cancel):
+        """Most used genre sets first, then the mood chips (resolved lazily, cached by recommender)."""
+        yield from self.history.top()
+        for mood in self.mood_texts:
+            genres = recommender.cached_mood_genres(mood)
+            if genres is None:
+                if recommender.gemini_model is not None and not self._throttle(cancel):
+                    return
+                genres = recommender.get_genres_from_ai(mood)
+            if genres:
+                yield list(genres)
+
+    def _run(self, cancel):
+        started = time.perf_counter()
+        warmed = 0
+        seen = set()
+        try:
+            for genres in self._genre_sets(cancel):
+                key = QueryHistory._key(genres)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if cancel.is_set() or not self._warm(genres, cancel):
+                    break
+                warmed += 1
+        except Exception as e:
+            print(f"Prefetch stopped: {e}")
+        state = "cancelled" if cancel.is_set() else "done"
+        print(f"🔮 Prefetched {warmed} likely queries in {time.perf_counter() - started:.1f}s ({state}).")
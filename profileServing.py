@@ -0,0 +1,142 @@
+"""
+Recommendations for many profiles from one process.
+
+A profile id resolves to its directory under a serving root, laid out like the
+training farm's output (see trainingFarm.profile_paths): the model bundle, the
+hydrated profile and an app memory file. Loaded profiles (model, columns,
+vectorizer, similarity index and watched index) live in a bounded LRU, so a busy
+profile is loaded once instead of per request, and it's reloaded only when its
+bundle gets a new version. Candidates come from recommender.fetch_candidates,
+whose cache is keyed by genres alone: every profile asking for the same genres
+shares one TMDB fetch, and is then scored with its own model.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from recommender import load_ai_model, watchedMovies, analyze, sort_picks
+from modelBundle import read_manifest
+from trainingFarm import profile_paths
+
+MAX_LOADED_PROFILES = 16
+# How often a loaded profile checks its manifest for a retrained bundle
+RELOAD_CHECK_SECONDS = 30
+
+
+class LoadedProfile:
+    def __init__(self, profile_id, model, columns, vectorizer, watched, bundle_version):
+        self.profile_id = profile_id
+        self.model = model
+        self.columns = columns
+        self.vectorizer = vectorizer
+        self.watched = watched
+        self.bundle_version = bundle_version
+        self.loaded_at = time.time()
+        self.checked_at = self.loaded_at
+
+
+class ProfileServer:
+    """Resolves profile ids to loaded models and watched indexes, keeping the most recent in memory."""
+
+    def __init__(self, root, max_profiles=MAX_LOADED_PROFILES, reload_check=RELOAD_CHECK_SECONDS):
+        self.root = root
+        self.max_profiles = max_profiles
+        self.reload_check = reload_check
+        self._profiles = OrderedDict()   # profile id -> LoadedProfile, least recently used first
+        self._loading = {}               # profile id -> Lock, so one request loads while others wait
+        self._lock = threading.Lock()
+        self.hits = self.loads = self.evictions = 0
+
+    def exists(self, profile_id):
+        try:
+            return os.path.isdir(profile_paths(self.root, profile_id)['dir'])
+        except ValueError:
+            return False
+
+    def _is_current(self, profile):
+        if time.time() - profile.checked_at < self.reload_check:
+            return True
+        manifest = read_manifest(profile_paths(self.root, profile.profile_id)['bundle_dir'])
+        profile.checked_at = time.time()
+        return (manifest or {}).get('version') == profile.bundle_version
+
+    def _cached(self, profile_id):
+        with self._lock:
+            profile = self._profiles.get(profile_id)
+        # The manifest check reads from disk, so it runs without holding up other profiles
+        if profile is None or not self._is_current(profile):
+            return None
+        with self._lock:
+            if self._profiles.get(profile_id) is not profile:
+                return None   # Evicted or reloaded meanwhile
+            self._profiles.move_to_end(profile_id)
+            self.hits += 1
+            return profile
+
+    def get(self, profile_id):
+        """The profile, loaded on first use (or after a retrain). Returns None for unknown ids."""
+        profile = self._cached(profile_id)
+        if profile is not None:
+            return profile
+        if not self.exists(profile_id):
+            print(f"⚠️ Unknown profile '{profile_id}'")
+            return None
+        with self._lock:
+            load_lock = self._loading.setdefault(profile_id, threading.Lock())
+        with load_lock:
+            try:
+                # Another request may have loaded it while this one waited
+                profile = self._cached(profile_id)
+                if profile is not None:
+                    return profile
+                profile = self._load(profile_id)
+                with self._lock:
+                    self._profiles[profile_id] = profile
+                    self._profiles.move_to_end(profile_id)
+                    while len(self._profiles) > self.max_profiles:
+                        self._profiles.popitem(last=False)
+                        self.evictions += 1
+                    self.loads += 1
+            finally:
+                # Requests already waiting hold this lock; later ones find the profile cached
+                with self._lock:
+                    if self._loading.get(profile_id) is load_lock:
+                        del self._loading[profile_id]
+        return profile
+
+    def _load(self, profile_id):
+        paths = profile_paths(self.root, profile_id)
+        started = time.perf_counter()
+        # Read the version first: if a retrain lands mid-load, the next check reloads
+        manifest = read_manifest(paths['bundle_dir'])
+        model, columns, vectorizer = load_ai_model(paths['bundle_dir'])
+        watched = watchedMovies(paths['profile_path'], paths['memory_path'])
+        print(f"👤 Loaded profile '{profile_id}' in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return LoadedProfile(profile_id, model, columns, vectorizer, watched, (manifest or {}).get('version'))
+
+    def evict(self, profile_id):
+        with self._lock:
+            return self._profiles.pop(profile_id, None) is not None
+
+    def loaded(self):
+        with self._lock:
+            return list(self._profiles)
+
+    def recommend(self, profile_id, genres, context="Alone", sort="AI Prediction"):
+        """Ranked picks for one profile, or None for an unknown profile."""
+        profile = self.get(profile_id)
+        if profile is None:
+            return None
+        picks = analyze(profile.watched, genres, profile.model, profile.columns, profile.vectorizer, context)
+        if profile.model is None:
+            sort = "TMDB Score"  # No personal model yet, AI scores are all zero
+        return sort_picks(picks, sort)
+
+    def format_stats(self):
+        with self._lock:
+            loaded = len(self._profiles)
+        total = self.hits + self.loads
+        rate = f"{self.hits / total:.0%}" if total else "-"
+        return (f"👤 Profiles: {loaded}/{self.max_profiles} loaded, {self.loads} loads, "
+                f"{self.evictions} evictions, {rate} served without loading")
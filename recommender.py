@@ -0,0 +1,759 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import heapq
+import threading
+import weakref
+import pandas as pd
+from dotenv import load_dotenv
+import joblib
+import numpy as np
+
+from instrumentation import profiler
+from titles import titleNormalize, WatchedIndex
+from modelBundle import load_payload, save_bundle
+from similarity import SimilarityIndex
+from diversity import diversify
+from cascade import (LinearPrefilter, CASCADE_MIN_POOL, compare as compare_cascade,
+                     format_comparison)
+import httpCache
+
+# --- Headless recommendation core ---
+# Everything needed to go from a mood to scored TMDB picks, with no Tk,
+# customtkinter or matplotlib imports. app.py builds the GUI on top of this
+# module and mbm.py exposes it as a command line tool.
+
+# --- 1. Path & Config Setup ---
+
+def get_path(relative_path):
+    """ 
+    Robust path finder:
+    1. If running as a frozen .exe, looks in the temporary bundle (_MEIPASS).
+    2. If running as a script, looks in the folder containing this script.
+    """
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        # If not frozen, use the folder where this file is located
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        
+    return os.path.join(base_path, relative_path)
+
+load_dotenv(dotenv_path=get_path('.env'))
+key = os.getenv('TMDB_key')
+baseUrl = "https://api.themoviedb.org/3"
+
+# --- Gemini AI Setup ---
+GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+gemini_model = None
+
+def configure_gemini():
+    """Initializes the Gemini client once. Returns the model or None when unavailable."""
+    global gemini_model
+    if gemini_model is not None:
+        return gemini_model
+    if GEMINI_API_KEY and GEMINI_API_KEY != 'YOUR_GEMINI_API_KEY_HERE':
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            gemini_model = genai.GenerativeModel('gemini-3.1-flash-lite-preview')
+            print("✅ Gemini AI initialized.")
+        except Exception as e:
+            print(f"⚠️ Gemini init failed: {e}")
+    else:
+        print("⚠️ GEMINI_API_KEY not set. Using fallback mood buttons.")
+    return gemini_model
+
+# requests-cache's single SQLite file from before httpCache; it had no size cap
+LEGACY_HTTP_CACHE = 'tmdb_cache.sqlite'
+
+def install_http_cache(directory=None):
+    """Caches TMDB calls and posters on disk (see httpCache) so repeated lookups don't hit the network."""
+    httpCache.configure(directory or get_user_data_path('http_cache'))
+    for legacy in (LEGACY_HTTP_CACHE, get_user_data_path(LEGACY_HTTP_CACHE)):
+        if os.path.exists(legacy):
+            try:
+                os.remove(legacy)
+                print(f"🧹 Removed old HTTP cache {legacy}")
+            except OSError:
+                pass
+
+# File Paths — User data persists in %APPDATA% across exe updates
+def get_user_data_path(filename):
+    """Returns a path inside %APPDATA%/MBM_Recommender/ for persistent user data."""
+    appdata = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'MBM_Recommender')
+    os.makedirs(appdata, exist_ok=True)
+    # Ensure subdirectories exist
+    full_path = os.path.join(appdata, filename)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    return full_path
+
+CONFIG_FILE = get_user_data_path('config.json')
+APP_MEMORY_FILE = get_user_data_path('app_memory_ids.csv')
+
+# Current model: a versioned bundle (see modelBundle). The three pickles are the
+# pre-bundle format, migrated on first load.
+MODEL_BUNDLE_DIR = get_user_data_path('user_data/model')
+MODEL_PATH = get_user_data_path('user_data/personal_ai_model.pkl')
+COLUMNS_PATH = get_user_data_path('user_data/model_columns.pkl')
+VECTORIZER_PATH = get_user_data_path('user_data/summary_vectorizer.pkl')
+MODEL_METRICS_FILE = get_user_data_path('user_data/model_metrics.jsonl')
+TIMINGS_FILE = get_user_data_path('timings.jsonl')
+PIPELINE_STATE_FILE = get_user_data_path('user_data/pipeline_state.json')
+QUERY_HISTORY_FILE = get_user_data_path('query_history.json')
+TASTE_CACHE_FILE = get_user_data_path('user_data/taste_stats.json')
+TASTE_CHART_FILE = get_user_data_path('user_data/taste_chart.png')
+# annIndex.MovieIndex files (<path>.npz + <path>.json)
+SIMILAR_INDEX_PATH = get_user_data_path('user_data/similar_index')
+
+
+# --- 2. Helper Functions ---
+
+def watchedMovies(letterboxd_path, app_memory_path):
+    """
+    Loads watched movies into a WatchedIndex. 
+    Also identifies 'Hated Movies' (Rating <= 2.5) for the Veto System.
+    """
+    watched = WatchedIndex()
+    
+    # 1. Load User/Friend CSV
+    try:
+        if letterboxd_path and os.path.exists(letterboxd_path):
+            df = pd.read_csv(letterboxd_path)
+            df.columns = [c.strip() for c in df.columns]
+            watched.add_frame(df)
+            print(f"Loaded {len(watched.titles)} movies and {len(watched.hated)} hated movies from CSV.")
+    except Exception as e:
+        print(f"Warning: Could not read watched file: {e}")
+
+    # 2. Load App Memory
+    try:
+        if os.path.exists(app_memory_path) and os.path.getsize(app_memory_path) > 0:
+            memLogged = pd.read_csv(app_memory_path)
+            if 'movie_id' in memLogged.columns:
+                watched.add_ids(memLogged['movie_id'].astype(int))
+        else:
+            with open(app_memory_path, 'w', newline='', encoding='utf-8') as f:
+                f.write('movie_id,title\n')
+    except Exception as e:
+        print(f"Warning: Could not read app memory: {e}")
+    
+    return watched
+
+def library_movies(path):
+    """
+    The hydrated profile's rows as TMDB-style movie dicts (id, title, release_date,
+    overview, genre_ids), for local search and the similar-movie index.
+    """
+    if not path or not os.path.exists(path):
+        return []
+    df = pd.read_csv(path)
+    name_col = 'Name' if 'Name' in df.columns else 'Title'
+    if 'movie_id' not in df.columns or name_col not in df.columns:
+        return []
+    df = df[df['movie_id'].notna() & df[name_col].notna()]
+    years = pd.to_numeric(df['Year'], errors='coerce') if 'Year' in df.columns else pd.Series(np.nan, index=df.index)
+    overviews = df['overview'] if 'overview' in df.columns else pd.Series('', index=df.index)
+    genres = df['genres'] if 'genres' in df.columns else pd.Series('', index=df.index)
+    movies = []
+    for movie_id, title, year, overview, genre_str in zip(df['movie_id'], df[name_col], years, overviews, genres):
+        movies.append({
+            'id': int(movie_id),
+            'title': str(title),
+            'release_date': str(int(year)) if pd.notna(year) else '',
+            'overview': overview if isinstance(overview, str) else '',
+            'genre_ids': [GENRE_IDS[g.strip()] for g in genre_str.split(',') if g.strip() in GENRE_IDS]
+                         if isinstance(genre_str, str) else [],
+        })
+    return movies
+
+def load_ai_model(bundle_dir=None):
+    """
+    Loads the personal model from the app's bundle, or another profile's bundle_dir.
+    Returns (model, columns, vectorizer), or three Nones when there is no model.
+    """
+    try:
+        loaded = load_payload(bundle_dir or MODEL_BUNDLE_DIR)
+        if loaded is not None:
+            payload, _ = loaded
+            model, columns, vectorizer = payload['model'], payload['columns'], payload['vectorizer']
+            use_similarity_index(model, SimilarityIndex.from_arrays(payload['arrays']))
+            use_prefilter(model, LinearPrefilter.from_arrays(payload['arrays']))
+            print("✅ AI Model, Columns, and Vectorizer Loaded Successfully.")
+            return model, columns, vectorizer
+        if bundle_dir is None and all(os.path.exists(p) for p in (MODEL_PATH, COLUMNS_PATH, VECTORIZER_PATH)):
+            model = joblib.load(MODEL_PATH)
+            columns = joblib.load(COLUMNS_PATH)
+            vectorizer = joblib.load(VECTORIZER_PATH)
+            print("✅ AI Model, Columns, and Vectorizer Loaded Successfully.")
+            try:
+                save_bundle(MODEL_BUNDLE_DIR, model, columns, vectorizer, migrated_from='pickles')
+            except Exception as e:
+                print(f"Warning: Could not migrate model to a bundle: {e}")
+            return model, columns, vectorizer
+        else:
+            print("⚠️ Model files not found. Using standard popularity sorting.")
+            return None, None, None
+    except Exception as e:
+        print(f"⚠️ Error loading AI: {e}")
+        return None, None, None
+
+# TMDB genre name -> id
+GENRE_IDS = {
+    'Action': 28, 'Adventure': 12, 'Animation': 16, 'Comedy': 35,
+    'Crime': 80, 'Documentary': 99, 'Drama': 18, 'Family': 10751,
+    'Fantasy': 14, 'History': 36, 'Horror': 27, 'Music': 10402,
+    'Mystery': 9648, 'Romance': 10749, 'Science Fiction': 878,
+    'TV Movie': 10770, 'Thriller': 53, 'War': 10752, 'Western': 37
+}
+
+# Valid TMDB genre list for Gemini to pick from
+VALID_GENRES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary',
+    'Drama', 'Family', 'Fantasy', 'History', 'Horror', 'Music', 'Mystery',
+    'Romance', 'Science Fiction', 'TV Movie', 'Thriller', 'War', 'Western'
+]
+
+# --- Query caches (warmed at idle time by prefetch.Prefetcher) ---
+# Discover results per genre set, expiring after CANDIDATE_TTL seconds
+CANDIDATE_TTL = 30 * 60
+MAX_CANDIDATE_SETS = 64
+_candidate_cache = {}
+# Gemini's genre answer per mood text
+MAX_MOOD_QUERIES = 512
+_mood_genre_cache = {}
+# Genre sets being fetched right now -> Event set when the fetch ends, so concurrent
+# requests (e.g. several profiles asking for the same genres) share one fetch
+_candidate_fetches = {}
+_candidate_fetch_lock = threading.Lock()
+# Per model: movie id -> (base_score, context_scores, similarity). Weak keys, so a
+# profile's scores go away with its model when it's unloaded
+MAX_SCORES_PER_MODEL = 20000
+_score_cache = weakref.WeakKeyDictionary()
+# similarity.SimilarityIndex of the films the user loved, saved with (and tied to) a model
+_similarity = weakref.WeakKeyDictionary()
+# cascade.LinearPrefilter fitted alongside a model
+_prefilters = weakref.WeakKeyDictionary()
+
+def use_similarity_index(model, index):
+    _similarity[model] = index
+
+def similarity_index_for(model):
+    return _similarity.get(model) if model is not None else None
+
+def use_prefilter(model, prefilter):
+    if prefilter is not None:
+        _prefilters[model] = prefilter
+
+def prefilter_for(model):
+    return _prefilters.get(model) if model is not None else None
+
+def cached_mood_genres(user_input):
+    return _mood_genre_cache.get(_mood_key(user_input))
+
+def candidates_are_fresh(desiredGenre):
+    cached = _candidate_cache.get(_genre_id_string(desiredGenre or []))
+    return bool(cached) and time.time() - cached[0] < CANDIDATE_TTL
+
+def cached_candidate_movies():
+    """Every discover result currently cached (for local title search)."""
+    return [m for _, movies in list(_candidate_cache.values()) for m in movies]
+
+def cache_sizes():
+    """{cache: (entries, cap)} for the memory report."""
+    return {
+        'candidate sets': (len(_candidate_cache), MAX_CANDIDATE_SETS),
+        'mood queries': (len(_mood_genre_cache), MAX_MOOD_QUERIES),
+        'scored movies': (sum(len(s) for s in list(_score_cache.values())), MAX_SCORES_PER_MODEL * max(1, len(_score_cache))),
+    }
+
+def _trim_oldest(cache, cap):
+    """Drops the oldest insertions until the dict holds at most cap entries."""
+    excess = len(cache) - cap
+    if excess > 0:
+        # list() copies the keys in one step, so another thread inserting can't break the walk
+        for key in list(cache)[:excess]:
+            cache.pop(key, None)
+
+def clear_caches():
+    _candidate_cache.clear()
+    _mood_genre_cache.clear()
+    _score_cache.clear()
+
+def _mood_key(user_input):
+    return " ".join(str(user_input).lower().split())
+
+def get_genres_from_ai(user_input):
+    """
+    Uses Gemini to interpret a user's mood/description and return matching TMDB genres.
+    Falls back to a simple keyword match if Gemini is unavailable.
+    """
+    cached = _mood_genre_cache.get(_mood_key(user_input))
+    if cached:
+        print(f"✅ Matched Genres (cached): {cached}")
+        return list(cached)
+    if gemini_model:
+        try:
+            prompt = (
+                f"You are a movie recommendation assistant who deeply understands internet culture, "
+                f"memes, sarcasm, Gen-Z slang, and film community jargon.\n\n"
+                f"The user describes their mood or what they want to watch:\n\n"
+                f"\"{user_input}\"\n\n"
+                f"IMPORTANT CONTEXT for interpreting user input:\n"
+                f"- 'absolute cinema' or 'peak cinema' = critically acclaimed masterpieces (Drama, History, War)\n"
+                f"- 'brainrot' or 'turn my brain off' = mindless fun (Action, Comedy, Animation)\n"
+                f"- 'cozy vibes' or 'comfort movie' = warm, feel-good (Family, Comedy, Romance, Animation)\n"
+                f"- 'edgy' or 'messed up' = dark, disturbing (Thriller, Horror, Crime)\n"
+                f"- 'crying in the club' or 'in my feels' = emotional, tearjerker (Drama, Romance)\n"
+                f"- 'kino' = artsy, high-quality cinema (Drama, History, Mystery)\n"
+                f"- 'based' = bold, unconventional picks (Crime, Thriller, War, Western)\n"
+                f"- 'mid' = user is bored of average stuff, suggest niche or standout genres\n"
+                f"- Understand sarcasm: 'nothing too scary' with a wink might still mean Thriller\n"
+                f"- Understand vibe descriptions: 'rainy day', 'late night', '3am energy' etc.\n\n"
+                f"Select the most relevant genres from this EXACT list:\n"
+                f"{', '.join(VALID_GENRES)}\n\n"
+                f"Rules:\n"
+                f"- Return ONLY genre names from the list above, separated by commas.\n"
+                f"- Choose 2-5 genres that best match the user's intent (not just literal words).\n"
+                f"- Do NOT include any explanation, formatting, or extra text.\n"
+                f"- Example output: Action, Thriller, Science Fiction"
+            )
+            with profiler.span('gemini'):
+                response = gemini_model.generate_content(prompt)
+            raw = response.text.strip()
+            print(f"🤖 Gemini Response: {raw}")
+            
+            # Parse and validate genres
+            parsed = [g.strip() for g in raw.split(',')]
+            valid = [g for g in parsed if g in VALID_GENRES]
+            
+            if valid:
+                print(f"✅ Matched Genres: {valid}")
+                _mood_genre_cache[_mood_key(user_input)] = tuple(valid)
+                _trim_oldest(_mood_genre_cache, MAX_MOOD_QUERIES)
+                return valid
+            else:
+                print("⚠️ Gemini returned no valid genres. Using fallback.")
+        except Exception as e:
+            print(f"⚠️ Gemini API error: {e}. Using fallback.")
+    
+    # --- Fallback: Simple keyword matching ---
+    return _fallback_mood_match(user_input)
+
+def _fallback_mood_match(user_input):
+    """Basic keyword-to-genre mapping when Gemini is unavailable."""
+    fallback_map = {
+        'happy': ['Comedy', 'Music', 'Animation', 'Family', 'Romance'],
+        'sad': ['Drama', 'Romance'],
+        'tense': ['Horror', 'Thriller', 'Mystery', 'Crime'],
+        'adventurous': ['Adventure', 'Science Fiction', 'Fantasy', 'Action'],
+        'calm': ['Documentary', 'Drama', 'History'],
+        'nostalgic': ['Drama', 'Romance', 'Fantasy'],
+        'excited': ['Action', 'Adventure', 'Comedy'],
+        'thoughtful': ['Drama', 'Documentary'],
+        'scary': ['Horror', 'Thriller'],
+        'lighthearted': ['Comedy', 'Family', 'Animation'],
+        'intense': ['Action', 'Thriller', 'War'],
+        'mysterious': ['Mystery', 'Thriller', 'Crime'],
+        'romantic': ['Romance', 'Drama', 'Comedy'],
+        'suspenseful': ['Thriller', 'Horror', 'Mystery']
+    }
+    text = user_input.lower()
+    matched_genres = set()
+    for keyword, genres in fallback_map.items():
+        if keyword in text:
+            matched_genres.update(genres)
+    
+    if matched_genres:
+        print(f"📌 Fallback matched: {list(matched_genres)}")
+        return list(matched_genres)
+    
+    # Default if nothing matches
+    print("📌 No keywords matched. Defaulting to popular genres.")
+    return ['Action', 'Comedy', 'Drama', 'Thriller']
+
+# --- 3. Core Logic (Prediction & Analysis) ---
+
+def predict_score(model, model_columns, vectorizer, genres, context, overview):
+    # 1. Initialize Input
+    input_data = {col: 0 for col in model_columns}
+    
+    # 2. Set Context
+    if f'context_{context}' in input_data:
+        input_data[f'context_{context}'] = 1
+        
+    # 3. Set Genres
+    for g in genres:
+        if f'genre_{g}' in input_data:
+            input_data[f'genre_{g}'] = 1
+            
+    # 4. Set Default Rating
+    input_data['rating_encoded'] = 2 
+
+    # 5. Process Summary
+    if vectorizer and overview:
+        try:
+            overview_text = str(overview)
+            tfidf_matrix = vectorizer.transform([overview_text])
+            feature_names = [f"summary_{w}" for w in vectorizer.get_feature_names_out()]
+            dense_vector = tfidf_matrix.toarray()[0]
+            
+            for name, value in zip(feature_names, dense_vector):
+                if name in input_data:
+                    input_data[name] = value
+        except Exception as e:
+            pass
+
+    # 6. Predict
+    df_input = pd.DataFrame([input_data])
+    df_input = df_input[model_columns] 
+    return model.predict(df_input)[0]
+
+def _candidate_matrix(model_columns, vectorizer, genre_lists, overviews):
+    """Builds the feature rows predict_score would build, for many movies at once."""
+    col_index = {col: i for i, col in enumerate(model_columns)}
+    X = np.zeros((len(genre_lists), len(model_columns)))
+
+    if 'rating_encoded' in col_index:
+        X[:, col_index['rating_encoded']] = 2
+
+    for row, genres in enumerate(genre_lists):
+        for g in genres:
+            j = col_index.get(f'genre_{g}')
+            if j is not None:
+                X[row, j] = 1
+
+    if vectorizer is not None and len(overviews):
+        try:
+            names = vectorizer.get_feature_names_out()
+            pairs = [(src, col_index[f"summary_{w}"]) for src, w in enumerate(names) if f"summary_{w}" in col_index]
+            if pairs:
+                src_idx, dst_idx = map(list, zip(*pairs))
+                tfidf_matrix = vectorizer.transform([str(o) if o else "" for o in overviews])
+                X[:, dst_idx] = tfidf_matrix[:, src_idx].toarray()
+        except Exception:
+            pass
+    return X
+
+def context_names(model_columns):
+    """Contexts the model was trained with, e.g. ['Alone', 'Friends']."""
+    return [c[len('context_'):] for c in model_columns if c.startswith('context_')]
+
+def predict_scores_all_contexts(model, model_columns, vectorizer, genre_lists, overviews, X=None):
+    """
+    Scores every candidate under every known context with a single predict call.
+    Returns (base_scores, {context: scores}); base_scores is the no-context row used
+    for contexts the model has never seen. X is the prebuilt _candidate_matrix, if any.
+    """
+    if X is None:
+        X = _candidate_matrix(model_columns, vectorizer, genre_lists, overviews)
+    n = X.shape[0]
+    if n == 0:
+        return np.zeros(0), {}
+
+    contexts = context_names(model_columns)
+    col_index = {col: i for i, col in enumerate(model_columns)}
+    blocks = [X]
+    for ctx in contexts:
+        block = X.copy()
+        block[:, col_index[f'context_{ctx}']] = 1
+        blocks.append(block)
+
+    stacked = pd.DataFrame(np.vstack(blocks), columns=model_columns)
+    preds = model.predict(stacked).reshape(len(blocks), n)
+    return preds[0], {ctx: preds[i + 1] for i, ctx in enumerate(contexts)}
+
+def score_for_context(movie, context):
+    """Picks a movie's precomputed score for the given context."""
+    return movie.get('context_scores', {}).get(context, movie.get('base_score', movie.get('ai_score', 0)))
+
+def rescore_for_context(picks, context):
+    """Re-targets ai_score to another context in memory — no network or model calls."""
+    for movie in picks:
+        if 'context_scores' in movie or 'base_score' in movie:
+            movie['ai_score'] = score_for_context(movie, context)
+    return picks
+
+def _genre_id_string(genre_names):
+    ids = sorted({str(GENRE_IDS[name]) for name in genre_names if name in GENRE_IDS}, key=int)
+    return "|".join(ids)
+
+DISCOVER_PAGES = (1, 2)
+
+def _discover_page(genreIdString, page):
+    """One TMDB discover page, or None if the request failed."""
+    discoverParams = {
+        'api_key': key, 'with_genres': genreIdString,
+        'vote_average.gte': 5.5, 'vote_count.gte': 100, 
+        'sort_by': 'popularity.desc', 'language': 'en-US', 'page': page
+    }
+    with profiler.span('discover'):
+        data = httpCache.get_json(f"{baseUrl}/discover/movie", params=discoverParams)
+    return data.get('results', []) if data is not None else None
+
+def _cached_candidates(genreIdString):
+    cached = _candidate_cache.get(genreIdString)
+    if cached and time.time() - cached[0] < CANDIDATE_TTL:
+        return [dict(m) for m in cached[1]]
+    return None
+
+def _combine_pages(genreIdString, pages):
+    """Concatenates pages up to the first failed one; caches only complete fetches."""
+    results = []
+    for page in pages:
+        if page is None:
+            return results
+        results.extend(page)
+    _candidate_cache.pop(genreIdString, None)  # Re-inserted as the newest
+    _candidate_cache[genreIdString] = (time.time(), [dict(m) for m in results])
+    _trim_oldest(_candidate_cache, MAX_CANDIDATE_SETS)
+    return results
+
+def fetch_candidates(desiredGenre, cancel_event=None):
+    """
+    Returns TMDB discover results (2 pages) for the genres, served from the candidate
+    cache when fresh. Returns None if cancel_event is set before all pages are in.
+    Each call gets its own copies of the movie dicts, since analyze annotates them.
+    """
+    genreIdString = _genre_id_string(desiredGenre or [])
+    if not genreIdString:
+        return []
+    cached = _cached_candidates(genreIdString)
+    if cached is not None:
+        return cached
+
+    with _candidate_fetch_lock:
+        cached = _cached_candidates(genreIdString)
+        if cached is not None:
+            return cached
+        in_flight = _candidate_fetches.get(genreIdString)
+        if in_flight is None:
+            done = _candidate_fetches[genreIdString] = threading.Event()
+    if in_flight is not None:
+        # Someone else is fetching these genres: wait for their result
+        while not in_flight.wait(0.05):
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+        cached = _cached_candidates(genreIdString)
+        if cached is not None:
+            return cached
+        return fetch_candidates(desiredGenre, cancel_event)  # Their fetch failed; try again
+
+    try:
+        print(f"Searching TMDB for genres: {genreIdString}")
+        pages = []
+        for page in DISCOVER_PAGES:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            pages.append(_discover_page(genreIdString, page))
+            if pages[-1] is None:
+                break
+        return _combine_pages(genreIdString, pages)
+    finally:
+        with _candidate_fetch_lock:
+            _candidate_fetches.pop(genreIdString, None)
+        done.set()
+
+async def fetch_candidates_async(desiredGenre, net, trace=None):
+    """fetch_candidates for a netLoop.NetworkLoop: both discover pages are requested concurrently."""
+    genreIdString = _genre_id_string(desiredGenre or [])
+    if not genreIdString:
+        return []
+    cached = _cached_candidates(genreIdString)
+    if cached is not None:
+        return cached
+
+    print(f"Searching TMDB for genres: {genreIdString}")
+    pages = await asyncio.gather(*(net.run_blocking(_discover_page, genreIdString, page, trace=trace)
+                                   for page in DISCOVER_PAGES))
+    return _combine_pages(genreIdString, pages)
+
+def score_candidates(movies, ai_model, ai_columns, ai_vectorizer):
+    """
+    Returns [(base_score, {context: score}, similarity)] for the movies, predicting only
+    the ones not already in the score cache for this model (one batched predict, and
+    one sparse product against the loved films when the model has a similarity index).
+    Pools of CASCADE_MIN_POOL or more go through the model's linear prefilter first
+    (see cascade), and only its shortlist reaches the forest; the app's own pools are
+    smaller than that today.
+    """
+    scores = _score_cache.setdefault(ai_model, {})
+    # Copy what's cached now: other threads score (and trim) the same dict concurrently
+    found = {}
+    for m in movies:
+        cached = scores.get(m['id'])
+        if cached is not None:
+            found[m['id']] = cached
+    missing = [m for m in movies if m['id'] not in found]
+    # Linear estimates for movies cut by the prefilter; not cached, so a later, smaller pool can still promote them
+    estimates = {}
+    if missing:
+        idToGenre = {v: k for k, v in GENRE_IDS.items()}
+        genre_lists = [[idToGenre[g] for g in m.get('genre_ids', []) if g in idToGenre] for m in missing]
+        overviews = [m.get('overview', '') for m in missing]
+        X = _candidate_matrix(ai_columns, ai_vectorizer, genre_lists, overviews)
+        prefilter = prefilter_for(ai_model)
+        linear, keep = None, np.arange(len(missing))
+        if prefilter is not None and len(missing) >= CASCADE_MIN_POOL:
+            with profiler.span('prefilter'):
+                linear, keep = prefilter.shortlist(X)
+        started = time.perf_counter()
+        with profiler.span('predict_score'):
+            base_scores, ctx_scores = predict_scores_all_contexts(ai_model, ai_columns, ai_vectorizer,
+                                                                  None, None, X=X[keep])
+        forest_ms = (time.perf_counter() - started) * 1000
+        index = similarity_index_for(ai_model)
+        with profiler.span('similarity'):
+            sims = index.score(X) if index is not None else np.zeros(len(missing))
+        for j, i in enumerate(keep):
+            found[missing[i]['id']] = (float(base_scores[j]), {ctx: float(s[j]) for ctx, s in ctx_scores.items()},
+                                       float(sims[i]))
+            scores[missing[i]['id']] = found[missing[i]['id']]
+        if linear is not None:
+            # Cut movies rank after the whole shortlist, in their linear order
+            floor = base_scores.min()
+            ctx_floors = {ctx: s.min() for ctx, s in ctx_scores.items()}
+            offsets = prefilter.context_offsets(ai_columns)
+            cut = np.setdiff1d(np.arange(len(missing)), keep)
+            for i in cut:
+                estimates[missing[i]['id']] = (
+                    float(min(linear[i], floor)),
+                    {ctx: float(min(linear[i] + offsets.get(ctx, 0.0), f)) for ctx, f in ctx_floors.items()},
+                    float(sims[i]))
+            if profiler.enabled:
+                # Measuring recall means paying for the full forest pass, so only while profiling
+                forest = lambda rows: predict_scores_all_contexts(ai_model, ai_columns, ai_vectorizer, None, None, X=rows)[0]
+                print(format_comparison(compare_cascade(forest, prefilter, X)))
+            else:
+                print(f"🪜 Cascade: forest scored {len(keep)} of {len(missing)} candidates in {forest_ms:.0f} ms "
+                      f"(turn on Profiling for Recall@30 and the time saved)")
+    _trim_oldest(scores, MAX_SCORES_PER_MODEL)
+    return [found[m['id']] if m['id'] in found else estimates[m['id']] for m in movies]
+
+def rank_candidates(results, watched, ai_model, ai_columns, ai_vectorizer, user_context):
+    """Drops watched films, scores the rest for every context in one batch and applies the veto."""
+    # Filter: Already Watched?
+    finalPicks = []
+    with profiler.span('filter'):
+        for movie in results:
+            title_norm = titleNormalize(movie['title'])
+            year = (movie.get('release_date') or '')[:4] or None
+            if not watched.is_watched(title_norm, movie['id'], year):
+                finalPicks.append((movie, title_norm))
+
+    # --- AI PREDICTION (every context in one batch, cached per movie) ---
+    if ai_model and finalPicks:
+        scored = score_candidates([m for m, _ in finalPicks], ai_model, ai_columns, ai_vectorizer)
+
+        for (movie, title_norm), (base_score, ctx_scores, similarity) in zip(finalPicks, scored):
+            penalty = 0.0
+            # --- VETO SYSTEM ---
+            with profiler.span('veto'):
+                hated = watched.hated_match(title_norm)
+                if hated:
+                    print(f"🚫 Vetoing '{movie['title']}' because user hated '{hated}'")
+                    penalty = 3.0
+            movie['base_score'] = base_score - penalty
+            movie['context_scores'] = {ctx: score - penalty for ctx, score in ctx_scores.items()}
+            movie['ai_score'] = score_for_context(movie, user_context)
+            movie['similarity'] = similarity
+    else:
+        for movie, _ in finalPicks:
+            movie['ai_score'] = 0
+            movie['similarity'] = 0
+
+    finalPicks = [m for m, _ in finalPicks]
+    print(f"Found {len(finalPicks)} candidate movies (sorting deferred to UI).")
+    return finalPicks
+
+def analyze(watched, desiredGenre, ai_model, ai_columns, ai_vectorizer, user_context):
+    if not desiredGenre:
+        return []
+    # Fetch candidates
+    results = fetch_candidates(desiredGenre)
+    if not results: return []
+    return rank_candidates(results, watched, ai_model, ai_columns, ai_vectorizer, user_context)
+
+async def recommend_async(net, mood_text, watched, ai_model, ai_columns, ai_vectorizer, user_context, trace=None):
+    """
+    The GUI's mood -> picks path as a coroutine on a netLoop.NetworkLoop, so it can be
+    cancelled by a newer query. Returns (genres, picks).
+    """
+    with profiler.span('get_genres_from_ai', trace=trace):
+        genres = await net.run_blocking(get_genres_from_ai, mood_text, trace=trace)
+    if not genres:
+        return genres, []
+    print(f"🎬 Searching TMDB for: {', '.join(genres)}")
+    results = await fetch_candidates_async(genres, net, trace=trace)
+    if not results:
+        return genres, []
+    # Scoring is CPU work; keep it off the event loop
+    picks = await net.run_blocking(rank_candidates, results, watched, ai_model, ai_columns,
+                                   ai_vectorizer, user_context, trace=trace)
+    return genres, picks
+
+def search_movies(query):
+    """TMDB title search (first page). Returns (results, total_results)."""
+    data = httpCache.get_json(f"{baseUrl}/search/movie", params={'api_key': key, 'query': query}) or {}
+    results = data.get('results', [])
+    return results, data.get('total_results', len(results))
+
+# --- 4. Config & Ranking Helpers ---
+
+# Shortcut chips shown under the mood box
+QUICK_MOODS = ["😊 Happy", "😢 Sad", "😱 Scared", "🤔 Thoughtful", "🔥 Excited", "💕 Romantic", "🌌 Adventurous"]
+
+def chip_mood_text(chip):
+    """The mood text a chip produces in an empty mood box, e.g. "I'm feeling happy"."""
+    clean = chip.split(' ', 1)[1] if ' ' in chip else chip
+    return f"I'm feeling {clean.lower()}"
+
+def load_saved_watched_path():
+    """Returns the watched CSV path remembered in config.json, if it still exists."""
+    w_path = None
+    if os.path.exists(CONFIG_FILE):
+        try:
+            with open(CONFIG_FILE) as f: w_path = json.load(f).get('watched_path')
+        except: pass
+    if not w_path or not os.path.exists(w_path):
+        w_path = None
+    return w_path
+
+# What each sort mode ranks by ("Diverse" uses ai_score, or vote_average without a model)
+SORT_FIELDS = ('ai_score', 'vote_average', 'similarity')
+
+def top_picks_for_any_sort(picks, k):
+    """
+    The picks ranked in the top k by any sort field (or by the AI score for any
+    context, which a context switch makes the ai_score), in their original order.
+    The field sorts' top k comes out the same from this subset as from the full pool;
+    "Diverse" doesn't, since MMR picks depend on everything in the pool, so the caller
+    should rank the subset for that mode too to keep re-sorts consistent.
+    """
+    if len(picks) <= k:
+        return list(picks)
+    keys = [lambda m, f=field: m.get(f, 0) for field in SORT_FIELDS]
+    contexts = {c for m in picks for c in m.get('context_scores', {})}
+    keys += [lambda m, c=context: score_for_context(m, c) for context in contexts]
+    keep = set()
+    for key in keys:
+        keep.update(heapq.nlargest(k, range(len(picks)), key=lambda i: key(picks[i])))
+    return [picks[i] for i in sorted(keep)]
+
+def sort_picks(picks, mode="TMDB Score"):
+    """Orders candidates the way the results list shows them."""
+    if mode == "AI Prediction":
+        return sorted(picks, key=lambda x: x.get('ai_score', 0), reverse=True)
+    if mode == "Like My Favorites":
+        return sorted(picks, key=lambda x: x.get('similarity', 0), reverse=True)
+    if mode == "Diverse":
+        # AI prediction when there is a model, TMDB score otherwise, spread out by MMR
+        if any(m.get('ai_score', 0) for m in picks):
+            relevance = [m.get('ai_score', 0) for m in picks]
+        else:
+            relevance = [m.get('vote_average', 0) for m in picks]
+        return diversify(picks, relevance, GENRE_IDS)
+    return sorted(picks, key=lambda x: x.get('vote_average', 0), reverse=True)
@@ -0,0 +1,89 @@
+"""
+Content similarity to the films the user loved.
+
+Every rated film's genre and summary (TF-IDF) columns from the feature matrix are
+turned into one L2-normalized sparse row, each block normalized on its own and
+weighted so genres don't drown out plots (or vice versa). The rows of the loved
+films are kept with the model bundle; a candidate pool is then scored with a
+single sparse product against them, as the mean of each candidate's TOP_K best
+matches.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+LOVED_RATING = 4.0
+# Users who rate harshly still get a profile: fall back to their top-rated films
+MIN_LOVED = 5
+LOVED_FALLBACK_FRACTION = 0.1
+GENRE_WEIGHT = 0.4
+TOP_K = 5
+
+
+def _normalize_block(block):
+    norms = np.sqrt(np.asarray(block.multiply(block).sum(axis=1))).ravel()
+    norms[norms == 0] = 1.0
+    return sp.diags(1.0 / norms) @ block
+
+
+class SimilarityIndex:
+    def __init__(self, genre_idx, summary_idx, loved):
+        self.genre_idx = np.asarray(genre_idx, dtype=np.int64)
+        self.summary_idx = np.asarray(summary_idx, dtype=np.int64)
+        self.loved = loved.tocsr()
+
+    def __len__(self):
+        return self.loved.shape[0]
+
+    @classmethod
+    def build(cls, X, y, columns):
+        """X: feature rows (model column order), y: the user's ratings for them."""
+        columns = list(columns)
+        genre_idx = [i for i, c in enumerate(columns) if c.startswith('genre_')]
+        summary_idx = [i for i, c in enumerate(columns) if c.startswith('summary_')]
+        y = np.asarray(y, dtype=float)
+        loved = np.flatnonzero(y >= LOVED_RATING)
+        if len(loved) < MIN_LOVED:
+            n = min(len(y), max(MIN_LOVED, int(len(y) * LOVED_FALLBACK_FRACTION)))
+            loved = np.argsort(-y, kind='stable')[:n]
+        X = np.asarray(X, dtype=np.float32)[loved]
+        index = cls(genre_idx, summary_idx, sp.csr_matrix((0, 0)))
+        index.loved = index.vectors(X)
+        return index
+
+    def vectors(self, X):
+        """Sparse normalized item vectors for dense rows in model column order."""
+        X = np.asarray(X, dtype=np.float32)
+        genres = _normalize_block(sp.csr_matrix(X[:, self.genre_idx]))
+        summaries = _normalize_block(sp.csr_matrix(X[:, self.summary_idx]))
+        rows = sp.hstack([genres * np.sqrt(GENRE_WEIGHT), summaries * np.sqrt(1 - GENRE_WEIGHT)], format='csr')
+        return _normalize_block(rows)
+
+    def score(self, X):
+        """Cosine similarity of each row to the loved films (mean of the TOP_K best), in [0, 1]."""
+        if len(X) == 0 or len(self) == 0:
+            return np.zeros(len(X))
+        sims = (self.vectors(X) @ self.loved.T).toarray()
+        k = min(TOP_K, sims.shape[1])
+        top = np.partition(sims, sims.shape[1] - k, axis=1)[:, -k:]
+        return top.mean(axis=1)
+
+    # --- Bundle storage (plain arrays, so they're memory-mapped on load) ---
+
+    def to_arrays(self):
+        return {
+            'sim_genre_idx': self.genre_idx,
+            'sim_summary_idx': self.summary_idx,
+            'sim_loved_data': self.loved.data,
+            'sim_loved_indices': self.loved.indices,
+            'sim_loved_indptr': self.loved.indptr,
+            'sim_loved_shape': np.array(self.loved.shape),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuilds the index from a bundle's arrays, or returns None if it has none."""
+        if 'sim_loved_data' not in arrays:
+            return None
+        loved = sp.csr_matrix((arrays['sim_loved_data'], arrays['sim_loved_indices'], arrays['sim_loved_indptr']),
+                              shape=tuple(arrays['sim_loved_shape']))
+        return cls(arrays['sim_genre_idx'], arrays['sim_summary_idx'], loved)
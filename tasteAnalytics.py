@@ -0,0 +1,210 @@
+"""
+Running aggregates behind the "My Taste" tab.
+
+The rating histogram and genre counts are kept as counters that _process_movie_log
+updates in O(1), and are cached on disk next to the watched CSV's size/mtime so
+startup only rescans the CSV when it changed outside the app. The chart is drawn
+with matplotlib's object API (no pyplot), which is safe off the Tk thread, and the
+rendered PNG is cached under a key of the aggregates it shows.
+"""
+import os
+import io
+import json
+import hashlib
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Same bins the tab always used: half-star buckets centred on 0.5 .. 5.0
+RATING_EDGES = np.arange(0.25, 5.5, 0.5)
+RATING_CENTERS = (RATING_EDGES[:-1] + RATING_EDGES[1:]) / 2
+TOP_GENRES = 8
+CACHE_VERSION = 1
+
+
+def _source_signature(path):
+    try:
+        st = os.stat(path)
+        return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime': st.st_mtime}
+    except (OSError, TypeError):
+        return None
+
+
+def _bin_index(rating):
+    if not (RATING_EDGES[0] <= rating <= RATING_EDGES[-1]):
+        return None
+    return min(int((rating - RATING_EDGES[0]) // 0.5), len(RATING_CENTERS) - 1)
+
+
+class TasteStats:
+    """Rating histogram + genre counts, with a version that bumps on every change."""
+
+    def __init__(self):
+        self.rating_counts = np.zeros(len(RATING_CENTERS), dtype=np.int64)
+        self.genre_counts = Counter()
+        self.n_rated = 0
+        self.version = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df):
+        stats = cls()
+        if 'Rating' not in df.columns:
+            return stats
+        ratings = pd.to_numeric(df['Rating'], errors='coerce')
+        rated = df[ratings.notna()]
+        stats.rating_counts = np.histogram(ratings.dropna(), bins=RATING_EDGES)[0].astype(np.int64)
+        stats.n_rated = int(ratings.notna().sum())
+        if 'genres' in rated.columns:
+            genres = rated['genres'].dropna().str.split(',').explode().str.strip()
+            stats.genre_counts = Counter(genres[genres != ''].value_counts().to_dict())
+        stats.version = 1
+        return stats
+
+    @classmethod
+    def from_csv(cls, path):
+        if not path or not os.path.exists(path):
+            return cls()
+        return cls.from_frame(pd.read_csv(path))
+
+    def add(self, rating, genres=()):
+        """Counts one newly logged movie."""
+        with self._lock:
+            idx = _bin_index(float(rating))
+            if idx is not None:
+                self.rating_counts[idx] += 1
+            self.n_rated += 1
+            self.genre_counts.update(g for g in genres if g)
+            self.version += 1
+
+    def snapshot(self):
+        """Consistent copy of the aggregates for rendering off the UI thread."""
+        with self._lock:
+            return {
+                'version': self.version,
+                'n_rated': self.n_rated,
+                'rating_counts': self.rating_counts.tolist(),
+                'top_genres': self.genre_counts.most_common(TOP_GENRES),
+            }
+
+    # --- Disk cache ---
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'rating_counts': self.rating_counts.tolist(),
+                'genre_counts': dict(self.genre_counts),
+                'n_rated': self.n_rated,
+            }
+
+    def save(self, cache_path, source_path):
+        payload = {'cache_version': CACHE_VERSION, 'source': _source_signature(source_path), **self.to_dict()}
+        try:
+            tmp = cache_path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(payload, f)
+            os.replace(tmp, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not cache taste stats: {e}")
+
+    @classmethod
+    def load(cls, source_path, cache_path):
+        """Loads cached aggregates if the watched CSV is unchanged, otherwise rescans and re-caches."""
+        try:
+            with open(cache_path) as f:
+                payload = json.load(f)
+            if payload.get('cache_version') == CACHE_VERSION and payload.get('source') == _source_signature(source_path):
+                stats = cls()
+                stats.rating_counts = np.array(payload['rating_counts'], dtype=np.int64)
+                stats.genre_counts = Counter(payload['genre_counts'])
+                stats.n_rated = payload['n_rated']
+                stats.version = 1
+                return stats
+        except (OSError, ValueError, KeyError):
+            pass
+        stats = cls.from_csv(source_path)
+        stats.save(cache_path, source_path)
+        return stats
+
+
+def chart_key(snapshot, colors):
+    data = [snapshot['rating_counts'], snapshot['top_genres'], sorted(colors.items())]
+    return hashlib.sha256(json.dumps(data).encode()).hexdigest()[:16]
+
+
+def render_taste_chart(snapshot, colors, cache_path=None):
+    """
+    Draws the rating histogram and top-genre bars. Returns a PIL image; reuses the PNG
+    at cache_path when it was rendered from the same aggregates.
+    """
+    from PIL import Image
+    key = chart_key(snapshot, colors)
+    key_path = cache_path + '.key' if cache_path else None
+    if cache_path and os.path.exists(cache_path) and os.path.exists(key_path):
+        with open(key_path) as f:
+            if f.read().strip() == key:
+                with Image.open(cache_path) as png:
+                    return png.copy()
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    with _dark_style():
+        fig = Figure(figsize=(10, 5), facecolor=colors['bg_card'])
+        FigureCanvasAgg(fig)
+
+        # --- Subplot 1: Rating Distribution (Histogram) ---
+        ax1 = fig.add_subplot(121, facecolor=colors['bg_main'])
+        ax1.bar(RATING_CENTERS, snapshot['rating_counts'], width=0.5, color=colors['accent'], edgecolor='black', alpha=0.8)
+        ax1.set_title("Your Rating Distribution", fontsize=12, color=colors['text_main'], pad=15)
+        ax1.set_xlabel("Stars", color=colors['text_sub'])
+        ax1.set_ylabel("Count", color=colors['text_sub'])
+        ax1.set_xticks(np.arange(0.5, 5.5, 0.5))
+        ax1.tick_params(colors=colors['text_sub'])
+        for spine in ax1.spines.values():
+            spine.set_color('#333333')
+
+        # --- Subplot 2: Top Genres (Bar Chart - if available) ---
+        ax2 = fig.add_subplot(122, facecolor=colors['bg_main'])
+        top = snapshot['top_genres']
+        if top:
+            names, counts = zip(*top)
+            y_pos = np.arange(len(top))
+            ax2.barh(y_pos, counts, align='center', color=colors['success'], alpha=0.8)
+            ax2.set_yticks(y_pos, labels=names)
+            ax2.invert_yaxis()  # top genre at the top
+            ax2.set_title("Your Top Genres", fontsize=12, color=colors['text_main'], pad=15)
+            ax2.set_xlabel("Movies Watched", color=colors['text_sub'])
+            ax2.tick_params(colors=colors['text_sub'])
+        else:
+            ax2.text(0.5, 0.5, 'Genre data not available in export.',
+                     horizontalalignment='center', verticalalignment='center',
+                     transform=ax2.transAxes, color=colors['text_sub'])
+            ax2.axis('off')
+
+        fig.tight_layout()
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', facecolor=fig.get_facecolor())
+        # Artists and the Agg buffer sit in reference cycles; free them now rather
+        # than whenever the cycle collector gets round to it
+        fig.clear()
+        del fig
+    buf.seek(0)
+    with Image.open(buf) as png:
+        img = png.copy()  # Detached from buf, so the PNG bytes can go
+    if cache_path:
+        try:
+            with open(cache_path, 'wb') as f:
+                f.write(buf.getvalue())
+            with open(key_path, 'w') as f:
+                f.write(key)
+        except OSError as e:
+            print(f"Warning: Could not cache taste chart: {e}")
+    buf.close()
+    return img
+
+
+def _dark_style():
+    from matplotlib import style
+    return style.context('dark_background')
@@ -0,0 +1,67 @@
+import numpy as np
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+HASH_FEATURES = 128
+SHARD_SIZE = 20000
+
+class HashedTextFeaturizer:
+    """
+    Stateless drop-in for the summary TfidfVectorizer.
+
+    Words are hashed into a fixed number of buckets, so there is no vocabulary to
+    pickle and the summary_* columns are identical across retrains. Optional IDF
+    weights are the only fitted state and can be accumulated shard by shard with
+    partial_fit. Exposes transform() and get_feature_names_out() like the vectorizer
+    it replaces, so predict_score and the candidate scorer work unchanged.
+    """
+
+    def __init__(self, n_features=HASH_FEATURES, use_idf=True, n_jobs=1):
+        self.n_features = n_features
+        self.use_idf = use_idf
+        self.n_jobs = n_jobs
+        self.hasher = HashingVectorizer(n_features=n_features, stop_words='english',
+                                        alternate_sign=False, norm=None)
+        self.idf_ = None
+        self._doc_freq = np.zeros(n_features)
+        self._n_docs = 0
+        self._feature_names = np.array([f"h{i}" for i in range(n_features)], dtype=object)
+
+    def partial_fit(self, texts):
+        """Adds a shard of documents to the IDF statistics."""
+        if not self.use_idf:
+            return self
+        counts = self.hasher.transform(texts)
+        self._doc_freq += np.asarray((counts > 0).sum(axis=0)).ravel()
+        self._n_docs += counts.shape[0]
+        self.idf_ = np.log((1 + self._n_docs) / (1 + self._doc_freq)) + 1
+        return self
+
+    def fit(self, texts):
+        self._doc_freq = np.zeros(self.n_features)
+        self._n_docs = 0
+        self.idf_ = None
+        return self.partial_fit(texts)
+
+    def _transform_shard(self, texts):
+        X = self.hasher.transform(texts)
+        if self.use_idf and self.idf_ is not None:
+            X = X @ sp.diags(self.idf_)
+        return normalize(X, norm='l2')
+
+    def transform(self, texts):
+        texts = list(texts)
+        if self.n_jobs == 1 or len(texts) <= SHARD_SIZE:
+            return self._transform_shard(texts)
+        shards = [texts[i:i + SHARD_SIZE] for i in range(0, len(texts), SHARD_SIZE)]
+        parts = Parallel(n_jobs=self.n_jobs)(delayed(self._transform_shard)(s) for s in shards)
+        return sp.vstack(parts).tocsr()
+
+    def fit_transform(self, texts):
+        texts = list(texts)
+        return self.fit(texts).transform(texts)
+
+    def get_feature_names_out(self):
+        return self._feature_names
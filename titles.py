@@ -0,0 +1,147 @@
+"""
+Title normalization and the watched-history index shared by loading, filtering,
+the veto system and logging.
+"""
+import re
+import sys
+from functools import lru_cache
+
+import pandas as pd
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]')
+# Normalized titles are memoized and interned: the same few thousand titles come
+# back on every load, candidate page and log
+TITLE_CACHE_SIZE = 1 << 16
+HATED_THRESHOLD = 2.5
+# Letterboxd and TMDB sometimes disagree on a release year by one
+YEAR_TOLERANCE = 1
+
+
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
+def titleNormalize(title):
+    """'Spider-Man: No Way Home' -> 'spidermannowayhome'."""
+    return sys.intern(_NON_ALNUM.sub('', str(title).lower()))
+
+
+def _year(value):
+    try:
+        year = int(float(value))
+        return year if year > 0 else None
+    except (TypeError, ValueError):
+        return None
+
+
+class WatchedIndex:
+    """
+    Watched titles and TMDB ids plus the veto list of hated titles.
+
+    Membership checks are O(1) set lookups and add() updates everything in place, so
+    a logged movie is excluded from the next recommendation without reloading. When
+    a title was logged with a year, a candidate only matches it if the years agree,
+    which keeps remakes (Dune 1984 vs 2021) from hiding each other.
+    """
+
+    def __init__(self):
+        self.titles = set()
+        self.ids = set()
+        self.hated = set()
+        self._years = {}
+        self._hated_lengths = None
+        self._hated_blob = None
+
+    def __len__(self):
+        return len(self.titles) + len(self.ids)
+
+    def add(self, title=None, movie_id=None, year=None, rating=None):
+        """Adds one watched movie. Returns its normalized title (or None)."""
+        if movie_id is not None and not pd.isna(movie_id):
+            self.ids.add(int(movie_id))
+        if title is None or pd.isna(title):
+            return None
+        title_norm = titleNormalize(title)
+        self.titles.add(title_norm)
+        year = _year(year)
+        if year is not None:
+            self._years.setdefault(title_norm, set()).add(year)
+        try:
+            hated = rating is not None and float(rating) <= HATED_THRESHOLD
+        except (TypeError, ValueError):
+            hated = False
+        if hated:
+            self.add_hated(title_norm)
+        return title_norm
+
+    def add_hated(self, title_norm):
+        # An empty key would be a substring of every title and veto everything
+        if title_norm and title_norm not in self.hated:
+            self.hated.add(title_norm)
+            self._hated_lengths = self._hated_blob = None
+
+    def add_ids(self, ids):
+        self.ids.update(int(i) for i in ids)
+
+    def add_frame(self, df):
+        """Bulk-loads a Letterboxd-style frame (Name/Title, optional Year and Rating)."""
+        col_name = 'Name' if 'Name' in df.columns else 'Title'
+        if col_name not in df.columns:
+            return
+        df = df[df[col_name].notna()]
+        norms = [titleNormalize(t) for t in df[col_name]]
+        self.titles.update(norms)
+        if 'Year' in df.columns:
+            years = pd.to_numeric(df['Year'], errors='coerce')
+            for title_norm, year in zip(norms, years):
+                year = _year(year)
+                if year is not None:
+                    self._years.setdefault(title_norm, set()).add(year)
+        if 'Rating' in df.columns:
+            hated = (pd.to_numeric(df['Rating'], errors='coerce') <= HATED_THRESHOLD).to_numpy()
+            for title_norm, is_hated in zip(norms, hated):
+                if is_hated:
+                    self.add_hated(title_norm)
+
+    def has_id(self, movie_id):
+        return movie_id in self.ids
+
+    def is_watched(self, title_norm, movie_id=None, year=None):
+        if movie_id is not None and movie_id in self.ids:
+            return True
+        if title_norm not in self.titles:
+            return False
+        years = self._years.get(title_norm)
+        year = _year(year)
+        if not years or year is None:
+            return True
+        return any(abs(year - y) <= YEAR_TOLERANCE for y in years)
+
+    def hated_match(self, title_norm):
+        """
+        Returns the hated title that vetoes this one (either is a substring of the
+        other), or None. Cost depends on the title's length, not the veto list's size:
+        its substrings of each hated length are set lookups, and the reverse check is
+        a single find over the joined veto list.
+        """
+        if not self.hated or not title_norm:
+            return None
+        if title_norm in self.hated:
+            return title_norm
+        lengths, blob = self._hated_lengths, self._hated_blob
+        if blob is None:
+            # Snapshot first: the list may grow from the UI thread while we search
+            hated = list(self.hated)
+            lengths = sorted({len(h) for h in hated})
+            # Normalized titles are [a-z0-9] only, so a find can't run across the separator
+            blob = '\n' + '\n'.join(hated) + '\n'
+            self._hated_lengths, self._hated_blob = lengths, blob
+        n = len(title_norm)
+        for length in lengths:
+            if length > n:
+                break
+            for i in range(n - length + 1):
+                if title_norm[i:i + length] in self.hated:
+                    return title_norm[i:i + length]
+        pos = blob.find(title_norm)
+        if pos < 0:
+            return None
+        start = blob.rfind('\n', 0, pos) + 1
+        return blob[start:blob.index('\n', pos)]
@@ -0,0 +1,181 @@
+"""
+Batch retraining for many profiles at once.
+
+A farm directory holds Letterboxd exports (*.zip) and/or hydrated profile CSVs
+(*.csv); each file's stem is its profile id. Exports are hydrated first, one at a
+time in this process, since that step is TMDB-bound (and goes through the HTTP
+cache); CSVs are copied in as they are. Feature engineering and training are CPU-bound and independent per
+profile, so they run in a process pool. Each profile has its own Pipeline (stage
+state, model bundle, metrics) under <out_dir>/<profile id>/, so unchanged profiles
+are skipped on the next farm run just like a single-user retrain.
+
+Workers are reused across profiles, so peak memory is the worker's resident size
+sampled while that profile runs (see instrumentation.PeakRss).
+"""
+import os
+import json
+import time
+import shutil
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from joblib import parallel_config
+
+from pipeline import Pipeline
+from modelBundle import read_manifest
+from instrumentation import PeakRss
+
+REPORT_NAME = 'farm_report.json'
+LOG_NAME = 'train.log'
+PROFILE_SUFFIXES = ('.zip', '.csv')
+
+
+def discover_profiles(directory):
+    """[(profile_id, path)] for every export or profile CSV in the directory, sorted by id."""
+    found = {}
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in PROFILE_SUFFIXES and os.path.isfile(os.path.join(directory, name)):
+            if stem in found:
+                print(f"⚠️ Skipping {name}: another file already uses profile id '{stem}'")
+                continue
+            found[stem] = os.path.join(directory, name)
+    return list(found.items())
+
+
+def profile_paths(out_dir, profile_id):
+    """Where one profile's files live under a farm (or serving) directory."""
+    if not profile_id or os.path.basename(profile_id) != profile_id or profile_id in ('.', '..'):
+        raise ValueError(f"Invalid profile id: {profile_id!r}")
+    base = os.path.join(out_dir, profile_id)
+    return {
+        'dir': base,
+        'profile_path': os.path.join(base, 'user_profile.csv'),
+        'features_path': os.path.join(base, 'user_profile_features.csv'),
+        'vectorizer_path': os.path.join(base, 'summary_vectorizer.pkl'),
+        'bundle_dir': os.path.join(base, 'model'),
+        'state_path': os.path.join(base, 'pipeline_state.json'),
+        'metrics_path': os.path.join(base, 'model_metrics.jsonl'),
+        'memory_path': os.path.join(base, 'app_memory_ids.csv'),
+    }
+
+
+def profile_pipeline(out_dir, profile_id):
+    """The Pipeline for one farm profile, with every artifact under <out_dir>/<profile_id>/."""
+    paths = profile_paths(out_dir, profile_id)
+    os.makedirs(paths['dir'], exist_ok=True)
+    return Pipeline(profile_path=paths['profile_path'], features_path=paths['features_path'],
+                    vectorizer_path=paths['vectorizer_path'], bundle_dir=paths['bundle_dir'],
+                    state_path=paths['state_path'], metrics_path=paths['metrics_path'])
+
+
+def _train_profile(out_dir, profile_id, force):
+    """Worker: features + train for one profile, with its output going to the profile's log."""
+    pipeline = profile_pipeline(out_dir, profile_id)
+    log_path = os.path.join(out_dir, profile_id, LOG_NAME)
+    started = time.perf_counter()
+    # One profile per core: keep joblib inside the worker from spawning more
+    with open(log_path, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log), \
+            contextlib.redirect_stderr(log), parallel_config(backend='sequential'), PeakRss() as memory:
+        result = pipeline.run(force=force, stages=('features', 'train'))
+    manifest = read_manifest(pipeline.bundle_dir) or {}
+    if not result.success:
+        status = 'failed'
+    elif result.promoted is False:
+        status = 'kept'
+    elif 'train' in result.skipped:
+        status = 'cached'
+    else:
+        status = 'trained'
+    return {
+        'profile': profile_id,
+        'status': status,
+        'failed_stage': result.failed_stage,
+        'rows': manifest.get('rows'),
+        'mae': result.mae if result.mae is not None else manifest.get('mae'),
+        'bundle_version': manifest.get('version'),
+        'features_s': round(result.timings.get('features', 0.0), 3),
+        'fit_s': round(result.timings.get('train', 0.0), 3),
+        'total_s': round(time.perf_counter() - started, 3),
+        'peak_mb': round(memory.peak / 1e6, 1) if memory.peak is not None else None,
+        'bundle_dir': pipeline.bundle_dir,
+        'log': log_path,
+    }
+
+
+def _prepare_profiles(out_dir, profiles, force):
+    """
+    Puts each profile's CSV in its farm directory: exports are imported (skipped when
+    unchanged), CSVs copied. Returns the ids that failed.
+    """
+    failed = set()
+    for profile_id, path in profiles:
+        if not path.lower().endswith('.zip'):
+            paths = profile_paths(out_dir, profile_id)
+            os.makedirs(paths['dir'], exist_ok=True)
+            shutil.copy2(path, paths['profile_path'])
+            continue
+        print(f"📥 Hydrating {profile_id}...")
+        result = profile_pipeline(out_dir, profile_id).run(path, force=force, stages=('import',))
+        if not result.success:
+            failed.add(profile_id)
+    return failed
+
+
+def run_farm(directory, out_dir, workers=None, force=False):
+    """
+    Trains every profile in `directory`, writing bundles under out_dir and a JSON
+    report to out_dir/farm_report.json. Returns the per-profile records.
+    """
+    profiles = discover_profiles(directory)
+    if not profiles:
+        print(f"No Letterboxd exports (*.zip) or profiles (*.csv) found in {directory}.")
+        return []
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    failed_imports = _prepare_profiles(out_dir, profiles, force)
+
+    records = [{'profile': pid, 'status': 'failed', 'failed_stage': 'import'} for pid in sorted(failed_imports)]
+    jobs = [pid for pid, _ in profiles if pid not in failed_imports]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    print(f"🏭 Training {len(jobs)} profiles on {workers} worker processes...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_train_profile, out_dir, pid, force): pid for pid in jobs}
+        for future in as_completed(futures):
+            pid = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {'profile': pid, 'status': 'failed', 'failed_stage': 'worker', 'error': str(e)}
+            records.append(record)
+            print(f"  {'❌' if record['status'] == 'failed' else '✅'} {pid}: {record['status']}")
+
+    records.sort(key=lambda r: r['profile'])
+    report = {'directory': os.path.abspath(directory), 'workers': workers, 'finished_at': time.time(),
+              'wall_s': round(time.perf_counter() - started, 3), 'profiles': records}
+    report_path = os.path.join(out_dir, REPORT_NAME)
+    tmp = report_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp, report_path)
+    print(format_report(report))
+    print(f"Report saved to {report_path}")
+    return records
+
+
+def _fmt(value, width, spec=''):
+    return format(value, f">{width}{spec}") if value is not None else format('-', f">{width}")
+
+
+def format_report(report):
+    lines = ["--- Training Farm ---",
+             f"{'profile':<24} {'status':<16} {'rows':>6} {'MAE':>6} {'feat s':>7} {'fit s':>7} {'peak MB':>8}"]
+    for r in report['profiles']:
+        status = r['status'] if r['status'] != 'failed' else f"failed:{r.get('failed_stage')}"
+        lines.append(f"{r['profile'][:24]:<24} {status:<16} {_fmt(r.get('rows'), 6)} {_fmt(r.get('mae'), 6, '.3f')} "
+                     f"{_fmt(r.get('features_s'), 7, '.2f')} {_fmt(r.get('fit_s'), 7, '.2f')} "
+                     f"{_fmt(r.get('peak_mb'), 8, '.1f')}")
+    busy = sum(r.get('total_s') or 0 for r in report['profiles'])
+    lines.append(f"{len(report['profiles'])} profiles in {report['wall_s']:.1f}s wall "
+                 f"({busy:.1f}s of work on {report['workers']} workers)")
+    return "\n".join(lines)